@@ -0,0 +1,88 @@
+# backend/bench/bench_responses.py
+"""
+Payload size and serialization time of a large /analyze response, before
+(FastAPI's default jsonable_encoder + json.dumps) and after (orjson, compression,
+projection).
+
+    cd backend && python -m bench.bench_responses --deps 5000
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+from typing import Callable, List, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from rde_backend.models import (
+    AnalyzeResponse, DependencySummary, Evidence, Fingerprint, NormalizedDep, SetupIntent,
+)
+from rde_backend.responses import compress, dumps, orjson, project, zstandard
+
+def synthetic_analysis(n_deps: int) -> AnalyzeResponse:
+    deps = DependencySummary()
+    kinds = ("pip", "ros", "apt", "conda")
+    for i in range(n_deps):
+        kind = kinds[i % len(kinds)]
+        src = f"src/pkg_{i // 40}/{'package.xml' if kind == 'ros' else 'requirements.txt'}"
+        getattr(deps, kind).append(NormalizedDep(
+            kind=kind,
+            name=f"{kind}_dependency_{i}",
+            spec=">=1.0,<2" if kind == "pip" else None,
+            evidence=Evidence(source=src, location=f"{src}:{i % 40 + 1}", excerpt=f"<depend>{kind}_dependency_{i}</depend>"),
+        ))
+    return AnalyzeResponse(
+        repoPath="/ws",
+        setup_intent=SetupIntent(),
+        dependencies=deps,
+        fingerprint=Fingerprint(os="Linux", os_version="Ubuntu 24.04", arch="x86_64"),
+        notes=[f"Found {n_deps} dependencies."],
+    )
+
+def timed(fn: Callable[[], bytes], repeat: int) -> Tuple[bytes, float]:
+    best = float("inf")
+    out = b""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best * 1000
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--deps", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args(argv)
+
+    model = synthetic_analysis(args.deps)
+    cases: List[Tuple[str, Callable[[], bytes]]] = [
+        ("before: jsonable_encoder + json", lambda: json.dumps(jsonable_encoder(model)).encode()),
+        ("after: model_dump + " + ("orjson" if orjson else "json"), lambda: dumps(model.model_dump(mode="json"))),
+        ("after: + gzip", lambda: compress(dumps(model.model_dump(mode="json")), "gzip")),
+    ]
+    if zstandard is not None:
+        cases.append(("after: + zstd", lambda: compress(dumps(model.model_dump(mode="json")), "zstd")))
+    cases += [
+        ("after: exclude=dependencies.*.evidence.excerpt",
+         lambda: dumps(project(model.model_dump(mode="json"), exclude="dependencies.*.evidence.excerpt"))),
+        ("after: counts=dependencies.*",
+         lambda: dumps(project(model.model_dump(mode="json"), counts="dependencies.*"))),
+    ]
+
+    rows = []
+    for name, fn in cases:
+        body, ms = timed(fn, args.repeat)
+        rows.append({"case": name, "bytes": len(body), "ms": round(ms, 2)})
+
+    if args.json:
+        print(json.dumps({"deps": args.deps, "results": rows}, indent=2))
+        return 0
+    base = rows[0]
+    print(f"{args.deps} deps (best of {args.repeat})")
+    for r in rows:
+        print(f"  {r['case']:<48} {r['bytes'] / 1024:>9.1f} KiB ({r['bytes'] / base['bytes']:>5.1%})  {r['ms']:>8.2f} ms ({base['ms'] / max(r['ms'], 1e-6):.1f}x)")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
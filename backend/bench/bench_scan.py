@@ -0,0 +1,68 @@
+# backend/bench/bench_scan.py
+"""
+discover_repo_files() on a synthetic git repo with a large .gitignore'd directory,
+per enumeration backend (git ls-files, direct .git/index read, filesystem walk).
+
+    cd backend && python -m bench.bench_scan --ignored 50000
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from rde_backend.repo_scan import SCAN_BACKEND_ENV, discover_repo_files
+
+def make_repo(root: Path, tracked: int, ignored: int) -> None:
+    for i in range(tracked):
+        pkg = root / "src" / f"pkg_{i // 10}"
+        pkg.mkdir(parents=True, exist_ok=True)
+        (pkg / f"mod_{i}.py").write_text("x = 1\n")
+        if i % 10 == 0:
+            (pkg / "package.xml").write_text(f"<package><name>pkg_{i // 10}</name></package>\n")
+            (pkg / "requirements.txt").write_text("numpy\n")
+    # generated output that .gitignore excludes but SKIP_DIRS does not know about
+    for i in range(ignored):
+        d = root / "outputs" / f"run_{i // 500}"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"frame_{i}.json").write_text("{}")
+    (root / ".gitignore").write_text("outputs/\n")
+    subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+    subprocess.run(["git", "add", "-A"], cwd=root, check=True)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tracked", type=int, default=2000)
+    ap.add_argument("--ignored", type=int, default=50000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args(argv)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_repo(root, args.tracked, args.ignored)
+        for backend in ("walk", "git", "index"):
+            os.environ[SCAN_BACKEND_ENV] = backend
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                rf = discover_repo_files(str(root))
+                best = min(best, time.perf_counter() - t0)
+            rows.append({"backend": rf.enumeration, "ms": round(best * 1000, 1), "dep_files": len(rf.dep_files)})
+        os.environ.pop(SCAN_BACKEND_ENV, None)
+
+    if args.json:
+        print(json.dumps({"tracked": args.tracked, "ignored": args.ignored, "results": rows}, indent=2))
+        return 0
+    base = rows[0]["ms"]
+    print(f"{args.tracked} tracked files, {args.ignored} ignored files (best of {args.repeat})")
+    for r in rows:
+        print(f"  {r['backend']:<14} {r['ms']:>9.1f} ms ({base / max(r['ms'], 1e-6):.1f}x)  dep_files={r['dep_files']}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
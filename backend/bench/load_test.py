@@ -0,0 +1,313 @@
+# backend/bench/load_test.py
+"""
+Concurrent load generator for the backend API: drives /health, /analyze and /solve
+against synthetic repos and reports p50/p95/p99 latency, throughput and error rate
+per endpoint.
+
+    cd backend && python -m bench.load_test --concurrency 16 --duration 20 --out load.json
+    python -m bench.load_test --url http://127.0.0.1:8844 --compare load.json
+
+Without --url the app is driven in-process over ASGI (no sockets); with --url it
+talks HTTP/1.1 keep-alive to a running uvicorn. No third-party client is needed.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import http.client
+import json
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_MIX = "health:1,analyze:3,solve:2"
+
+SOLVE_CHOICES = [
+    {"envType": "venv", "runTarget": "host", "goal": "cpu", "strictness": "compatible"},
+    {"envType": "venv", "runTarget": "host", "goal": "auto", "strictness": "recent"},
+    {"envType": "conda", "runTarget": "host", "goal": "cpu", "strictness": "compatible"},
+    {"envType": "planOnly", "runTarget": "host", "goal": "auto", "strictness": "compatible"},
+]
+
+PACKAGES = ["numpy", "scipy", "requests", "pyyaml", "opencv-python", "matplotlib", "torch", "rich", "click", "pandas"]
+
+def make_repos(root: Path, n: int, deps: int, ros_packages: int) -> List[Path]:
+    """
+    Half plain Python repos, half ROS workspaces with `ros_packages` packages each.
+    """
+    out = []
+    for i in range(n):
+        repo = root / f"repo_{i}"
+        if i % 2 == 0:
+            repo.mkdir(parents=True)
+            (repo / "README.md").write_text("# demo\n\n## Installation\n\n```bash\npip install -r requirements.txt\n```\n")
+            (repo / "requirements.txt").write_text("".join(f"{PACKAGES[j % len(PACKAGES)]}{j // len(PACKAGES) or ''}>=1.0\n" for j in range(deps)))
+            (repo / "Dockerfile").write_text("FROM ubuntu:24.04\nRUN apt-get update && apt-get install -y \\\n    git curl build-essential\n")
+        else:
+            for k in range(ros_packages):
+                pkg = repo / "src" / f"pkg_{k}"
+                pkg.mkdir(parents=True)
+                body = "".join(f"  <depend>dep_{(k + j) % 40}</depend>\n" for j in range(8))
+                if k:
+                    body += f"  <depend>pkg_{k - 1}</depend>\n"
+                (pkg / "package.xml").write_text(f"<package format=\"3\">\n  <name>pkg_{k}</name>\n{body}</package>\n")
+                (pkg / "requirements.txt").write_text("numpy>=1.20\n")
+        out.append(repo)
+    return out
+
+class InProcessClient:
+    """
+    Minimal ASGI client: one scope per request, body sent in a single message.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, payload: Any = None) -> Tuple[int, bytes]:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [
+                (b"host", b"loadtest"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("loadtest", 80),
+        }
+        sent = False
+        status = 0
+        chunks: List[bytes] = []
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, b"".join(chunks)
+
+    async def close(self) -> None:
+        pass
+
+class HttpClient:
+    """
+    One keep-alive http.client connection per worker, driven from a thread.
+    """
+    def __init__(self, url: str, timeout: float):
+        u = urlsplit(url)
+        self.host, self.port = u.hostname or "127.0.0.1", u.port or 80
+        self.timeout = timeout
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def _do(self, method: str, path: str, body: bytes) -> Tuple[int, bytes]:
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body or None, headers={"Content-Type": "application/json"})
+                resp = self.conn.getresponse()
+                return resp.status, resp.read()
+            except (http.client.HTTPException, ConnectionError):
+                # server closed an idle keep-alive connection: reconnect once
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+        raise RuntimeError("unreachable")
+
+    async def request(self, method: str, path: str, payload: Any = None) -> Tuple[int, bytes]:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        return await asyncio.to_thread(self._do, method, path, body)
+
+    async def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+
+def percentile(sorted_ms: List[float], q: float) -> float:
+    # nearest-rank
+    if not sorted_ms:
+        return 0.0
+    k = max(0, min(len(sorted_ms) - 1, int(round(q / 100.0 * len(sorted_ms) + 0.5)) - 1))
+    return sorted_ms[k]
+
+def summarize(lat_ms: List[float], errors: int, wall_s: float) -> Dict[str, Any]:
+    s = sorted(lat_ms)
+    n = len(s)
+    return {
+        "requests": n,
+        "errors": errors,
+        "error_rate": round(errors / n, 4) if n else 0.0,
+        "rps": round(n / wall_s, 2) if wall_s > 0 else 0.0,
+        "p50_ms": round(percentile(s, 50), 2),
+        "p95_ms": round(percentile(s, 95), 2),
+        "p99_ms": round(percentile(s, 99), 2),
+        "max_ms": round(s[-1], 2) if s else 0.0,
+        "mean_ms": round(sum(s) / n, 2) if n else 0.0,
+    }
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    out = []
+    for part in spec.split(","):
+        name, _, w = part.partition(":")
+        if name.strip():
+            out.append((name.strip(), float(w or 1)))
+    return out
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+async def run_load(args) -> Dict[str, Any]:
+    tmp = tempfile.TemporaryDirectory()
+    repos = make_repos(Path(tmp.name), args.repos, args.deps, args.ros_packages)
+    rng = random.Random(args.seed)
+
+    if args.url:
+        make_client = lambda: HttpClient(args.url, args.timeout)
+        target = args.url
+    else:
+        from rde_backend.server import app
+        make_client = lambda: InProcessClient(app)
+        target = "in-process"
+
+    # warm-up (not measured): one /analyze per repo provides the /solve payloads
+    warm = make_client()
+    analyses: Dict[str, Any] = {}
+    for r in repos:
+        status, body = await warm.request("POST", "/analyze", {"repoPath": str(r)})
+        if status != 200:
+            raise SystemExit(f"warm-up /analyze failed for {r}: HTTP {status} {body[:200]!r}")
+        analyses[str(r)] = json.loads(body)
+    await warm.close()
+
+    mix = parse_mix(args.mix)
+    names = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    lat: Dict[str, List[float]] = {n: [] for n in names}
+    errs: Dict[str, int] = {n: 0 for n in names}
+    deadline = time.perf_counter() + args.duration
+    remaining = [args.requests] if args.requests else None
+
+    def next_request() -> Optional[Tuple[str, str, str, Any]]:
+        if remaining is not None:
+            if remaining[0] <= 0:
+                return None
+            remaining[0] -= 1
+        elif time.perf_counter() >= deadline:
+            return None
+        name = rng.choices(names, weights)[0]
+        repo = str(rng.choice(repos))
+        if name == "health":
+            return name, "GET", "/health", None
+        if name == "analyze":
+            return name, "POST", "/analyze", {"repoPath": repo}
+        if name == "solve":
+            return name, "POST", "/solve", {"repoPath": repo, "choices": rng.choice(SOLVE_CHOICES), "analysis": analyses[repo]}
+        raise SystemExit(f"unknown endpoint in --mix: {name}")
+
+    async def worker():
+        client = make_client()
+        try:
+            while True:
+                req = next_request()
+                if req is None:
+                    return
+                name, method, path, payload = req
+                t0 = time.perf_counter()
+                try:
+                    status, _ = await client.request(method, path, payload)
+                    ok = 200 <= status < 300
+                except Exception:
+                    ok = False
+                lat[name].append((time.perf_counter() - t0) * 1000)
+                if not ok:
+                    errs[name] += 1
+        finally:
+            await client.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - t0
+    tmp.cleanup()
+
+    all_lat = [x for v in lat.values() for x in v]
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "target": target,
+            "concurrency": args.concurrency,
+            "duration_s": round(wall, 2),
+            "mix": args.mix,
+            "repos": args.repos,
+            "deps": args.deps,
+            "ros_packages": args.ros_packages,
+        },
+        "overall": summarize(all_lat, sum(errs.values()), wall),
+        "endpoints": {n: summarize(lat[n], errs[n], wall) for n in names},
+    }
+
+def print_report(rep: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    m = rep["meta"]
+    print(f"target={m['target']} concurrency={m['concurrency']} duration={m['duration_s']}s rev={m['git_rev']}")
+    rows = [("overall", rep["overall"])] + list(rep["endpoints"].items())
+    print(f"  {'endpoint':<10} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6}")
+    for name, s in rows:
+        line = f"  {name:<10} {s['requests']:>7} {s['rps']:>8.1f} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['error_rate'] * 100:>5.1f}%"
+        base = (baseline or {}).get("endpoints", {}).get(name) if name != "overall" else (baseline or {}).get("overall")
+        if base:
+            d_p95 = (s["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100 if base["p95_ms"] else 0.0
+            d_rps = (s["rps"] - base["rps"]) / base["rps"] * 100 if base["rps"] else 0.0
+            line += f"   p95 {d_p95:+.0f}%  rps {d_rps:+.0f}%"
+        print(line)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", help="base URL of a running backend (default: drive the app in-process)")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds (ignored with --requests)")
+    ap.add_argument("--requests", type=int, default=0, help="total requests instead of a duration")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights, e.g. health:1,analyze:3,solve:2")
+    ap.add_argument("--repos", type=int, default=6, help="synthetic repos (half ROS workspaces)")
+    ap.add_argument("--deps", type=int, default=200, help="requirements per Python repo")
+    ap.add_argument("--ros-packages", type=int, default=30, help="packages per ROS workspace")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="write the JSON report here")
+    ap.add_argument("--compare", help="earlier JSON report to diff against")
+    args = ap.parse_args(argv)
+
+    rep = asyncio.run(run_load(args))
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(rep, baseline)
+    if args.out:
+        Path(args.out).write_text(json.dumps(rep, indent=2))
+    return 0 if rep["overall"]["errors"] == 0 else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,8 +3,9 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, List
 
-from rde_backend.models import DependencySummary
-from rde_backend.deps import collect_dependencies
+from rde_backend.models import DependencySummary, Diagnostic
+from rde_backend.deps import RequirementsMemo, collect_dependencies
+from rde_backend.limits import AnalysisLimits
 
 @dataclass
 class PackageAnalysis:
@@ -14,15 +15,25 @@ class PackageAnalysis:
     readme: Optional[Path] = None
     scripts: List[Path] = None
 
-def analyze_package(pkg_root: Path) -> PackageAnalysis:
+def analyze_package(
+    pkg_root: Path,
+    diagnostics: Optional[List[Diagnostic]] = None,
+    req_memo: Optional[RequirementsMemo] = None,
+    manifests_only: bool = False,
+    limits: Optional[AnalysisLimits] = None,
+) -> PackageAnalysis:
     dep_paths = []
+    if manifests_only:
+        # reduced detail (memory budget): just the ROS manifest
+        manifest = pkg_root / "package.xml"
+        dep_paths = [manifest] if manifest.is_file() else []
     # include package.xml + any known dep files inside package root
-    for p in pkg_root.rglob("*"):
+    for p in ([] if manifests_only else pkg_root.rglob("*")):
         if not p.is_file():
             continue
-        if p.name in ("package.xml", "requirements.txt", "pyproject.toml", "environment.yml", "environment.yaml", "Dockerfile", "setup.cfg"):
+        if p.name in ("package.xml", "requirements.txt", "pyproject.toml", "environment.yml", "environment.yaml", "Dockerfile", "setup.cfg", "setup.py"):
             dep_paths.append(p)
-    deps = collect_dependencies(dep_paths)
+    deps = collect_dependencies(dep_paths, diagnostics, req_memo, limits)
     return PackageAnalysis(
         name=pkg_root.name,
         root=pkg_root,
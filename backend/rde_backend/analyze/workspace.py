@@ -1,7 +1,30 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import List, Optional, Dict
+import configparser
+import json
+import os
+import re
+import tomllib
+
+from rde_backend.repo_scan import IGNORE_MARKERS, SKIP_DIRS
+
+# Manifest -> kind, in priority order: when a directory holds several manifests
+# (e.g. a ROS python package with package.xml + setup.py) the first one wins.
+MANIFEST_PRIORITY = [
+    ("package.xml", "ros"),
+    ("pyproject.toml", "python"),
+    ("setup.cfg", "python"),
+    ("setup.py", "python"),
+    ("package.json", "node"),
+]
+MANIFESTS = {name: (rank, kind) for rank, (name, kind) in enumerate(MANIFEST_PRIORITY)}
+
+# A directory below the scan root holding one of these is a separate workspace.
+WORKSPACE_MARKERS = (".catkin_workspace", "colcon.meta", "colcon_defaults.yaml", "pnpm-workspace.yaml")
+
+XML_NAME_RE = re.compile(r"<name>\s*([^<\s]+)\s*</name>")
 
 @dataclass
 class PackageInfo:
@@ -9,6 +32,32 @@ class PackageInfo:
     name: str
     root: Path
     manifest_path: Optional[Path] = None
+    workspace: Optional[Path] = None      # innermost workspace containing the package
+    depth: int = 0
+
+@dataclass
+class PackageIndex:
+    root: Path
+    packages: Dict[Path, PackageInfo] = field(default_factory=dict)   # package root -> info
+    workspaces: List[Path] = field(default_factory=list)              # scan root + nested workspaces
+
+    def get(self, root: Path) -> Optional[PackageInfo]:
+        return self.packages.get(root)
+
+    def owner(self, path: Path) -> Optional[PackageInfo]:
+        """
+        Innermost package containing `path` (a file or directory).
+        """
+        for p in (path, *path.parents):
+            hit = self.packages.get(p)
+            if hit is not None:
+                return hit
+            if p == self.root:
+                break
+        return None
+
+    def list(self, kind: Optional[str] = None) -> List[PackageInfo]:
+        return [p for p in self.packages.values() if kind is None or p.kind == kind]
 
 def is_ros_workspace(root: Path) -> bool:
     # Typical colcon workspace: root/src exists and contains package.xml files
@@ -17,52 +66,80 @@ def is_ros_workspace(root: Path) -> bool:
         return False
     return any(p.name == "package.xml" for p in src.rglob("package.xml"))
 
-def discover_packages(root: Path, max_depth: int = 12) -> List[PackageInfo]:
+def _is_workspace_dir(names: set) -> bool:
+    if any(m in names for m in WORKSPACE_MARKERS):
+        return True
+    # a built colcon/catkin workspace: src/ next to build/ or install/
+    return "src" in names and ("install" in names or "build" in names)
+
+def _manifest_name(manifest: Path, kind: str) -> Optional[str]:
+    try:
+        if manifest.name == "package.xml":
+            m = XML_NAME_RE.search(manifest.read_text(errors="ignore"))
+            return m.group(1) if m else None
+        if manifest.name == "pyproject.toml":
+            data = tomllib.loads(manifest.read_text(errors="ignore"))
+            return (data.get("project") or {}).get("name") or ((data.get("tool") or {}).get("poetry") or {}).get("name")
+        if manifest.name == "setup.cfg":
+            cp = configparser.ConfigParser(interpolation=None, strict=False)
+            cp.read_string(manifest.read_text(errors="ignore"))
+            return cp.get("metadata", "name", fallback=None)
+        if manifest.name == "package.json":
+            return json.loads(manifest.read_text(errors="ignore")).get("name")
+    except Exception:
+        return None
+    return None
+
+def build_package_index(root: Path, max_depth: int = 12) -> PackageIndex:
     """
-    Recursively find recognizable package roots.
-    Priority: ROS package.xml, then Python pyproject/setup.cfg/setup.py, then Node package.json.
+    One os.walk over `root`: skips SKIP_DIRS, hidden dirs and *_IGNORE'd subtrees, stops
+    at max_depth and below ROS packages (colcon does not nest them), and records nested
+    workspaces so each package knows which one it belongs to.
     """
-    pkgs: List[PackageInfo] = []
-
-    # 1) ROS packages (package.xml)
-    for pkg_xml in root.rglob("package.xml"):
-        pkg_root = pkg_xml.parent
-        pkgs.append(PackageInfo(kind="ros", name=pkg_root.name, root=pkg_root, manifest_path=pkg_xml))
-
-    # 2) Python packages
-    for pyproj in root.rglob("pyproject.toml"):
-        pkg_root = pyproj.parent
-        # avoid double counting if this folder is already a ROS package root
-        if any(p.root == pkg_root for p in pkgs):
+    root = root.resolve()
+    idx = PackageIndex(root=root, workspaces=[root])
+    ws_stack: List[Path] = [root]
+    for dirpath, dirnames, filenames in os.walk(root):
+        here = Path(dirpath)
+        rel = here.relative_to(root)
+        depth = len(rel.parts)
+        names = set(filenames)
+        if names.intersection(IGNORE_MARKERS):
+            dirnames[:] = []
             continue
-        pkgs.append(PackageInfo(kind="python", name=pkg_root.name, root=pkg_root, manifest_path=pyproj))
 
-    for setup_cfg in root.rglob("setup.cfg"):
-        pkg_root = setup_cfg.parent
-        if any(p.root == pkg_root for p in pkgs):
-            continue
-        pkgs.append(PackageInfo(kind="python", name=pkg_root.name, root=pkg_root, manifest_path=setup_cfg))
+        while ws_stack[-1] != root and ws_stack[-1] not in here.parents and ws_stack[-1] != here:
+            ws_stack.pop()
+        if depth > 0 and _is_workspace_dir(names | set(dirnames)):
+            idx.workspaces.append(here)
+            ws_stack.append(here)
 
-    for setup_py in root.rglob("setup.py"):
-        pkg_root = setup_py.parent
-        if any(p.root == pkg_root for p in pkgs):
-            continue
-        pkgs.append(PackageInfo(kind="python", name=pkg_root.name, root=pkg_root, manifest_path=setup_py))
+        found = [n for n in filenames if n in MANIFESTS]
+        if found:
+            manifest = min(found, key=lambda n: MANIFESTS[n][0])
+            kind = MANIFESTS[manifest][1]
+            mp = here / manifest
+            idx.packages[here] = PackageInfo(
+                kind=kind,
+                name=_manifest_name(mp, kind) or here.name,
+                root=here,
+                manifest_path=mp,
+                workspace=ws_stack[-1],
+                depth=depth,
+            )
+            if kind == "ros":
+                dirnames[:] = []
+                continue
 
-    # 3) Node packages
-    for pkg_json in root.rglob("package.json"):
-        pkg_root = pkg_json.parent
-        if any(p.root == pkg_root for p in pkgs):
+        if depth >= max_depth:
+            dirnames[:] = []
             continue
-        pkgs.append(PackageInfo(kind="node", name=pkg_root.name, root=pkg_root, manifest_path=pkg_json))
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith("."))
+    return idx
 
-    # Deduplicate by root (keep first)
-    seen = set()
-    unique: List[PackageInfo] = []
-    for p in pkgs:
-        if str(p.root) in seen:
-            continue
-        seen.add(str(p.root))
-        unique.append(p)
-
-    return unique
+def discover_packages(root: Path, max_depth: int = 12) -> List[PackageInfo]:
+    """
+    Recognizable package roots under `root`, one per directory.
+    Priority: ROS package.xml, then Python pyproject/setup.cfg/setup.py, then Node package.json.
+    """
+    return build_package_index(root, max_depth).list()
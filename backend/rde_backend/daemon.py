@@ -0,0 +1,233 @@
+# backend/rde_backend/daemon.py
+from __future__ import annotations
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, Optional
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import urllib.request
+
+from .paths import cache_dir
+
+# Daemon mode (`python -m rde_backend --daemon`): one backend per user, shared by every
+# editor window, so warm caches (solve/lock memos, rosdep and setup.py indexes, the env
+# store) survive across windows. A lockfile makes startup race-free: the loser of the
+# race exits and clients read the winner's discovery file (url + pid). The daemon binds
+# a free port, and exits after RDE_DAEMON_IDLE_S without requests.
+#
+# Heavy endpoints go through FairScheduler: at most RDE_DAEMON_WORKERS run at once and
+# waiting requests are served round-robin per repo, so one workspace queueing a solve
+# matrix cannot starve another window's /analyze.
+
+IDLE_ENV = "RDE_DAEMON_IDLE_S"
+WORKERS_ENV = "RDE_DAEMON_WORKERS"
+DEFAULT_IDLE_S = 1800.0
+
+LOCK_NAME = "daemon.lock"
+DISCOVERY_NAME = "daemon.json"
+LOG_NAME = "daemon.log"
+
+log = logging.getLogger(__name__)
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, "") or default)
+    except ValueError:
+        return default
+
+def daemon_dir() -> Path:
+    return cache_dir("daemon")
+
+def read_discovery() -> Optional[Dict[str, Any]]:
+    try:
+        info = json.loads((daemon_dir() / DISCOVERY_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+    return info if isinstance(info, dict) and info.get("url") else None
+
+def _write_discovery(info: Dict[str, Any]) -> None:
+    p = daemon_dir() / DISCOVERY_NAME
+    tmp = p.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(info, indent=2))
+    os.replace(tmp, p)
+
+def _remove_discovery(pid: int) -> None:
+    info = read_discovery()
+    if info and info.get("pid") == pid:
+        try:
+            (daemon_dir() / DISCOVERY_NAME).unlink()
+        except OSError:
+            pass
+
+def _try_lock(path: Path):
+    """
+    Exclusive, non-blocking lock held for the daemon's lifetime (released by the OS
+    if the process dies). None when another daemon holds it.
+    """
+    f = open(path, "a+")
+    try:
+        try:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:  # Windows
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+def is_healthy(url: str, pid: Optional[int] = None, timeout_s: float = 1.0) -> bool:
+    try:
+        with urllib.request.urlopen(f"{url}/health", timeout=timeout_s) as r:
+            data = json.loads(r.read())
+    except (OSError, ValueError):
+        return False
+    return data.get("ok") is True and (pid is None or data.get("pid") == pid)
+
+class Activity:
+    """
+    In-flight request count and last-activity time, for the idle shutdown.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.last = time.monotonic()
+        self.started = time.time()
+
+    def begin(self) -> None:
+        with self._lock:
+            self.inflight += 1
+            self.last = time.monotonic()
+
+    def end(self) -> None:
+        with self._lock:
+            self.inflight -= 1
+            self.last = time.monotonic()
+
+    def idle_seconds(self) -> float:
+        with self._lock:
+            return 0.0 if self.inflight else time.monotonic() - self.last
+
+ACTIVITY = Activity()
+
+class ActivityMiddleware:
+    # plain ASGI so streamed /execute responses count as in flight until the last chunk
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        ACTIVITY.begin()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ACTIVITY.end()
+
+class FairScheduler:
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, workers or int(_env_float(WORKERS_ENV, min(4, os.cpu_count() or 1))))
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queues: "OrderedDict[str, Deque[object]]" = OrderedDict()
+        self._granted: set = set()
+        self.served: Dict[str, int] = {}
+
+    @contextmanager
+    def slot(self, repo: str) -> Iterator[None]:
+        """
+        Hold one worker slot for `repo`. Blocks (in the request's threadpool thread)
+        until the slot is handed over.
+        """
+        with self._cond:
+            if self._active < self.workers and not self._queues:
+                self._active += 1
+            else:
+                ticket = object()
+                self._queues.setdefault(repo, deque()).append(ticket)
+                while ticket not in self._granted:
+                    self._cond.wait()
+                self._granted.discard(ticket)
+            self.served[repo] = self.served.get(repo, 0) + 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._release()
+
+    def _release(self) -> None:
+        if not self._queues:
+            self._active -= 1
+            return
+        # round-robin: the repo at the head gets the slot and moves to the back
+        repo, q = next(iter(self._queues.items()))
+        self._granted.add(q.popleft())
+        if q:
+            self._queues.move_to_end(repo)
+        else:
+            del self._queues[repo]
+        self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "active": self._active,
+                "queued": {repo: len(q) for repo, q in self._queues.items()},
+                "served": dict(self.served),
+            }
+
+SCHEDULER = FairScheduler()
+
+def _idle_watch(server, idle_s: float) -> None:
+    while not server.should_exit:
+        time.sleep(min(5.0, max(idle_s / 4, 0.05)))
+        if ACTIVITY.idle_seconds() >= idle_s:
+            log.info("idle for %.0fs, shutting down", idle_s)
+            server.should_exit = True
+
+def run_daemon(app: str, host: str = "127.0.0.1", port: int = 0, idle_s: Optional[float] = None, version: str = "") -> int:
+    """
+    Serve `app` as the shared daemon. Returns without serving (0) when another
+    daemon already holds the lock; its discovery info is printed for the caller.
+    """
+    d = daemon_dir()
+    lock = _try_lock(d / LOCK_NAME)
+    if lock is None:
+        print(json.dumps(read_discovery() or {"starting": True}), flush=True)
+        return 0
+
+    import uvicorn
+
+    # uvicorn only configures its own loggers; give ours (daemon, store) a handler
+    logging.basicConfig(level=logging.INFO, format="[%(name)s] %(levelname)s: %(message)s")
+    idle_s = idle_s if idle_s is not None else _env_float(IDLE_ENV, DEFAULT_IDLE_S)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    port = sock.getsockname()[1]
+
+    pid = os.getpid()
+    server = uvicorn.Server(uvicorn.Config(app, log_level="info"))
+    _write_discovery({
+        "pid": pid,
+        "url": f"http://{host}:{port}",
+        "port": port,
+        "version": version,
+        "started_at": time.time(),
+        "idle_timeout_s": idle_s,
+        "log": str(d / LOG_NAME),
+    })
+    threading.Thread(target=_idle_watch, args=(server, idle_s), daemon=True).start()
+    try:
+        server.run(sockets=[sock])
+    finally:
+        _remove_discovery(pid)
+        lock.close()
+    return 0
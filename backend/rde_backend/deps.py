@@ -1,37 +1,165 @@
 # backend/rde_backend/deps.py
 from __future__ import annotations
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import os
 import re
 import tomllib  # Python 3.11+. If you’re on 3.10, use 'tomli' instead.
 import yaml
 from .ros_deps import parse_package_xml
+from .setup_deps import parse_setup_cfg, parse_setup_py
 
-from .models import NormalizedDep, Evidence, DependencySummary
+from .models import NormalizedDep, Evidence, DependencySummary, Diagnostic
+from .limits import AnalysisLimits
 
 REQ_LINE_RE = re.compile(r"^\s*([A-Za-z0-9_.\-]+)\s*([<>=!~].+)?\s*$")
 
-def parse_requirements_txt(p: Path) -> List[NormalizedDep]:
-    deps: List[NormalizedDep] = []
-    lines = p.read_text(errors="ignore").splitlines()
-    for idx, line in enumerate(lines, start=1):
+# Limits for line-streamed dependency files (generated dumps, vendored Dockerfiles).
+MAX_FILE_BYTES_ENV = "RDE_MAX_DEP_FILE_BYTES"
+MAX_LINE_CHARS_ENV = "RDE_MAX_LINE_CHARS"
+DEFAULT_MAX_FILE_BYTES = 8 * 1024 * 1024
+DEFAULT_MAX_LINE_CHARS = 16 * 1024
+
+def _limit(env: str, default: int) -> int:
+    try:
+        return int(os.environ.get(env, default))
+    except ValueError:
+        return default
+
+def iter_lines(p: Path, diagnostics: Optional[List[Diagnostic]] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (line_no, line) one line at a time. Files over the size limit are skipped and
+    over-long lines are dropped, each with a diagnostic instead of being read into memory.
+    """
+    max_bytes = _limit(MAX_FILE_BYTES_ENV, DEFAULT_MAX_FILE_BYTES)
+    max_line = _limit(MAX_LINE_CHARS_ENV, DEFAULT_MAX_LINE_CHARS)
+    size = p.stat().st_size
+    if size > max_bytes:
+        if diagnostics is not None:
+            diagnostics.append(Diagnostic(
+                level="warn",
+                code="DEP_FILE_TOO_LARGE",
+                message=f"Skipped {p} ({size} bytes > {max_bytes}; raise {MAX_FILE_BYTES_ENV} to parse it).",
+                evidence=Evidence(source=str(p), location=str(p.name)),
+            ))
+        return
+    with open(p, "rb") as f:
+        idx = 0
+        while True:
+            raw = f.readline(max_line + 1)
+            if not raw:
+                return
+            idx += 1
+            if len(raw) > max_line and not raw.endswith(b"\n"):
+                # drain the rest of the line without keeping it
+                while raw and not raw.endswith(b"\n"):
+                    raw = f.readline(max_line + 1)
+                if diagnostics is not None:
+                    diagnostics.append(Diagnostic(
+                        level="warn",
+                        code="DEP_LINE_TOO_LONG",
+                        message=f"Skipped {p.name}:{idx} (longer than {max_line} chars; see {MAX_LINE_CHARS_ENV}).",
+                        evidence=Evidence(source=str(p), location=f"{p.name}:{idx}"),
+                    ))
+                continue
+            yield idx, raw.decode("utf-8", errors="ignore").rstrip("\r\n")
+
+REQ_INCLUDE_RE = re.compile(r"^(-r|--requirement|-c|--constraint)(?:\s*=\s*|\s+|(?<=^-r)|(?<=^-c))(\S+)")
+
+@dataclass
+class RequirementsFile:
+    entries: List[Tuple[int, str, Optional[str], str]] = field(default_factory=list)  # (line, name, spec, excerpt)
+    includes: List[Tuple[str, str, int]] = field(default_factory=list)                # ("r"|"c", target, line)
+
+# resolved path -> parsed file; shared across one analysis so a base file
+# included by many packages is read once
+RequirementsMemo = Dict[Path, RequirementsFile]
+
+def read_requirements_file(p: Path, diagnostics: Optional[List[Diagnostic]] = None) -> RequirementsFile:
+    rf = RequirementsFile()
+    for idx, line in iter_lines(p, diagnostics):
         s = line.strip()
-        if not s or s.startswith("#") or s.startswith("-r") or s.startswith("--"):
+        # `pkg==1.0 \` followed by `--hash=...` lines (uv/pip-compile output)
+        if s.endswith("\\"):
+            s = s[:-1].rstrip()
+        if not s or s.startswith("#"):
+            continue
+        inc = REQ_INCLUDE_RE.match(s)
+        if inc:
+            rf.includes.append(("c" if inc.group(1) in ("-c", "--constraint") else "r", inc.group(2), idx))
+            continue
+        if s.startswith("-"):
             continue
         m = REQ_LINE_RE.match(s)
         if not m:
             continue
-        name = m.group(1)
-        spec = (m.group(2) or "").strip() or None
-        deps.append(
-            NormalizedDep(
+        rf.entries.append((idx, m.group(1), (m.group(2) or "").strip() or None, line.strip()[:200]))
+    return rf
+
+def parse_requirements_tree(
+    p: Path,
+    diagnostics: Optional[List[Diagnostic]] = None,
+    memo: Optional[RequirementsMemo] = None,
+) -> Tuple[List[NormalizedDep], List[NormalizedDep]]:
+    """
+    (requirements, constraints) for `p` with -r/-c includes expanded recursively.
+    Includes resolve relative to the including file, as pip does; cycles are reported
+    and cut, and a file reached twice (diamond includes) contributes once.
+    """
+    memo = memo if memo is not None else {}
+    deps: List[NormalizedDep] = []
+    constraints: List[NormalizedDep] = []
+    seen: Set[Tuple[Path, bool]] = set()
+
+    def visit(f: Path, as_constraint: bool, stack: Tuple[Path, ...]):
+        key = f.resolve()
+        if key in stack:
+            if diagnostics is not None:
+                chain = " -> ".join(x.name for x in stack + (key,))
+                diagnostics.append(Diagnostic(
+                    level="warn",
+                    code="REQ_INCLUDE_CYCLE",
+                    message=f"Requirements include cycle: {chain}",
+                    evidence=Evidence(source=str(f), location=f.name),
+                ))
+            return
+        # a file can legitimately be reached once as requirements and once as constraints
+        if (key, as_constraint) in seen:
+            return
+        seen.add((key, as_constraint))
+        rf = memo.get(key)
+        if rf is None:
+            rf = memo[key] = read_requirements_file(f, diagnostics)
+        # relative to the top-level file, so it reads "requirements.txt" like other
+        # manifests while same-named includes (reqs/base.txt, base.txt) stay distinct
+        source = os.path.relpath(f, p.parent)
+        out = constraints if as_constraint else deps
+        for idx, name, spec, excerpt in rf.entries:
+            out.append(NormalizedDep(
                 kind="pip",
                 name=name,
                 spec=spec,
-                evidence=Evidence(source=str(p.name), location=f"{p.name}:{idx}", excerpt=line.strip()[:200]),
-            )
-        )
-    return deps
+                evidence=Evidence(source=source, location=f"{source}:{idx}", excerpt=excerpt),
+            ))
+        for kind, target, idx in rf.includes:
+            inc = Path(os.path.normpath(f.parent / target))
+            if not inc.is_file():
+                if diagnostics is not None:
+                    diagnostics.append(Diagnostic(
+                        level="warn",
+                        code="REQ_INCLUDE_MISSING",
+                        message=f"{f.name}:{idx} includes {target}, which does not exist.",
+                        evidence=Evidence(source=source, location=f"{source}:{idx}"),
+                    ))
+                continue
+            visit(inc, as_constraint or kind == "c", stack + (key,))
+
+    visit(p, False, ())
+    return deps, constraints
+
+def parse_requirements_txt(p: Path, diagnostics: Optional[List[Diagnostic]] = None) -> List[NormalizedDep]:
+    return parse_requirements_tree(p, diagnostics)[0]
 
 def parse_pyproject_toml(p: Path) -> List[NormalizedDep]:
     deps: List[NormalizedDep] = []
@@ -116,36 +244,119 @@ def parse_environment_yml(p: Path) -> List[NormalizedDep]:
                 )
     return deps
 
-def parse_dockerfile_apt(p: Path) -> List[NormalizedDep]:
+DOCKER_ESCAPE_RE = re.compile(r"^#\s*escape\s*=\s*([\\`])\s*$", re.IGNORECASE)
+SHELL_SEPARATORS = {"&&", "||", ";", "|"}
+# apt options that consume the following token
+APT_OPTS_WITH_ARG = {"-o", "--option", "-c", "--config-file", "-t", "--target-release"}
+
+def iter_dockerfile_instructions(
+    p: Path, diagnostics: Optional[List[Diagnostic]] = None
+) -> Iterator[Tuple[int, int, str]]:
+    """
+    Yield (first_line, last_line, instruction) with escape-char continuations joined
+    and comment and empty lines inside a continuation dropped, as docker does.
+    """
+    escape = "\\"
+    parts: List[str] = []
+    first = 0
+    directives = True
+    for idx, line in iter_lines(p, diagnostics):
+        s = line.strip()
+        if directives:
+            m = DOCKER_ESCAPE_RE.match(s)
+            if m:
+                escape = m.group(1)
+                continue
+            if not s.startswith("#") or "=" not in s:
+                directives = False
+        if not parts and (not s or s.startswith("#")):
+            continue
+        if parts and (not s or s.startswith("#")):
+            continue
+        if not parts:
+            first = idx
+        if s.endswith(escape):
+            parts.append(s[:-1])
+            continue
+        parts.append(s)
+        yield first, idx, " ".join(x.strip() for x in parts if x.strip())
+        parts = []
+    if parts:
+        yield first, idx, " ".join(x.strip() for x in parts if x.strip())
+
+def _apt_install_packages(tokens: List[str]) -> List[str]:
+    pkgs: List[str] = []
+    i = 0
+    while i < len(tokens):
+        if tokens[i] not in ("apt-get", "apt"):
+            i += 1
+            continue
+        # `install` must be this command's subcommand, not a later command's
+        end = i + 1
+        while end < len(tokens) and tokens[end] not in SHELL_SEPARATORS:
+            end += 1
+        if "install" in tokens[i + 1:end]:
+            j = tokens.index("install", i + 1, end) + 1
+            while j < end:
+                t = tokens[j]
+                if t in APT_OPTS_WITH_ARG:
+                    j += 2
+                    continue
+                if not t.startswith("-") and "$" not in t:
+                    pkgs.append(t)
+                j += 1
+        i = end + 1
+    return pkgs
+
+def parse_dockerfile_apt(p: Path, diagnostics: Optional[List[Diagnostic]] = None) -> List[NormalizedDep]:
     deps: List[NormalizedDep] = []
-    lines = p.read_text(errors="ignore").splitlines()
-    for idx, line in enumerate(lines, start=1):
-        low = line.lower()
-        if "apt-get" in low and "install" in low:
-            # naive tokenization: capture packages after 'install'
-            # handles: RUN apt-get update && apt-get install -y pkg1 pkg2
-            parts = re.split(r"\s+", line.strip())
-            if "install" in parts:
-                j = parts.index("install")
-                pkgs = [t for t in parts[j+1:] if not t.startswith("-") and t not in ["&&", "\\"]]
-                for pkg in pkgs:
-                    deps.append(
-                        NormalizedDep(
-                            kind="apt",
-                            name=pkg,
-                            spec=None,
-                            evidence=Evidence(source=str(p.name), location=f"{p.name}:{idx}", excerpt=line.strip()[:200]),
-                        )
-                    )
+    for first, last, instr in iter_dockerfile_instructions(p, diagnostics):
+        low = instr.lower()
+        if not low.startswith("run ") or "install" not in low:
+            continue
+        # separators glued to words ("pkg;") still split the command
+        tokens = re.sub(r"(&&|\|\||;|\|)", r" \1 ", instr[4:]).split()
+        loc = f"{p.name}:{first}" if first == last else f"{p.name}:{first}-{last}"
+        for pkg in _apt_install_packages(tokens):
+            name, _, version = pkg.partition("=")
+            deps.append(
+                NormalizedDep(
+                    kind="apt",
+                    name=name,
+                    spec=f"={version}" if version else None,
+                    evidence=Evidence(source=str(p.name), location=loc, excerpt=instr[:200]),
+                )
+            )
     return deps
 
-def collect_dependencies(dep_paths: List[Path]) -> DependencySummary:
+def strip_excerpts(summary: DependencySummary) -> None:
+    # memory-budget degradation: evidence keeps source/location only
+    for deps in (summary.pip, summary.conda, summary.apt, summary.ros, summary.pip_constraints):
+        for d in deps:
+            d.evidence.excerpt = None
+
+def collect_dependencies(
+    dep_paths: List[Path],
+    diagnostics: Optional[List[Diagnostic]] = None,
+    req_memo: Optional[RequirementsMemo] = None,
+    limits: Optional[AnalysisLimits] = None,
+    always: int = 0,
+) -> DependencySummary:
+    """
+    Parse every dep file into one summary. With limits, stops at the deadline; the
+    first `always` paths (root dep files) are parsed regardless.
+    """
     summary = DependencySummary()
-    for p in dep_paths:
+    for i, p in enumerate(dep_paths):
+        if limits is not None and i >= always and limits.expired():
+            limits.truncate("dependencies", "deadline", i, len(dep_paths))
+            break
         name = p.name.lower()
         try:
             if name == "requirements.txt":
-                summary.pip.extend(parse_requirements_txt(p))
+                reqs, cons = parse_requirements_tree(p, diagnostics, req_memo)
+                summary.pip.extend(reqs)
+                summary.pip_constraints.extend(cons)
             elif name == "pyproject.toml":
                 summary.pip.extend(parse_pyproject_toml(p))
             elif name in ("environment.yml", "environment.yaml"):
@@ -156,10 +367,13 @@ def collect_dependencies(dep_paths: List[Path]) -> DependencySummary:
                     elif d.kind == "pip":
                         summary.pip.append(d)
             elif name == "dockerfile":
-                summary.apt.extend(parse_dockerfile_apt(p))
+                summary.apt.extend(parse_dockerfile_apt(p, diagnostics))
             elif name == "package.xml":
                 summary.ros.extend(parse_package_xml(p))
-            # setup.cfg needs to be done later
+            elif name == "setup.cfg":
+                summary.pip.extend(parse_setup_cfg(p))
+            elif name == "setup.py":
+                summary.pip.extend(parse_setup_py(p))
         except Exception:
             # keep analysis robust; never crash on a parser
             continue
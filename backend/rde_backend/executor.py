@@ -0,0 +1,328 @@
+# backend/rde_backend/executor.py
+from __future__ import annotations
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import os
+import re
+import signal
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .models import PlanStep
+
+# Runs a plan as a DAG: steps start as soon as their depends_on are done, at most
+# `max_parallel` at a time, and steps sharing a lock_group (apt/dpkg, one venv's pip)
+# never overlap. Progress is yielded as plain dict events for NDJSON streaming.
+#
+# Only plans this process produced are run: /solve registers each plan under a content
+# hash and /execute takes that id, so no shell command ever comes from a request body.
+
+# Rough defaults when a step carries no est_seconds (dry-run only).
+DEFAULT_EST_SECONDS = {"env": 30.0, "ros": 60.0, "validate": 5.0, "misc": 10.0}
+
+# These only make sense in the user's interactive terminal; each executor step
+# gets a fresh shell, so running them would be a no-op at best. They are reported
+# (a "session" event) instead of run.
+SESSION_ONLY_PREFIXES = ("source ", ". ", "conda activate", "mamba activate", "micromamba activate")
+
+# steps run without a tty or stdin, so sudo can't prompt for a password: such steps are
+# handed back to the client (a "terminal" event) to run in the user's terminal
+SUDO_RE = re.compile(r"(?:^|[;&|(]\s*)sudo\b")
+
+MAX_ISSUED_PLANS = 256
+
+_ISSUED: "OrderedDict[str, Tuple[str, List[PlanStep]]]" = OrderedDict()
+_ISSUED_LOCK = threading.Lock()
+
+def register_plan(repo_path: str, steps: List[PlanStep]) -> str:
+    """
+    Remember a plan handed to a client; returns its id (stable for identical plans).
+    """
+    blob = json.dumps([repo_path, [s.model_dump() for s in steps]], sort_keys=True)
+    pid = hashlib.sha256(blob.encode()).hexdigest()[:32]
+    with _ISSUED_LOCK:
+        _ISSUED[pid] = (repo_path, list(steps))
+        _ISSUED.move_to_end(pid)
+        while len(_ISSUED) > MAX_ISSUED_PLANS:
+            _ISSUED.popitem(last=False)
+    return pid
+
+def issued_plan(plan_id: str) -> Optional[Tuple[str, List[PlanStep]]]:
+    """
+    (repo path, steps) of a registered plan, or None if unknown or evicted.
+    """
+    with _ISSUED_LOCK:
+        return _ISSUED.get(plan_id)
+
+def needs_terminal(step: PlanStep) -> bool:
+    return any(SUDO_RE.search(cmd.strip()) for cmd in step.commands)
+
+def unconfirmed(steps: List[PlanStep], only: Optional[List[str]], confirmed: List[str]) -> List[str]:
+    """
+    Ids of selected steps that require confirmation but weren't confirmed.
+    """
+    selected = set(only) if only else None
+    return [sid for sid, s in zip(_ids(steps), steps) if s.requires_confirmation and sid not in confirmed and (selected is None or sid in selected)]
+
+def _ids(steps: List[PlanStep]) -> List[str]:
+    # steps from older builders may lack ids: fall back to their position
+    return [s.id or f"step{i + 1}" for i, s in enumerate(steps)]
+
+def plan_graph(steps: List[PlanStep]) -> Tuple[Dict[str, PlanStep], Dict[str, List[str]]]:
+    """
+    Validate the plan and return (id -> step, id -> deps). Raises ValueError on
+    duplicate ids, unknown dependencies or cycles.
+    """
+    by_id: Dict[str, PlanStep] = {}
+    for sid, s in zip(_ids(steps), steps):
+        if sid in by_id:
+            raise ValueError(f"duplicate step id: {sid}")
+        by_id[sid] = s
+    deps = {sid: list(s.depends_on) for sid, s in by_id.items()}
+    for sid, ds in deps.items():
+        for d in ds:
+            if d not in by_id:
+                raise ValueError(f"step {sid} depends on unknown step {d}")
+    topo_order(deps)
+    return by_id, deps
+
+def topo_order(deps: Dict[str, List[str]]) -> List[str]:
+    indeg = {n: len(ds) for n, ds in deps.items()}
+    rev: Dict[str, List[str]] = {n: [] for n in deps}
+    for n, ds in deps.items():
+        for d in ds:
+            rev[d].append(n)
+    ready = [n for n in deps if indeg[n] == 0]
+    out: List[str] = []
+    while ready:
+        n = ready.pop(0)
+        out.append(n)
+        for m in rev[n]:
+            indeg[m] -= 1
+            if indeg[m] == 0:
+                ready.append(m)
+    if len(out) != len(deps):
+        raise ValueError("plan has a dependency cycle: " + ", ".join(sorted(set(deps) - set(out))))
+    return out
+
+def estimate(step: PlanStep) -> float:
+    if step.est_seconds is not None:
+        return float(step.est_seconds)
+    if not step.commands:
+        return 0.0
+    return DEFAULT_EST_SECONDS.get(step.kind, 10.0)
+
+def dry_run(steps: List[PlanStep], max_parallel: int = 4) -> Dict[str, Any]:
+    """
+    Simulate the schedule with estimated durations: critical path (infinite workers),
+    simulated makespan under max_parallel + lock groups, and the sequential total.
+    """
+    by_id, deps = plan_graph(steps)
+    order = topo_order(deps)
+    dur = {sid: estimate(by_id[sid]) for sid in order}
+
+    finish: Dict[str, float] = {}
+    prev: Dict[str, Optional[str]] = {}
+    for sid in order:
+        start, via = 0.0, None
+        for d in deps[sid]:
+            if finish[d] > start:
+                start, via = finish[d], d
+        finish[sid] = start + dur[sid]
+        prev[sid] = via
+    end = max(finish, key=lambda k: finish[k]) if finish else None
+    path: List[str] = []
+    while end is not None:
+        path.append(end)
+        end = prev[end]
+    path.reverse()
+
+    # list scheduling with the same rules as the real executor
+    done_at: Dict[str, float] = {}
+    running: List[Tuple[float, str]] = []
+    lock_free_at: Dict[str, float] = {}
+    pending = list(order)
+    now = 0.0
+    schedule: List[Dict[str, Any]] = []
+    while pending or running:
+        started = True
+        while started and len(running) < max(1, max_parallel):
+            started = False
+            for sid in pending:
+                st = by_id[sid]
+                if any(d not in done_at or done_at[d] > now for d in deps[sid]):
+                    continue
+                if st.lock_group and lock_free_at.get(st.lock_group, 0.0) > now:
+                    continue
+                t_end = now + dur[sid]
+                running.append((t_end, sid))
+                if st.lock_group:
+                    lock_free_at[st.lock_group] = t_end
+                done_at[sid] = t_end
+                schedule.append({"id": sid, "start": round(now, 2), "end": round(t_end, 2)})
+                pending.remove(sid)
+                started = True
+                break
+        if not running:
+            break
+        running.sort()
+        now = running.pop(0)[0]
+
+    sequential = sum(dur.values())
+    makespan = max(done_at.values(), default=0.0)
+    return {
+        "dry_run": True,
+        "sequential_seconds": round(sequential, 2),
+        "critical_path_seconds": round(finish[path[-1]], 2) if path else 0.0,
+        "critical_path": path,
+        "scheduled_seconds": round(makespan, 2),
+        "max_parallel": max_parallel,
+        "schedule": schedule,
+    }
+
+def _terminate(proc: "asyncio.subprocess.Process") -> None:
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGTERM)
+        else:
+            proc.terminate()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+async def _run_step(sid: str, step: PlanStep, cwd: str, queue: "asyncio.Queue[Dict[str, Any]]") -> bool:
+    for cmd in step.commands:
+        if cmd.strip().startswith(SESSION_ONLY_PREFIXES):
+            await queue.put({"event": "session", "id": sid, "command": cmd})
+            continue
+        await queue.put({"event": "output", "id": sid, "line": f"$ {cmd}"})
+        proc = await asyncio.create_subprocess_exec(
+            "bash", "-c", cmd,
+            cwd=cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            stdin=asyncio.subprocess.DEVNULL,
+            env={**os.environ, "DEBIAN_FRONTEND": "noninteractive"},
+            # own process group, so cancelling also stops what the shell started
+            start_new_session=True,
+        )
+        assert proc.stdout is not None
+        try:
+            async for raw in proc.stdout:
+                await queue.put({"event": "output", "id": sid, "line": raw.decode(errors="replace").rstrip("\n")})
+            code = await proc.wait()
+        except asyncio.CancelledError:
+            _terminate(proc)
+            await proc.wait()
+            raise
+        if code != 0:
+            await queue.put({"event": "output", "id": sid, "line": f"(exit {code})"})
+            return False
+    return True
+
+async def execute_plan(
+    steps: List[PlanStep],
+    cwd: str,
+    max_parallel: int = 4,
+    only: Optional[List[str]] = None,
+    stop: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Execute the plan DAG, yielding start/output/end/skip/session/terminal events and a
+    final summary.
+    A failed step blocks its transitive dependents; independent branches continue.
+    Steps that need sudo aren't run: a "terminal" event carries their commands, and
+    their dependents are skipped as for a failure.
+    When stop() turns true (client gone) or the generator is closed, running steps
+    and their processes are cancelled.
+    """
+    by_id, deps = plan_graph(steps)
+    selected: Set[str] = set(only) if only else set(by_id)
+    # dependencies outside the selection are treated as already satisfied
+    deps = {sid: [d for d in ds if d in selected] for sid, ds in deps.items() if sid in selected}
+
+    sem = asyncio.Semaphore(max(1, max_parallel))
+    locks: Dict[str, asyncio.Lock] = {}
+    queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    done: Dict[str, asyncio.Event] = {sid: asyncio.Event() for sid in deps}
+    ok: Dict[str, bool] = {}
+    skipped: Set[str] = set()
+    terminal: Set[str] = set()
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+
+    async def worker(sid: str):
+        try:
+            for d in deps[sid]:
+                await done[d].wait()
+            failed = [d for d in deps[sid] if not ok.get(d)]
+            if failed:
+                ok[sid] = False
+                skipped.add(sid)
+                held = [d for d in failed if d in terminal]
+                reason = f"run {', '.join(held)} in a terminal first" if held else f"dependency failed: {', '.join(failed)}"
+                await queue.put({"event": "skip", "id": sid, "reason": reason})
+                return
+            step = by_id[sid]
+            if needs_terminal(step):
+                ok[sid] = False
+                terminal.add(sid)
+                await queue.put({"event": "terminal", "id": sid, "title": step.title, "commands": list(step.commands), "reason": "needs sudo, which can't prompt here; run it in a terminal"})
+                return
+            lock = locks.setdefault(step.lock_group, asyncio.Lock()) if step.lock_group else None
+            # take the lock group before a worker slot so waiting steps don't hog slots
+            if lock is not None:
+                await lock.acquire()
+            async with sem:
+                try:
+                    start = time.perf_counter()
+                    await queue.put({"event": "start", "id": sid, "title": step.title, "t": round(start - t0, 3)})
+                    try:
+                        ok[sid] = await _run_step(sid, step, cwd, queue)
+                    except Exception as e:
+                        await queue.put({"event": "output", "id": sid, "line": f"(error) {e}"})
+                        ok[sid] = False
+                    timings[sid] = time.perf_counter() - start
+                    await queue.put({
+                        "event": "end",
+                        "id": sid,
+                        "ok": ok[sid],
+                        "seconds": round(timings[sid], 3),
+                        "t": round(time.perf_counter() - t0, 3),
+                    })
+                finally:
+                    if lock is not None:
+                        lock.release()
+        finally:
+            done[sid].set()
+
+    tasks = [asyncio.create_task(worker(sid)) for sid in deps]
+    all_done = asyncio.gather(*tasks)
+    try:
+        while not all_done.done() or not queue.empty():
+            try:
+                ev = await asyncio.wait_for(queue.get(), timeout=0.1)
+            except asyncio.TimeoutError:
+                if stop is not None and await stop():
+                    return
+                continue
+            yield ev
+        await all_done
+    finally:
+        if not all_done.done():
+            all_done.cancel()
+            await asyncio.gather(all_done, return_exceptions=True)
+
+    wall = time.perf_counter() - t0
+    yield {
+        "event": "summary",
+        "ok": all(ok.get(sid, False) for sid in deps),
+        "wall_seconds": round(wall, 3),
+        "sequential_seconds": round(sum(timings.values()), 3),
+        "failed": sorted(sid for sid in deps if ok.get(sid) is False and sid not in skipped and sid not in terminal),
+        "skipped": sorted(skipped),
+        "terminal": sorted(terminal),
+        "timings": {k: round(v, 3) for k, v in timings.items()},
+    }
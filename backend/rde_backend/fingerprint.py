@@ -1,11 +1,30 @@
 # backend/rde_backend/fingerprint.py
 from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import os
 import platform
+import re
 import shutil
 import subprocess
-from typing import Dict, List, Optional
 
-from .models import Fingerprint
+from .models import Fingerprint, GpuInfo
+
+# GPU details come from `nvidia-smi --query-gpu` (driver, compute capability) plus the
+# plain `nvidia-smi` banner (the highest CUDA the driver supports). RDE_NVIDIA_SMI_FIXTURE
+# points at a recorded output dir (see backend/tests/fixtures/nvidia-smi/) to replay a
+# machine's GPU setup on one without a GPU.
+NVIDIA_SMI_FIXTURE_ENV = "RDE_NVIDIA_SMI_FIXTURE"
+GPU_QUERY_FIELDS = "name,driver_version,compute_cap,memory.total"
+# compute_cap needs driver >= 510; older ones reject the whole query
+GPU_QUERY_FIELDS_LEGACY = "name,driver_version,memory.total"
+
+CUDA_BANNER_RE = re.compile(r"CUDA Version:\s*([0-9]+\.[0-9]+)")
+NVCC_RE = re.compile(r"release\s+([0-9]+\.[0-9]+)")
+
+# compiler launchers, linkers and generators the ROS build stage can use
+BUILD_TOOLS = ("ccache", "sccache", "mold", "ld.lld", "ninja", "gcc", "clang")
+TOOL_VERSION_RE = re.compile(r"(\d+\.\d+(?:\.\d+)?)")
 
 def _run(cmd: List[str]) -> bool:
     try:
@@ -14,6 +33,82 @@ def _run(cmd: List[str]) -> bool:
     except Exception:
         return False
 
+def _output(cmd: List[str], timeout_s: float = 10.0) -> Optional[str]:
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout_s)
+    except Exception:
+        return None
+    return proc.stdout if proc.returncode == 0 else None
+
+def parse_gpu_query(text: str) -> Tuple[Optional[str], List[GpuInfo]]:
+    """
+    (driver version, GPUs) from `nvidia-smi --query-gpu=<GPU_QUERY_FIELDS or the legacy
+    fields> --format=csv,noheader,nounits`.
+    """
+    driver = None
+    gpus: List[GpuInfo] = []
+    for line in text.splitlines():
+        cols = [c.strip() for c in line.split(",")]
+        if len(cols) not in (3, 4) or not cols[0]:
+            continue
+        cc = cols[2] if len(cols) == 4 else None
+        mem = cols[-1]
+        driver = driver or cols[1] or None
+        gpus.append(GpuInfo(
+            name=cols[0],
+            compute_capability=cc if cc and cc[0].isdigit() else None,
+            memory_mb=int(mem) if mem.isdigit() else None,
+        ))
+    return driver, gpus
+
+def parse_cuda_version(banner: str) -> Optional[str]:
+    m = CUDA_BANNER_RE.search(banner or "")
+    return m.group(1) if m else None
+
+def parse_nvcc_version(text: str) -> Optional[str]:
+    m = NVCC_RE.search(text or "")
+    return m.group(1) if m else None
+
+def probe_nvidia() -> Tuple[bool, Optional[str], Optional[str], List[GpuInfo]]:
+    """
+    (nvidia-smi ran, driver version, driver CUDA version, GPUs).
+    """
+    fixture = os.environ.get(NVIDIA_SMI_FIXTURE_ENV)
+    if fixture:
+        d = Path(fixture)
+        try:
+            query = (d / "query.csv").read_text()
+            banner = (d / "nvidia-smi.txt").read_text()
+        except OSError:
+            return False, None, None, []
+        driver, gpus = parse_gpu_query(query)
+        return True, driver, parse_cuda_version(banner), gpus
+    if not shutil.which("nvidia-smi"):
+        return False, None, None, []
+    banner = _output(["nvidia-smi"])
+    if banner is None:
+        return False, None, None, []
+    query = _output(["nvidia-smi", f"--query-gpu={GPU_QUERY_FIELDS}", "--format=csv,noheader,nounits"])
+    if query is None:
+        query = _output(["nvidia-smi", f"--query-gpu={GPU_QUERY_FIELDS_LEGACY}", "--format=csv,noheader,nounits"]) or ""
+    driver, gpus = parse_gpu_query(query)
+    return True, driver, parse_cuda_version(banner), gpus
+
+def probe_build_tools() -> Dict[str, str]:
+    found: Dict[str, str] = {}
+    for tool in BUILD_TOOLS:
+        if not shutil.which(tool):
+            continue
+        m = TOOL_VERSION_RE.search(_output([tool, "--version"], timeout_s=5.0) or "")
+        found[tool] = m.group(1) if m else ""
+    return found
+
+def _memory_mb() -> Optional[int]:
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None     # Windows
+
 def _python_version(exe: str) -> Optional[str]:
     try:
         out = subprocess.check_output([exe, "--version"], stderr=subprocess.STDOUT, text=True).strip()
@@ -35,9 +130,10 @@ def fingerprint_system() -> Fingerprint:
         if v:
             py_versions[exe] = v
 
-    gpu_present = bool(shutil.which("nvidia-smi"))
-    nvidia_smi_ok = _run(["nvidia-smi"]) if gpu_present else False
-    nvcc_ok = _run(["nvcc", "--version"]) if shutil.which("nvcc") else False
+    nvidia_smi_ok, driver, cuda, gpus = probe_nvidia()
+    gpu_present = nvidia_smi_ok or bool(shutil.which("nvidia-smi"))
+    nvcc_out = _output(["nvcc", "--version"]) if shutil.which("nvcc") else None
+    nvcc_ok = nvcc_out is not None
 
     # WSL availability can be inferred later more precisely; placeholder here
     wsl_available = None
@@ -54,4 +150,11 @@ def fingerprint_system() -> Fingerprint:
         nvidia_smi_ok=nvidia_smi_ok,
         nvcc_ok=nvcc_ok,
         wsl_available=wsl_available,
+        gpu_driver_version=driver,
+        cuda_driver_version=cuda,
+        nvcc_version=parse_nvcc_version(nvcc_out) if nvcc_out else None,
+        gpus=gpus,
+        cpu_count=os.cpu_count(),
+        memory_mb=_memory_mb(),
+        build_tools=probe_build_tools(),
     )
@@ -0,0 +1,280 @@
+# backend/rde_backend/git_files.py
+from __future__ import annotations
+from pathlib import Path
+from collections import deque
+from typing import Callable, List, Optional, Set, Tuple
+import fnmatch
+import os
+import shutil
+import struct
+import subprocess
+
+# Tracked-file enumeration for git repos, so scans never descend into ignored build
+# output. `git ls-files` is used when git is on PATH (it also reports untracked,
+# non-ignored files); otherwise .git/index is parsed directly and the untracked files
+# are added by a walk that honours .gitignore and .git/info/exclude (dirs they exclude
+# are never entered). Callers fall back to a filesystem walk when neither works.
+# Nested repos (vcs-import checkouts under src/) and submodules are reported as
+# "dir/" entries; their files are not in this repo's list and must be listed separately.
+
+GITLINK_MODE = 0o160000
+
+def find_git_dir(path: Path) -> Optional[Tuple[Path, Path]]:
+    """
+    (worktree root, git dir) for the repo containing `path`; follows `.git` files
+    (worktrees, submodules).
+    """
+    for p in (path, *path.parents):
+        dot = p / ".git"
+        if dot.is_dir():
+            return p, dot
+        if dot.is_file():
+            try:
+                line = dot.read_text(errors="ignore").strip()
+            except OSError:
+                return None
+            if line.startswith("gitdir:"):
+                gd = Path(line[len("gitdir:"):].strip())
+                return p, (gd if gd.is_absolute() else (p / gd).resolve())
+            return None
+    return None
+
+def _hash_size(git_dir: Path) -> int:
+    # sha256 repos declare extensions.objectformat; worktrees share the common dir config
+    common = git_dir
+    try:
+        c = (git_dir / "commondir").read_text().strip()
+        common = (git_dir / c).resolve()
+    except OSError:
+        pass
+    try:
+        cfg = (common / "config").read_text(errors="ignore").lower()
+    except OSError:
+        return 20
+    return 32 if "objectformat = sha256" in cfg else 20
+
+def _varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    # git's offset encoding (index v4 path prefix lengths)
+    c = buf[pos]
+    pos += 1
+    val = c & 0x7F
+    while c & 0x80:
+        val += 1
+        c = buf[pos]
+        pos += 1
+        val = (val << 7) + (c & 0x7F)
+    return val, pos
+
+def read_git_index(git_dir: Path) -> Optional[List[str]]:
+    """
+    Paths recorded in .git/index (versions 2-4). None for anything unexpected:
+    missing/locked index, sparse directory entries, unknown versions.
+    """
+    try:
+        buf = (git_dir / "index").read_bytes()
+    except OSError:
+        return None
+    if len(buf) < 12 or buf[:4] != b"DIRC":
+        return None
+    version, count = struct.unpack(">II", buf[4:12])
+    if version not in (2, 3, 4):
+        return None
+    hsz = _hash_size(git_dir)
+    fixed = 40 + hsz + 2          # stat fields, object id, flags
+    pos = 12
+    prev = b""
+    out: List[str] = []
+    try:
+        for _ in range(count):
+            start = pos
+            mode = struct.unpack(">I", buf[pos + 24:pos + 28])[0]
+            flags = struct.unpack(">H", buf[pos + fixed - 2:pos + fixed])[0]
+            pos += fixed
+            if version >= 3 and flags & 0x4000:
+                pos += 2
+            if version == 4:
+                strip, pos = _varint(buf, pos)
+                end = buf.index(b"\0", pos)
+                name = prev[:len(prev) - strip] + buf[pos:end]
+                pos = end + 1
+            else:
+                end = buf.index(b"\0", pos)
+                name = buf[pos:end]
+                # entries are NUL-padded to a multiple of 8 bytes
+                pos = start + ((end - start + 8) // 8) * 8
+            prev = name
+            if name.endswith(b"/"):
+                return None       # sparse index: directories stand in for files
+            path = name.decode("utf-8", errors="surrogateescape")
+            out.append(path + "/" if mode == GITLINK_MODE else path)
+    except (IndexError, ValueError, struct.error):
+        return None
+    return out
+
+# (base dir, pattern, negated, dir only, anchored); base is "" or "a/b/"
+IgnoreRule = Tuple[str, str, bool, bool, bool]
+
+def _ignore_rules(file: Path, base: str) -> List[IgnoreRule]:
+    try:
+        lines = file.read_text(errors="ignore").splitlines()
+    except OSError:
+        return []
+    rules: List[IgnoreRule] = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        neg = line.startswith("!")
+        if neg:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        # a slash anywhere but the end anchors the pattern to the .gitignore's dir
+        anchored = "/" in line
+        if line:
+            rules.append((base, line.lstrip("/"), neg, dir_only, anchored))
+    return rules
+
+def _ignored(rules: List[IgnoreRule], rel: str, is_dir: bool) -> bool:
+    hit = False
+    for base, pat, neg, dir_only, anchored in rules:
+        if (dir_only and not is_dir) or not rel.startswith(base):
+            continue
+        sub = rel[len(base):]
+        if fnmatch.fnmatchcase(sub if anchored else sub.rsplit("/", 1)[-1], pat):
+            hit = not neg    # last matching rule wins
+    return hit
+
+def untracked_files(worktree: Path, git_dir: Path, tracked: Set[str], start: str = "") -> List[str]:
+    """
+    Untracked, non-ignored paths under `start` (a worktree-relative dir), as
+    `git ls-files --others --exclude-standard` would list them: nested repos come
+    back as "dir/" and are not entered.
+    """
+    rules = _ignore_rules(git_dir / "info" / "exclude", "")
+    base = ""
+    for part in [p for p in start.split("/") if p]:
+        rules += _ignore_rules(worktree / base / ".gitignore", base)
+        base += part + "/"
+    out: List[str] = []
+    stack = [(base, rules)]
+    while stack:
+        rel_dir, rules = stack.pop()
+        d = worktree / rel_dir
+        rules = rules + _ignore_rules(d / ".gitignore", rel_dir)
+        try:
+            with os.scandir(d) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        for e in entries:
+            if e.name == ".git":
+                continue
+            rel = rel_dir + e.name
+            try:
+                # git records symlinks as files
+                is_dir = e.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if _ignored(rules, rel, is_dir):
+                continue
+            if not is_dir:
+                if rel not in tracked:
+                    out.append(rel)
+            elif os.path.lexists(os.path.join(e.path, ".git")):
+                if rel + "/" not in tracked:
+                    out.append(rel + "/")
+            else:
+                stack.append((rel + "/", rules))
+    return out
+
+def git_ls_files(worktree: Path, pathspec: Optional[str] = None, timeout_s: float = 20.0) -> Optional[List[str]]:
+    """
+    Paths relative to `worktree`, limited to `pathspec` (a worktree-relative dir).
+    Untracked nested repos come back as "dir/" from git; gitlinks (submodules) are
+    given the same trailing slash.
+    """
+    if shutil.which("git") is None:
+        return None
+    cmd = ["git", "-c", "core.quotepath=off", "ls-files", "-z", "--stage", "--cached", "--others", "--exclude-standard"]
+    if pathspec:
+        cmd += ["--", ":(literal)" + pathspec]
+    try:
+        proc = subprocess.run(cmd, cwd=str(worktree), capture_output=True, timeout=timeout_s)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if proc.returncode != 0:
+        return None
+    out: List[str] = []
+    for entry in proc.stdout.split(b"\0"):
+        if not entry:
+            continue
+        # tracked: "<mode> <object> <stage>\t<path>"; untracked: "<path>"
+        meta, tab, name = entry.partition(b"\t")
+        path = (name if tab else entry).decode("utf-8", errors="surrogateescape")
+        if tab and int(meta.split(b" ", 1)[0], 8) == GITLINK_MODE:
+            path += "/"
+        out.append(path)
+    # unmerged paths are listed once per stage
+    return list(dict.fromkeys(out))
+
+def git_files(path: Path, backend: str = "auto", timeout_s: float = 20.0) -> Optional[Tuple[Path, List[str], str]]:
+    """
+    (worktree root, paths relative to it, backend used) or None for non-git trees
+    and failures. backend: "auto" | "git" (ls-files) | "index" (.git/index only).
+    ls-files is limited to `path`; the index lists the whole worktree, plus the
+    untracked files under `path`.
+    """
+    found = find_git_dir(path)
+    if found is None:
+        return None
+    worktree, git_dir = found
+    if backend in ("auto", "git"):
+        sub = path.relative_to(worktree).as_posix() if path != worktree else None
+        files = git_ls_files(worktree, sub, timeout_s)
+        if files is not None:
+            return worktree, files, "git-ls-files"
+        if backend == "git":
+            return None
+    files = read_git_index(git_dir)
+    if files is None:
+        return None
+    sub = path.relative_to(worktree).as_posix() if path != worktree else ""
+    files += untracked_files(worktree, git_dir, set(files), sub)
+    return worktree, files, "git-index"
+
+def iter_worktree_files(
+    root: Path,
+    skip_dirs,
+    max_files: Optional[int] = None,
+    expired: Optional[Callable[[], bool]] = None,
+) -> List[Path]:
+    """
+    Filesystem fallback: breadth-first scandir with pruning, so skipped trees are
+    never entered and, when max_files/expired() cut the walk short, the shallow
+    files (the ones that matter most) are already in.
+    """
+    out: List[Path] = []
+    dirs = deque([root])
+    while dirs:
+        if expired is not None and expired():
+            break
+        d = dirs.popleft()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        with it:
+            for e in it:
+                try:
+                    if e.is_dir():
+                        # like os.walk: symlinked dirs are not followed
+                        if e.name not in skip_dirs and not e.is_symlink():
+                            dirs.append(e.path)
+                        continue
+                except OSError:
+                    continue
+                out.append(Path(e.path))
+                if max_files is not None and len(out) >= max_files:
+                    return out
+    return out
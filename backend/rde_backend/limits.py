@@ -0,0 +1,47 @@
+# backend/rde_backend/limits.py
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import List, Optional
+import time
+
+from .models import Truncation
+
+# Time/size bounds for one /analyze. A mis-pointed repoPath (home directory, monorepo
+# root) must come back in bounded time: every stage polls `expired()` and stops cleanly,
+# recording a Truncation marker instead of raising. Work is ordered so what matters
+# most (root dep files, root README, shallow files) is done before the limits bite.
+
+@dataclass
+class AnalysisLimits:
+    deadline: Optional[float] = None        # time.monotonic() value
+    max_files: Optional[int] = None
+    max_packages: Optional[int] = None
+    truncated: List[Truncation] = field(default_factory=list)
+
+    @classmethod
+    def from_request(cls, deadline_ms: Optional[int], max_files: Optional[int], max_packages: Optional[int]) -> "AnalysisLimits":
+        return cls(
+            deadline=time.monotonic() + deadline_ms / 1000 if deadline_ms else None,
+            max_files=max_files or None,
+            max_packages=max_packages or None,
+        )
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self, cap: float) -> float:
+        if self.deadline is None:
+            return cap
+        return max(0.0, min(cap, self.deadline - time.monotonic()))
+
+    def truncate(self, stage: str, reason: str, processed: int, total: Optional[int] = None) -> None:
+        if any(t.stage == stage for t in self.truncated):
+            return
+        of = f" of {total}" if total is not None else ""
+        self.truncated.append(Truncation(
+            stage=stage,
+            reason=reason,
+            processed=processed,
+            total=total,
+            message=f"{stage}: stopped at {reason} after {processed}{of}.",
+        ))
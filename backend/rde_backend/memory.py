@@ -0,0 +1,173 @@
+# backend/rde_backend/memory.py
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+# Opt-in memory accounting. With RDE_TRACE_MEMORY=1, tracemalloc runs and every
+# /analyze and /solve phase records its peak and net Python allocations; the report is
+# returned with the response and aggregated for /metrics. tracemalloc is process-wide,
+# so concurrent requests blur each other's numbers: attribute with one request in flight.
+#
+# RDE_MEMORY_BUDGET_MB bounds how much an analysis may grow the process (RSS, or traced
+# memory when tracing). Past BUDGET_SOFT of it evidence excerpts are dropped; past the
+# full budget remaining workspace packages only get their package.xml parsed.
+
+TRACE_ENV = "RDE_TRACE_MEMORY"
+BUDGET_ENV = "RDE_MEMORY_BUDGET_MB"
+BUDGET_SOFT = 0.7
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def tracing_enabled() -> bool:
+    return os.environ.get(TRACE_ENV, "").lower() in ("1", "true", "yes")
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource     # POSIX only
+    except ImportError:
+        return 0
+    # ru_maxrss is a high-water mark (KiB on Linux, bytes on macOS); better than nothing
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+@dataclass
+class PhaseStats:
+    phase: str
+    peak_kb: float
+    net_kb: float
+    seconds: float
+
+@dataclass
+class MemoryTracker:
+    endpoint: str
+    phases: List[PhaseStats] = field(default_factory=list)
+    degraded: List[str] = field(default_factory=list)
+    rss_start: int = 0
+
+    def __post_init__(self):
+        self.rss_start = rss_bytes()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        traced = tracemalloc.is_tracing()
+        if traced:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - t0
+            if traced:
+                current, peak = tracemalloc.get_traced_memory()
+                self.phases.append(PhaseStats(name, round((peak - before) / 1024, 1), round((current - before) / 1024, 1), round(seconds, 4)))
+            else:
+                self.phases.append(PhaseStats(name, 0.0, 0.0, round(seconds, 4)))
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "traced": tracemalloc.is_tracing(),
+            "phases": [p.__dict__ for p in self.phases],
+            "peak_kb": max((p.peak_kb for p in self.phases), default=0.0),
+            "rss_mb": round(rss_bytes() / 2**20, 1),
+            "rss_growth_mb": round((rss_bytes() - self.rss_start) / 2**20, 1),
+            "degraded": list(self.degraded),
+        }
+
+_current: ContextVar[Optional[MemoryTracker]] = ContextVar("rde_memory_tracker", default=None)
+
+@contextmanager
+def track(endpoint: str) -> Iterator[MemoryTracker]:
+    """
+    Make a tracker current for the request; phase() calls anywhere below record into it.
+    """
+    if tracing_enabled() and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    tracker = MemoryTracker(endpoint)
+    token = _current.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current.reset(token)
+        record(tracker)
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    tracker = _current.get()
+    if tracker is None:
+        yield
+        return
+    with tracker.phase(name):
+        yield
+
+class MemoryBudget:
+    def __init__(self, limit_mb: Optional[float] = None):
+        if limit_mb is None:
+            try:
+                limit_mb = float(os.environ.get(BUDGET_ENV, "0")) or None
+            except ValueError:
+                limit_mb = None
+        self.limit = int(limit_mb * 2**20) if limit_mb else None
+        self.start = self._used()
+
+    def _used(self) -> int:
+        if tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return rss_bytes()
+
+    def level(self) -> int:
+        """
+        0 = within budget, 1 = past the soft limit, 2 = over budget.
+        """
+        if self.limit is None:
+            return 0
+        used = self._used() - self.start
+        if used >= self.limit:
+            return 2
+        if used >= self.limit * BUDGET_SOFT:
+            return 1
+        return 0
+
+# endpoint -> phase -> aggregate, for /metrics
+_METRICS: Dict[str, Dict[str, Dict[str, float]]] = {}
+_METRICS_LOCK = threading.Lock()
+
+def record(tracker: MemoryTracker) -> None:
+    with _METRICS_LOCK:
+        ep = _METRICS.setdefault(tracker.endpoint, {})
+        for p in tracker.phases:
+            agg = ep.setdefault(p.phase, {"count": 0, "peak_kb_max": 0.0, "peak_kb_last": 0.0, "seconds_total": 0.0})
+            agg["count"] += 1
+            agg["peak_kb_max"] = max(agg["peak_kb_max"], p.peak_kb)
+            agg["peak_kb_last"] = p.peak_kb
+            agg["seconds_total"] = round(agg["seconds_total"] + p.seconds, 4)
+        if tracker.degraded:
+            agg = ep.setdefault("_degraded", {"count": 0})
+            agg["count"] += 1
+
+def metrics() -> Dict[str, Any]:
+    with _METRICS_LOCK:
+        phases = {ep: {ph: dict(v) for ph, v in d.items()} for ep, d in _METRICS.items()}
+    traced = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if traced else (0, 0)
+    limit = MemoryBudget().limit
+    return {
+        "rss_mb": round(rss_bytes() / 2**20, 1),
+        "traced": traced,
+        "traced_current_kb": round(current / 1024, 1),
+        "traced_peak_kb": round(peak / 1024, 1),
+        "budget_mb": round(limit / 2**20, 2) if limit else None,
+        "phases": phases,
+    }
@@ -24,6 +24,7 @@ class NormalizedDep(BaseModel):
     name: str
     spec: Optional[str] = None
     evidence: Evidence
+    extra: Optional[str] = None      # only needed for this extras_require group
 
 class Diagnostic(BaseModel):
     level: Literal["info", "warn", "warning", "error"]
@@ -36,6 +37,12 @@ class DependencySummary(BaseModel):
     conda: List[NormalizedDep] = []
     apt: List[NormalizedDep] = []
     ros: List[NormalizedDep] = []
+    pip_constraints: List[NormalizedDep] = []   # from -c files; bound versions, never installed
+
+class GpuInfo(BaseModel):
+    name: str
+    compute_capability: Optional[str] = None   # e.g. "8.6"; older drivers can't report it
+    memory_mb: Optional[int] = None
 
 class Fingerprint(BaseModel):
     os: str
@@ -47,9 +54,27 @@ class Fingerprint(BaseModel):
     nvidia_smi_ok: bool = False
     nvcc_ok: bool = False
     wsl_available: Optional[bool] = None
+    gpu_driver_version: Optional[str] = None   # e.g. "535.104.05"
+    cuda_driver_version: Optional[str] = None  # highest CUDA the driver supports, e.g. "12.2"
+    nvcc_version: Optional[str] = None
+    gpus: List[GpuInfo] = []
+    cpu_count: Optional[int] = None
+    memory_mb: Optional[int] = None            # total physical memory
+    build_tools: Dict[str, str] = {}           # found on PATH -> version ("" if unknown), e.g. {"ccache": "4.9.1"}
 
 class AnalyzeRequest(BaseModel):
     repoPath: str
+    # optional bounds for huge/mis-pointed trees; hitting one returns a partial response
+    deadline_ms: Optional[int] = None
+    max_files: Optional[int] = None
+    max_packages: Optional[int] = None
+
+class Truncation(BaseModel):
+    stage: str                     # scan | readme | packages | dependencies
+    reason: str                    # deadline | max_files | max_packages
+    processed: int
+    total: Optional[int] = None    # unknown when the scan itself was cut short
+    message: str
 
 class AnalyzeResponse(BaseModel):
     repoPath: str
@@ -59,6 +84,9 @@ class AnalyzeResponse(BaseModel):
     fingerprint: Fingerprint
     diagnostics: List[Diagnostic] = []
     notes: List[str] = []
+    memory: Optional[Dict[str, Any]] = None    # per-phase memory report (RDE_TRACE_MEMORY=1)
+    partial: bool = False
+    truncated: List[Truncation] = []
 
 class PlanStep(BaseModel):
     kind: Literal["env", "ros", "validate", "misc"] = "misc"
@@ -67,6 +95,47 @@ class PlanStep(BaseModel):
     why: str = ""
     evidence: Optional[Dict[str, Any]] = None
     requires_confirmation: bool = True
+    id: str = ""                           # unique within a plan, referenced by depends_on
+    depends_on: List[str] = []
+    lock_group: Optional[str] = None       # steps sharing a group never overlap (e.g. "apt" for dpkg)
+    est_seconds: Optional[float] = None    # rough duration, used by dry-run scheduling
+
+class PrefetchRequest(BaseModel):
+    repoPath: str
+    pythonVersion: str
+    indexUrl: Optional[str] = None
+    extraIndexUrls: List[str] = []      # from the solve's constraints_summary.extra_index_urls
+
+class PackagesRequest(BaseModel):
+    repoPath: str
+    max_depth: int = 12
+    kind: Optional[Literal["ros", "python", "node"]] = None
+
+class PackageEntry(BaseModel):
+    kind: str
+    name: str
+    root: str
+    manifest: Optional[str] = None
+    workspace: Optional[str] = None
+    depth: int = 0
+
+class PackagesResponse(BaseModel):
+    repoPath: str
+    packages: List[PackageEntry] = []
+    workspaces: List[str] = []
+    elapsed_ms: float = 0.0
+
+class EnvGcRequest(BaseModel):
+    min_idle_days: float = 14.0
+    dry_run: bool = False
+
+class ExecuteRequest(BaseModel):
+    repoPath: str
+    plan_id: str                           # from SolveResponse.plan_id; only issued plans run
+    step_ids: Optional[List[str]] = None   # subset to run (dependencies outside it are assumed done)
+    confirmed: List[str] = []              # ids of requires_confirmation steps the user approved
+    max_parallel: int = 4
+    dry_run: bool = False
 
 class ResolutionAttempt(BaseModel):
     tool: str                      # "uv" | "pip-tools" | "micromamba"
@@ -79,6 +148,7 @@ class Conflict(BaseModel):
     package: Optional[str] = None
     message: str
     raw: Optional[str] = None
+    evidence: List[Evidence] = []    # both sides of a specifier clash, when known
 
 class DecisionPointOption(BaseModel):
     id: str
@@ -96,6 +166,8 @@ class ConstraintsSummary(BaseModel):
     python_candidates: list[str] = []
     critical: list[str] = []
     pin_overrides: dict[str, str] = {}
+    wheel_selection: list[dict[str, Any]] = []  # per framework: variant, package, pin, index, reason
+    extra_index_urls: list[str] = []
     warnings: list[str] = []
     reasons: list[str] = []
 
@@ -122,4 +194,46 @@ class SolveResponse(BaseModel):
     conflicts: List[Conflict] = []
     schema_version: str = "2.0"
     decision_point: Optional[DecisionPoint] = None
-    notes: List[str] = []
\ No newline at end of file
+    notes: List[str] = []
+    memory: Optional[Dict[str, Any]] = None
+    plan_id: Optional[str] = None            # pass to /execute to run plan_steps
+
+class ValidateRequest(BaseModel):
+    repoPath: str
+    envPath: Optional[str] = None            # venv / conda prefix; default <repo>/.venv
+    analysis: Optional[Dict[str, Any]] = None  # /analyze result: apt, ros (and pip, without a lock) deps
+    ros2Distro: Optional[str] = None         # default: inferred from the fingerprint
+
+class DepCheck(BaseModel):
+    kind: Literal["pip", "conda", "apt", "ros"]
+    name: str
+    required: Optional[str] = None   # "==2.1.0", ">=1.24"; None = just installed
+    installed: Optional[str] = None
+    status: Literal["pass", "fail", "skip"]
+    evidence: str                    # where the answer came from (dist-info dir, dpkg status, ...)
+
+class ValidateResponse(BaseModel):
+    repoPath: str
+    ok: bool
+    env_path: Optional[str] = None
+    checks: List[DepCheck] = []
+    passed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    notes: List[str] = []
+    elapsed_ms: float = 0.0
+
+class SolveMatrixRequest(BaseModel):
+    repoPath: str
+    analysis: Dict[str, Any]
+    choices: Dict[str, Any] = {}             # fixed choices shared by every combination
+    axes: Dict[str, List[Any]]               # e.g. {"envType": ["venv", "conda"], "goal": ["cpu", "auto"]}
+
+class SolveMatrixEntry(BaseModel):
+    choices: Dict[str, Any]
+    result: SolveResponse
+
+class SolveMatrixResponse(BaseModel):
+    repoPath: str
+    entries: List[SolveMatrixEntry] = []
+    elapsed_ms: float = 0.0
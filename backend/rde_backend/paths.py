@@ -0,0 +1,15 @@
+# backend/rde_backend/paths.py
+from __future__ import annotations
+import os
+from pathlib import Path
+
+# Shared, per-user cache root for indexes and stores that outlive a single repo.
+# Per-repo artifacts keep living under <repo>/.rde/.
+CACHE_ENV = "RDE_CACHE_DIR"
+
+def cache_dir(*parts: str) -> Path:
+    base = os.environ.get(CACHE_ENV)
+    root = Path(base) if base else Path.home() / ".cache" / "rde"
+    p = root.joinpath(*parts)
+    p.mkdir(parents=True, exist_ok=True)
+    return p
@@ -2,11 +2,17 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, List, Set
+from typing import Optional, List, Set, Tuple
+import fnmatch
+import os
+
+from .git_files import git_files, iter_worktree_files
+from .limits import AnalysisLimits
 
 README_CANDIDATES = ["README.md", "README.MD", "README.rst", "README.txt"]
-DEP_FILES = ["requirements.txt", "pyproject.toml", "environment.yml", "environment.yaml", "setup.cfg", "Dockerfile"]
+DEP_FILES = ["requirements.txt", "pyproject.toml", "environment.yml", "environment.yaml", "setup.cfg", "setup.py", "Dockerfile"]
 SCRIPT_GLOBS = ["*.sh", "*.bash", "install*.sh", "setup*.sh"]
+SCAN_BACKEND_ENV = "RDE_SCAN_BACKEND"
 
 # Hard skip dirs to keep scans fast + clean
 SKIP_DIRS: Set[str] = {
@@ -27,6 +33,9 @@ SKIP_DIRS: Set[str] = {
     ".vscode",
 }
 
+# colcon/catkin: a directory containing one of these is not scanned
+IGNORE_MARKERS = ("COLCON_IGNORE", "AMENT_IGNORE", "CATKIN_IGNORE")
+
 def _should_skip(path: Path) -> bool:
     return any(part in SKIP_DIRS for part in path.parts)
 
@@ -42,6 +51,7 @@ class RepoFiles:
     is_workspace: bool = False
     package_xmls: List[Path] = None
     package_roots: List[Path] = None
+    enumeration: str = "walk"          # "git-ls-files" | "git-index" | "walk"
 
 def find_first(repo: Path, names: List[str]) -> Optional[Path]:
     for n in names:
@@ -50,7 +60,7 @@ def find_first(repo: Path, names: List[str]) -> Optional[Path]:
             return p
     return None
 
-def _is_ros_workspace(repo: Path) -> bool:
+def _is_ros_workspace(repo: Path, files: Optional[List[Path]] = None) -> bool:
     """
     Basic ROS workspace heuristic:
     - repo/src exists
@@ -59,16 +69,73 @@ def _is_ros_workspace(repo: Path) -> bool:
     src = repo / "src"
     if not src.exists() or not src.is_dir():
         return False
+    if files is not None:
+        return any(p.name == "package.xml" and src in p.parents for p in files)
     for p in src.rglob("package.xml"):
         if p.is_file() and not _should_skip(p):
             return True
     return False
 
-def discover_repo_files(repo_path: str) -> RepoFiles:
+def _git_tree_files(repo: Path, backend: str, limits: AnalysisLimits, nested: bool = False) -> Optional[Tuple[List[Path], str]]:
+    hit = git_files(repo, backend, timeout_s=limits.remaining(20.0))
+    if hit is None:
+        return None
+    worktree, rels, used = hit
+    if nested and worktree != repo:
+        return None     # submodule that isn't checked out: git found the enclosing repo
+    # plain string checks: this loop sees every tracked file
+    prefix = "" if repo == worktree else repo.relative_to(worktree).as_posix() + "/"
+    out: List[Path] = []
+    for rel in rels:
+        if prefix and not rel.startswith(prefix):
+            continue
+        if not SKIP_DIRS.isdisjoint(rel.split("/")[:-1]):
+            continue
+        if rel.endswith("/"):
+            # nested repo (vcs-import layout) or submodule: list it from its own repo
+            sub = worktree / rel
+            inner = _git_tree_files(sub, backend, limits, nested=True)
+            if inner is not None:
+                out += inner[0]
+            else:
+                out += iter_worktree_files(sub, SKIP_DIRS, limits.max_files, limits.expired if limits.deadline is not None else None)
+            continue
+        out.append(worktree / rel)
+    return out, used
+
+def enumerate_files(repo: Path, limits: Optional[AnalysisLimits] = None) -> Tuple[List[Path], str]:
+    """
+    All candidate files under `repo` and the backend that produced them: the git
+    file list when `repo` is in a git work tree, else a pruned filesystem walk.
+    Nested repos and submodules are listed from their own git data (or walked).
+    RDE_SCAN_BACKEND=auto|git|index|walk forces one (benchmarks, debugging).
+    With limits, at most max_files (shallowest first) within the deadline.
+    """
+    limits = limits or AnalysisLimits()
+    backend = os.environ.get(SCAN_BACKEND_ENV, "auto")
+    if backend != "walk":
+        hit = _git_tree_files(repo, backend, limits)
+        if hit is not None:
+            out, used = hit
+            if limits.max_files is not None and len(out) > limits.max_files:
+                limits.truncate("scan", "max_files", limits.max_files, len(out))
+                out.sort(key=lambda p: len(p.parts))
+                del out[limits.max_files:]
+            return out, used
+    out = iter_worktree_files(repo, SKIP_DIRS, limits.max_files, limits.expired if limits.deadline is not None else None)
+    if limits.max_files is not None and len(out) >= limits.max_files:
+        limits.truncate("scan", "max_files", len(out))
+    elif limits.expired():
+        limits.truncate("scan", "deadline", len(out))
+    return out, "walk"
+
+def discover_repo_files(repo_path: str, limits: Optional[AnalysisLimits] = None) -> RepoFiles:
+    limits = limits or AnalysisLimits()
     repo = Path(repo_path).resolve()
     readme = find_first(repo, README_CANDIDATES)
 
-    is_ws = _is_ros_workspace(repo)
+    files, backend = enumerate_files(repo, limits)
+    is_ws = _is_ros_workspace(repo, files)
     scan_root = (repo / "src") if is_ws else repo
 
     dep_files: List[Path] = []
@@ -80,40 +147,44 @@ def discover_repo_files(repo_path: str) -> RepoFiles:
         if p.exists() and p.is_file():
             dep_files.append(p)
 
-    # 2) Recursive scan for key files under scan_root
+    # 2) Key files under scan_root
     #    - package.xml is common in ROS and monorepos
     #    - also allow nested requirements/pyproject/env yml/Dockerfile
+    #    - scripts (only under scan_root)
     package_xmls: List[Path] = []
     package_roots: List[Path] = []
-
-    for p in scan_root.rglob("*"):
-        if _should_skip(p):
+    dep_names = {d.lower() for d in DEP_FILES}
+
+    scan_prefix = str(scan_root) + os.sep
+    for i, p in enumerate(files):
+        if i % 4096 == 0 and limits.expired():
+            limits.truncate("scan", "deadline", i, len(files))
+            break
+        if scan_root != repo and not str(p).startswith(scan_prefix):
             continue
+        lname = p.name.lower()
+        is_pkg = lname == "package.xml"
+        is_dep = lname in dep_names
+        is_script = any(fnmatch.fnmatch(p.name, g) for g in SCRIPT_GLOBS)
+        if not (is_pkg or is_dep or is_script):
+            continue
+        # the git index can list files deleted from the work tree
         if not p.is_file():
             continue
 
-        lname = p.name.lower()
-
         # ROS package manifests
-        if lname == "package.xml":
+        if is_pkg:
             package_xmls.append(p)
             package_roots.append(p.parent)
             dep_files.append(p)
-            continue
-
         # Nested dependency files
-        if p.name in DEP_FILES or lname in (d.lower() for d in DEP_FILES):
+        elif is_dep:
             dep_files.append(p)
-            continue
-
-    # 3) Scripts (keep your existing behavior but only under scan_root)
-    for g in SCRIPT_GLOBS:
-        for p in scan_root.rglob(g):
-            if p.is_file() and not _should_skip(p):
-                scripts.append(p)
+        if is_script:
+            scripts.append(p)
 
-    # de-dup + sort
-    dep_files = sorted(set(dep_files))
+    # de-dup + sort; shallowest first so root dep files are parsed before any limit hits
+    dep_files = sorted(set(dep_files), key=lambda p: (len(p.parts), str(p)))
     scripts = sorted(set(scripts))
 
     # de-dup package roots
@@ -125,6 +196,9 @@ def discover_repo_files(repo_path: str) -> RepoFiles:
             continue
         seen.add(rs)
         uniq_pkg_roots.append(r)
+    if limits.max_packages is not None and len(uniq_pkg_roots) > limits.max_packages:
+        limits.truncate("packages", "max_packages", limits.max_packages, len(uniq_pkg_roots))
+        del uniq_pkg_roots[limits.max_packages:]
 
     return RepoFiles(
         readme=readme,
@@ -135,4 +209,5 @@ def discover_repo_files(repo_path: str) -> RepoFiles:
         is_workspace=is_ws,
         package_xmls=sorted(set(package_xmls)),
         package_roots=uniq_pkg_roots,
+        enumeration=backend,
     )
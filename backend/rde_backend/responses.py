@@ -0,0 +1,171 @@
+# backend/rde_backend/responses.py
+from __future__ import annotations
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from .memory import MemoryTracker, tracing_enabled
+
+# Large responses (/analyze on a workspace, /solve) are serialized with orjson when it
+# is installed, compressed when the client accepts it, and can be trimmed per request:
+#
+#   ?fields=fingerprint,dependencies.pip.name     keep only these paths
+#   ?exclude=dependencies.*.evidence.excerpt      drop these paths
+#   ?counts=dependencies.*                        replace these lists by their length
+#
+# Paths are dotted; lists are walked transparently and `*` matches any key.
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json fallback
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip only
+    zstandard = None
+
+# below roughly one packet compression costs more than it saves
+MIN_COMPRESS_BYTES = 1400
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    Drop-in JSONResponse that renders through orjson when available.
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def _path_tree(spec: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not spec:
+        return None
+    tree: Dict[str, Any] = {}
+    for path in spec.split(","):
+        parts = [p for p in path.strip().split(".") if p]
+        if not parts:
+            continue
+        node = tree
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is None:         # a shorter path already covers this one
+                break
+            node = child
+        else:
+            node[parts[-1]] = None    # None marks the end of a path
+    return tree or None
+
+def _select(data: Any, tree: Dict[str, Any]) -> Any:
+    if isinstance(data, list):
+        return [_select(x, tree) for x in data]
+    if not isinstance(data, dict):
+        return data
+    out = {}
+    for k, v in data.items():
+        sub = tree[k] if k in tree else tree.get("*", ...)
+        if sub is ...:
+            continue
+        out[k] = v if sub is None else _select(v, sub)
+    return out
+
+def _rewrite(data: Any, tree: Dict[str, Any], leaf) -> Any:
+    # shared walk for exclude/counts: `leaf(value)` returns the replacement or ... to drop
+    if isinstance(data, list):
+        return [_rewrite(x, tree, leaf) for x in data]
+    if not isinstance(data, dict):
+        return data
+    out = {}
+    for k, v in data.items():
+        sub = tree[k] if k in tree else tree.get("*", ...)
+        if sub is ...:
+            out[k] = v
+        elif sub is None:
+            nv = leaf(v)
+            if nv is not ...:
+                out[k] = nv
+        else:
+            out[k] = _rewrite(v, sub, leaf)
+    return out
+
+def project(data: Any, fields: Optional[str] = None, exclude: Optional[str] = None, counts: Optional[str] = None) -> Any:
+    keep = _path_tree(fields)
+    if keep is not None:
+        data = _select(data, keep)
+    drop = _path_tree(exclude)
+    if drop is not None:
+        data = _rewrite(data, drop, lambda v: ...)
+    count = _path_tree(counts)
+    if count is not None:
+        data = _rewrite(data, count, lambda v: len(v) if isinstance(v, (list, dict)) else v)
+    return data
+
+def _accepted(header: str) -> List[Tuple[str, float]]:
+    out = []
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            out.append((name.strip().lower(), q))
+    return out
+
+def negotiate_encoding(header: Optional[str]) -> Optional[str]:
+    """
+    Pick zstd or gzip from an Accept-Encoding header (highest q, zstd on ties).
+    """
+    if not header:
+        return None
+    supported = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    accepted = dict(_accepted(header))
+    best, best_q = None, 0.0
+    for enc in supported:
+        q = accepted.get(enc, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+def respond(request: Request, payload: Any, status_code: int = 200, tracker: Optional[MemoryTracker] = None) -> Response:
+    """
+    Serialize `payload` (a pydantic model or plain data), apply the request's
+    fields/exclude/counts projection and compress it if the client accepts that.
+    With a tracker, the model dump is measured and the memory report is attached.
+    """
+    if tracker is not None:
+        with tracker.phase("serialize"):
+            data = payload.model_dump(mode="json") if isinstance(payload, BaseModel) else payload
+        if isinstance(data, dict) and (tracing_enabled() or tracker.degraded):
+            data["memory"] = tracker.report()
+    else:
+        data = payload.model_dump(mode="json") if isinstance(payload, BaseModel) else payload
+    q = request.query_params
+    if "fields" in q or "exclude" in q or "counts" in q:
+        data = project(data, q.get("fields"), q.get("exclude"), q.get("counts"))
+    body = dumps(data)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -1,24 +1,59 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
-from .models import AnalyzeRequest, AnalyzeResponse, SetupIntent, DependencySummary, SolveRequest, SolveResponse
+from typing import Optional
+from .models import Diagnostic, AnalyzeRequest, AnalyzeResponse, SetupIntent, DependencySummary, SolveRequest, SolveResponse, ExecuteRequest, PrefetchRequest, EnvGcRequest, PackagesRequest, PackagesResponse, PackageEntry, SolveMatrixRequest, SolveMatrixResponse, SolveMatrixEntry, ValidateRequest
 import uvicorn
 import json
-from .repo_scan import discover_repo_files
+import time
+from .repo_scan import README_CANDIDATES, discover_repo_files, find_first
+from .limits import AnalysisLimits
 from .readme_intent import parse_readme
-from .deps import collect_dependencies
+from .deps import collect_dependencies, strip_excerpts
 from .fingerprint import fingerprint_system
 from .readme_expectations import extract_expected_platform
 from .diagnostics import build_platform_diagnostics
-from .solve.solve import solve as solver
+from .solve.solve import memo_stats, solve as solver, solve_matrix
 from .analyze.package_analyzer import analyze_package
+from .analyze.workspace import build_package_index
+from .executor import dry_run, execute_plan, issued_plan, plan_graph, register_plan, unconfirmed
+from .solve.wheelhouse import prefetch
+from .solve.resolve_pip import LOCK_REL_PATH
+from .solve.env_store import EnvStore
+from .responses import FastJSONResponse, respond
+from .memory import BUDGET_ENV, MemoryBudget, MemoryTracker, metrics, phase, track
+from .daemon import ACTIVITY, SCHEDULER, ActivityMiddleware, read_discovery, run_daemon
+from .singleflight import INFLIGHT, request_key
+from .store import STORE_ENV, get_store
+from .validate import validate_environment
+import argparse
+import os
 
-app = FastAPI(title="RDE Backend", version="0.0.1")
+VERSION = "0.0.1"
+
+app = FastAPI(title="RDE Backend", version=VERSION, default_response_class=FastJSONResponse)
+app.add_middleware(ActivityMiddleware)
 
 
 @app.get("/health")
 def health():
-    return {"ok": True, "service": "rde-backend", "version": "0.0.1"}
+    # pid lets clients check a discovery file still points at the live daemon
+    return {"ok": True, "service": "rde-backend", "version": VERSION, "pid": os.getpid()}
+
+
+@app.get("/daemon")
+def daemon_status():
+    info = read_discovery()
+    return {
+        "pid": os.getpid(),
+        "daemon": bool(info and info.get("pid") == os.getpid()),
+        "uptime_s": round(time.time() - ACTIVITY.started, 1),
+        "inflight": ACTIVITY.inflight,
+        "scheduler": SCHEDULER.stats(),
+        "singleflight": INFLIGHT.stats(),
+        "memo": memo_stats(),
+    }
 
 """
 class AnalyzeRequest(BaseModel):
@@ -32,37 +67,83 @@ class SolveRequest(BaseModel):
 """
 
 @app.post("/analyze", response_model=AnalyzeResponse)
-def analyze(req: AnalyzeRequest):
-    repo_files = discover_repo_files(req.repoPath)
+def analyze(req: AnalyzeRequest, request: Request):
+    # the deadline covers queueing for a scheduler slot too
+    limits = AnalysisLimits.from_request(req.deadline_ms, req.max_files, req.max_packages)
+    with track("analyze") as mem:
+        def run():
+            with SCHEDULER.slot(req.repoPath):
+                resp = _analyze(req, mem, limits)
+            if store:
+                store.record_analysis(resp)
+            return resp
+        store = get_store()
+        resp, shared = INFLIGHT.do(request_key("analyze", req.repoPath, req.model_dump()), run)
+        return respond(request, _coalesced(resp) if shared else resp, tracker=mem)
 
+def _coalesced(resp):
+    # waiters share the leader's result object; tag a copy
+    return resp.model_copy(update={"notes": resp.notes + ["Coalesced with an identical in-flight request."]})
+
+def _analyze(req: AnalyzeRequest, mem: MemoryTracker, limits: AnalysisLimits) -> AnalyzeResponse:
     setup_intent = SetupIntent()
     readme_path = None
     diagnostics = []
-    fp = fingerprint_system()
+    with phase("fingerprint"):
+        fp = fingerprint_system()
 
-    # README intent extraction (root README only for now)
-    if repo_files.readme:
-        readme_path = str(repo_files.readme)
+    # README intent extraction (root README only for now); before the scan so a
+    # huge tree can't starve it
+    readme = find_first(Path(req.repoPath).resolve(), README_CANDIDATES)
+    if readme and limits.expired():
+        limits.truncate("readme", "deadline", 0, 1)
+    elif readme:
+        readme_path = str(readme)
 
-        # 1) Procedural intent (install blocks, etc.)
-        setup_intent = parse_readme(repo_files.readme)
+        with phase("readme"):
+            # 1) Procedural intent (install blocks, etc.)
+            setup_intent = parse_readme(readme)
 
-        # 2) Platform expectations + mismatch diagnostics
-        exp = extract_expected_platform(repo_files.readme)
-        diagnostics = build_platform_diagnostics(exp, fp)
+            # 2) Platform expectations + mismatch diagnostics
+            exp = extract_expected_platform(readme)
+            diagnostics = build_platform_diagnostics(exp, fp)
+
+    with phase("scan"):
+        repo_files = discover_repo_files(req.repoPath, limits)
 
     # Dependency extraction
     notes = []
     if not repo_files.readme:
         notes.append("No README found at repo root.")
 
+    # requirements files parsed once per analysis, however many packages include them
+    req_memo = {}
+    budget = MemoryBudget()
     is_ws = getattr(repo_files, "is_workspace", False)
     if is_ws:
         notes.append("Workspace detected: ROS-style (src/ contains package.xml).")
         notes.append(f"Discovered {len(repo_files.package_roots or [])} ROS packages.")
 
         # 2.0/2.1: analyze each package root and aggregate deps
-        pkg_analyses = [analyze_package(r) for r in (repo_files.package_roots or [])]
+        pkg_analyses = []
+        with phase("dependencies"):
+            roots = repo_files.package_roots or []
+            for i, r in enumerate(roots):
+                if limits.expired():
+                    limits.truncate("dependencies", "deadline", i, len(roots))
+                    break
+                level = budget.level()
+                if level >= 1 and "excerpts" not in mem.degraded:
+                    mem.degraded.append("excerpts")
+                    for pa in pkg_analyses:
+                        strip_excerpts(pa.deps)
+                if level >= 2 and "package_detail" not in mem.degraded:
+                    mem.degraded.append("package_detail")
+                # over budget: package.xml only for the remaining packages
+                pa = analyze_package(r, diagnostics, req_memo, manifests_only=level >= 2, limits=limits)
+                if level >= 1:
+                    strip_excerpts(pa.deps)
+                pkg_analyses.append(pa)
 
         deps = DependencySummary()
         for pa in pkg_analyses:
@@ -70,6 +151,7 @@ def analyze(req: AnalyzeRequest):
             deps.conda.extend(pa.deps.conda)
             deps.apt.extend(pa.deps.apt)
             deps.ros.extend(pa.deps.ros)
+            deps.pip_constraints.extend(pa.deps.pip_constraints)
 
         # TEMP: provide per-package summary for extension (easy render)
         pkg_index = []
@@ -86,8 +168,28 @@ def analyze(req: AnalyzeRequest):
 
     else:
         # non-workspace behavior stays as-is
-        deps = collect_dependencies(repo_files.dep_files)
+        with phase("dependencies"):
+            n_root = sum(1 for p in repo_files.dep_files if p.parent == repo_files.repo_root)
+            deps = collect_dependencies(repo_files.dep_files, diagnostics, req_memo, limits, always=n_root)
+        if budget.level() >= 1:
+            mem.degraded.append("excerpts")
+            strip_excerpts(deps)
+
+    if mem.degraded:
+        diagnostics.append(Diagnostic(
+            level="warn",
+            code="MEMORY_BUDGET",
+            message=f"Analysis exceeded the memory budget ({BUDGET_ENV}); reduced detail: {', '.join(mem.degraded)}.",
+        ))
 
+    if limits.truncated:
+        diagnostics.append(Diagnostic(
+            level="warn",
+            code="ANALYSIS_TRUNCATED",
+            message="Partial analysis: " + " ".join(t.message for t in limits.truncated),
+        ))
+
+    notes.append(f"File enumeration: {repo_files.enumeration}.")
     notes.append(f"Found {len(repo_files.dep_files)} dependency-related files.")
     notes.append(f"Found {len(repo_files.scripts)} scripts.")
 
@@ -99,13 +201,165 @@ def analyze(req: AnalyzeRequest):
         fingerprint=fp,
         diagnostics=diagnostics,
         notes=notes,
+        partial=bool(limits.truncated),
+        truncated=limits.truncated,
     )
 
 
 
 @app.post("/solve", response_model=SolveResponse)
-def solve(req: SolveRequest):
-    return solver(req.repoPath, req.choices, req.analysis)
+def solve(req: SolveRequest, request: Request):
+    # identical concurrent solves would also race on the same .rde/ lock files
+    with track("solve") as mem:
+        def run():
+            with SCHEDULER.slot(req.repoPath):
+                resp = solver(req.repoPath, req.choices, req.analysis)
+            resp = resp.model_copy(update={"plan_id": register_plan(req.repoPath, resp.plan_steps)})
+            if store:
+                store.record_solve(req.repoPath, req.choices, resp)
+            return resp
+        store = get_store()
+        resp, shared = INFLIGHT.do(request_key("solve", req.repoPath, req.model_dump()), run)
+        return respond(request, _coalesced(resp) if shared else resp, tracker=mem)
+
+
+@app.post("/solve/matrix", response_model=SolveMatrixResponse)
+def solve_all(req: SolveMatrixRequest, request: Request):
+    # every combination of `axes` in one call, so the UI can switch options instantly
+    t0 = time.perf_counter()
+    def run():
+        # one scheduler slot per combination, not one for the whole matrix
+        results = solve_matrix(req.repoPath, req.choices, req.axes, req.analysis, slot=lambda: SCHEDULER.slot(req.repoPath))
+        results = [(c, r.model_copy(update={"plan_id": register_plan(req.repoPath, r.plan_steps)})) for c, r in results]
+        if store:
+            for choices, resp in results:
+                store.record_solve(req.repoPath, choices, resp)
+        return results
+    store = get_store()
+    try:
+        results, _ = INFLIGHT.do(request_key("solve/matrix", req.repoPath, req.model_dump()), run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return respond(request, SolveMatrixResponse(
+        repoPath=req.repoPath,
+        entries=[SolveMatrixEntry(choices=c, result=r) for c, r in results],
+        elapsed_ms=round((time.perf_counter() - t0) * 1000, 2),
+    ))
+
+
+@app.post("/packages", response_model=PackagesResponse)
+def packages(req: PackagesRequest, request: Request):
+    # manifest-only walk: lets the extension list packages without a full /analyze
+    t0 = time.perf_counter()
+    root = Path(req.repoPath)
+    if not root.is_dir():
+        raise HTTPException(status_code=404, detail=f"Not a directory: {req.repoPath}")
+    idx = build_package_index(root, req.max_depth)
+    entries = [
+        PackageEntry(
+            kind=p.kind,
+            name=p.name,
+            root=str(p.root),
+            manifest=str(p.manifest_path) if p.manifest_path else None,
+            workspace=str(p.workspace) if p.workspace else None,
+            depth=p.depth,
+        )
+        for p in idx.list(req.kind)
+    ]
+    return respond(request, PackagesResponse(
+        repoPath=req.repoPath,
+        packages=entries,
+        workspaces=[str(w) for w in idx.workspaces],
+        elapsed_ms=round((time.perf_counter() - t0) * 1000, 2),
+    ))
+
+
+@app.post("/execute")
+async def execute(req: ExecuteRequest, request: Request):
+    # only plans this server issued from /solve are run, never commands from the body
+    issued = issued_plan(req.plan_id)
+    if issued is None or issued[0] != req.repoPath:
+        raise HTTPException(status_code=404, detail=f"Unknown plan {req.plan_id} for {req.repoPath}; run /solve again.")
+    steps = issued[1]
+    try:
+        plan_graph(steps)
+        if req.dry_run:
+            return dry_run(steps, req.max_parallel)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    pending = unconfirmed(steps, req.step_ids, req.confirmed)
+    if pending:
+        raise HTTPException(status_code=400, detail=f"Steps require confirmation: {', '.join(pending)}; pass their ids in `confirmed`.")
+
+    async def stream():
+        events = execute_plan(steps, req.repoPath, req.max_parallel, req.step_ids, stop=request.is_disconnected)
+        try:
+            async for ev in events:
+                yield json.dumps(ev) + "\n"
+        finally:
+            # client disconnected mid-stream: cancel running steps and their processes
+            await events.aclose()
+
+    # one JSON event per line: start/output/end/skip/session/terminal per step, then a summary
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/prefetch")
+def prefetch_wheels(req: PrefetchRequest):
+    lock = Path(req.repoPath) / LOCK_REL_PATH
+    if not lock.is_file():
+        raise HTTPException(status_code=404, detail=f"No lock file at {lock}; run /solve first.")
+    fp = fingerprint_system()
+    rep = prefetch(lock.read_text(), req.pythonVersion, os_name=fp.os, arch=fp.arch, index_url=req.indexUrl, extra_index_urls=req.extraIndexUrls)
+    return {"ok": rep.ok, **rep.__dict__}
+
+
+@app.get("/metrics")
+def get_metrics():
+    # per-endpoint/phase memory aggregates (populated when RDE_TRACE_MEMORY=1) + RSS
+    return metrics()
+
+
+def _store():
+    store = get_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail=f"Analysis store disabled; set {STORE_ENV}=1 (or a .db path).")
+    return store
+
+
+@app.get("/store")
+def store_stats():
+    return _store().stats()
+
+
+@app.get("/store/deps")
+def store_deps(name: str, spec: Optional[str] = None, kind: Optional[str] = None):
+    # e.g. /store/deps?name=tensorflow&spec=<2.11
+    t0 = time.perf_counter()
+    try:
+        hits = _store().repos_depending_on(name, spec, kind)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"hits": hits, "repos": sorted({h["path"] for h in hits}), "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+
+@app.get("/store/solves")
+def store_solves(python: Optional[str] = None, locked: Optional[bool] = None, envType: Optional[str] = None, latest: bool = True):
+    # e.g. /store/solves?python=3.12&locked=false
+    t0 = time.perf_counter()
+    rows = _store().solves(python, locked, envType, latest)
+    return {"solves": rows, "repos": sorted({r["path"] for r in rows}), "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+
+@app.get("/envs")
+def list_envs():
+    return {"envs": [rec.__dict__ for rec in EnvStore().list()]}
+
+
+@app.post("/envs/gc")
+def gc_envs(req: EnvGcRequest):
+    # drops stale refs, then removes unreferenced envs idle longer than min_idle_days
+    return EnvStore().gc(min_idle_s=req.min_idle_days * 24 * 3600, dry_run=req.dry_run)
 
 
 @app.post("/generate")
@@ -114,10 +368,18 @@ def generate(payload: dict):
 
 
 @app.post("/validate")
-def validate(payload: dict):
-    return {"ok": True, "notes": ["stub validate response"], "payload": payload}
+def validate(req: ValidateRequest, request: Request):
+    # reads dist-info / conda-meta / dpkg status directly; indexes are reused until they change
+    return respond(request, validate_environment(req))
 
 
 def main():
-    # Fixed port for Phase 0. Later we can do dynamic ports.
-    uvicorn.run("rde_backend.server:app", host="127.0.0.1", port=8844, log_level="info")
+    ap = argparse.ArgumentParser(prog="rde_backend")
+    ap.add_argument("--daemon", action="store_true", help="run as the shared per-user daemon (free port, discovery file)")
+    ap.add_argument("--port", type=int, default=None)
+    ap.add_argument("--idle-timeout", type=float, default=None, help="daemon: exit after this many idle seconds")
+    args = ap.parse_args()
+    if args.daemon:
+        raise SystemExit(run_daemon("rde_backend.server:app", port=args.port or 0, idle_s=args.idle_timeout, version=VERSION))
+    # Fixed port for Phase 0 (one backend per window).
+    uvicorn.run("rde_backend.server:app", host="127.0.0.1", port=args.port or 8844, log_level="info")
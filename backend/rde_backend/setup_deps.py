@@ -0,0 +1,201 @@
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import ast
+import configparser
+import hashlib
+import json
+import os
+import re
+import threading
+
+from .models import NormalizedDep, Evidence
+from .paths import cache_dir
+
+# Static dependency extraction for legacy setuptools projects. Nothing is executed:
+# setup.cfg goes through configparser, setup.py through an AST walk of setup() calls
+# that resolves literals and simple module-level constants. Results are cached by
+# content hash, so unchanged files in large ROS1/Python workspaces are not re-parsed.
+
+PARSER_VERSION = 2
+
+SETUP_KWARGS = ("install_requires", "extras_require")
+
+NAME_SPEC_RE = re.compile(r"^([A-Za-z0-9][A-Za-z0-9_.\-]*(?:\[[^\]]*\])?)\s*(.*)$")
+
+# (name, spec, location, excerpt, extra)
+Row = Tuple[str, Optional[str], str, str, Optional[str]]
+
+# in-process front of the disk cache; the disk cache holds everything
+MAX_MEMO_FILES = 1024
+
+_MEMO: "OrderedDict[str, List[Row]]" = OrderedDict()
+_MEMO_LOCK = threading.Lock()
+
+def _split_requirement(s: str) -> Optional[Tuple[str, Optional[str]]]:
+    # an environment marker stays in the spec ("pkg>=1; python_version < '3.8'"), as
+    # requirements.txt entries keep it, so the lock honors it
+    s = s.split("#", 1)[0].strip()
+    if not s or s.startswith("-"):
+        return None
+    m = NAME_SPEC_RE.match(s)
+    if not m:
+        return None
+    return m.group(1), (m.group(2).strip() or None)
+
+def _rows(reqs: List[str], location: str, extra: Optional[str]) -> List[Row]:
+    out: List[Row] = []
+    for r in reqs:
+        parsed = _split_requirement(str(r))
+        if parsed:
+            out.append((parsed[0], parsed[1], location, str(r).strip()[:200], extra))
+    return out
+
+def _cfg_list(value: str) -> List[str]:
+    # one requirement per line; ';' starts an environment marker, not a new item
+    return [x.strip() for x in value.splitlines() if x.strip() and not x.strip().startswith("#")]
+
+def _parse_setup_cfg(text: str, fname: str) -> List[Row]:
+    cp = configparser.ConfigParser(interpolation=None, strict=False)
+    try:
+        cp.read_string(text)
+    except configparser.Error:
+        return []
+    rows: List[Row] = []
+    if cp.has_option("options", "install_requires"):
+        rows += _rows(_cfg_list(cp.get("options", "install_requires")), f"{fname}:[options].install_requires", None)
+    if cp.has_section("options.extras_require"):
+        defaults = cp.defaults()
+        for extra in cp["options.extras_require"]:
+            if extra in defaults:
+                continue
+            value = cp.get("options.extras_require", extra)
+            rows += _rows(_cfg_list(value), f"{fname}:[options.extras_require].{extra}", extra)
+    return rows
+
+class _Unresolved(Exception):
+    pass
+
+def _literal(node: ast.AST, consts: Dict[str, Any], depth: int = 0) -> Any:
+    if depth > 20:
+        raise _Unresolved()
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        out: List[Any] = []
+        for elt in node.elts:
+            if isinstance(elt, ast.Starred):
+                out.extend(_literal(elt.value, consts, depth + 1))
+            else:
+                out.append(_literal(elt, consts, depth + 1))
+        return out
+    if isinstance(node, ast.Dict):
+        d: Dict[str, Any] = {}
+        for k, v in zip(node.keys, node.values):
+            if k is None:
+                d.update(_literal(v, consts, depth + 1))
+            else:
+                d[_literal(k, consts, depth + 1)] = _literal(v, consts, depth + 1)
+        return d
+    if isinstance(node, ast.Name) and node.id in consts:
+        return consts[node.id]
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        return _literal(node.left, consts, depth + 1) + _literal(node.right, consts, depth + 1)
+    raise _Unresolved()
+
+def _is_setup_call(node: ast.Call) -> bool:
+    f = node.func
+    return (isinstance(f, ast.Name) and f.id == "setup") or (isinstance(f, ast.Attribute) and f.attr == "setup")
+
+def _parse_setup_py(text: str, fname: str) -> List[Row]:
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return []
+
+    # module-level NAME = <literal> and NAME += <literal>, in source order
+    consts: Dict[str, Any] = {}
+    for stmt in tree.body:
+        try:
+            if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+                consts[stmt.targets[0].id] = _literal(stmt.value, consts)
+            elif isinstance(stmt, ast.AugAssign) and isinstance(stmt.target, ast.Name) and isinstance(stmt.op, ast.Add):
+                consts[stmt.target.id] = consts[stmt.target.id] + _literal(stmt.value, consts)
+        except (_Unresolved, KeyError, TypeError):
+            continue
+
+    rows: List[Row] = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not _is_setup_call(node):
+            continue
+        kwargs: Dict[str, Tuple[Any, int]] = {}
+        for kw in node.keywords:
+            try:
+                if kw.arg is None:
+                    for k, v in (_literal(kw.value, consts) or {}).items():
+                        kwargs[k] = (v, kw.value.lineno)
+                elif kw.arg in SETUP_KWARGS:
+                    kwargs[kw.arg] = (_literal(kw.value, consts), kw.value.lineno)
+            except (_Unresolved, AttributeError, TypeError):
+                continue
+        if "install_requires" in kwargs:
+            value, line = kwargs["install_requires"]
+            if isinstance(value, str):
+                value = value.splitlines()
+            if isinstance(value, list):
+                rows += _rows(value, f"{fname}:{line}", None)
+        if "extras_require" in kwargs:
+            value, line = kwargs["extras_require"]
+            if isinstance(value, dict):
+                for extra, reqs in value.items():
+                    if isinstance(reqs, str):
+                        reqs = reqs.splitlines()
+                    if isinstance(reqs, list):
+                        rows += _rows(reqs, f"{fname}:{line}", str(extra))
+    return rows
+
+def _cached_rows(p: Path, kind: str) -> List[Row]:
+    data = p.read_bytes()
+    key = hashlib.sha256(f"{PARSER_VERSION}|{kind}|{p.name}|".encode() + data).hexdigest()
+    with _MEMO_LOCK:
+        hit = _MEMO.get(key)
+        if hit is not None:
+            _MEMO.move_to_end(key)
+            return hit
+    blob = cache_dir("setup-deps") / f"{key}.json"
+    try:
+        rows = [tuple(r) for r in json.loads(blob.read_text())]
+    except (OSError, ValueError):
+        text = data.decode("utf-8", errors="ignore")
+        rows = _parse_setup_cfg(text, p.name) if kind == "cfg" else _parse_setup_py(text, p.name)
+        try:
+            tmp = blob.with_suffix(".tmp")
+            tmp.write_text(json.dumps(rows))
+            os.replace(tmp, blob)
+        except OSError:
+            pass
+    with _MEMO_LOCK:
+        _MEMO[key] = rows
+        _MEMO.move_to_end(key)
+        while len(_MEMO) > MAX_MEMO_FILES:
+            _MEMO.popitem(last=False)
+    return rows
+
+def _to_deps(p: Path, rows: List[Row]) -> List[NormalizedDep]:
+    return [
+        NormalizedDep(
+            kind="pip",
+            name=name,
+            spec=spec,
+            extra=extra,
+            evidence=Evidence(source=str(p.name), location=location, excerpt=excerpt),
+        )
+        for name, spec, location, excerpt, extra in rows
+    ]
+
+def parse_setup_cfg(p: Path) -> List[NormalizedDep]:
+    return _to_deps(p, _cached_rows(p, "cfg"))
+
+def parse_setup_py(p: Path) -> List[NormalizedDep]:
+    return _to_deps(p, _cached_rows(p, "py"))
@@ -0,0 +1,69 @@
+# backend/rde_backend/singleflight.py
+from __future__ import annotations
+from typing import Any, Callable, Dict, Tuple
+import hashlib
+import json
+import os
+import threading
+
+# Single-flight coalescing: concurrent identical requests (double-clicked one-click
+# setup, two windows on the same repo) run once; every waiter gets the leader's result
+# or its exception. Nothing is cached after the leader finishes; that is the memos' job.
+
+def request_key(endpoint: str, repo_path: str, payload: Any) -> str:
+    repo = os.path.normcase(os.path.realpath(repo_path or "."))
+    body = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return f"{endpoint}|{repo}|" + hashlib.sha256(body.encode()).hexdigest()
+
+class _Call:
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn() once per key among concurrent callers. Returns (value, shared):
+        shared is True for callers that waited on someone else's call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"inflight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+INFLIGHT = SingleFlight()
@@ -16,8 +16,12 @@ class ConstraintGraph:
     python_current: Optional[str] = None
     gpu_present: bool = False
     nvcc_ok: bool = False
+    gpu_driver_version: Optional[str] = None
+    cuda_driver_version: Optional[str] = None
+    compute_caps: List[str] = field(default_factory=list)
 
     pip_deps: List[Dict[str, Any]] = field(default_factory=list)
+    pip_constraints: List[Dict[str, Any]] = field(default_factory=list)
     conda_deps: List[Dict[str, Any]] = field(default_factory=list)
     ros_deps: List[Dict[str, Any]] = field(default_factory=list)
     apt_deps: List[Dict[str, Any]] = field(default_factory=list)
@@ -27,6 +31,8 @@ class ConstraintGraph:
     # hard constraints to enforce during solve
     python_candidates: List[str] = field(default_factory=list)  # e.g. ["3.12", "3.11", "3.10"]
     pin_overrides: Dict[str, str] = field(default_factory=dict) # e.g. {"tensorflow": "<=2.10.*"}
+    extra_index_urls: List[str] = field(default_factory=list)   # e.g. ["https://download.pytorch.org/whl/cu121"]
+    wheel_choices: List[Dict[str, Any]] = field(default_factory=list)
 
     warnings: List[str] = field(default_factory=list)
     reasons: List[str] = field(default_factory=list)
@@ -51,7 +57,11 @@ def build_constraints(analysis: Dict[str, Any], choices: Dict[str, Any]) -> Cons
         python_current=(fp.get("python_versions", {}) or {}).get("python3") or (fp.get("python_versions", {}) or {}).get("python"),
         gpu_present=bool(fp.get("gpu_present")),
         nvcc_ok=bool(fp.get("nvcc_ok")),
+        gpu_driver_version=fp.get("gpu_driver_version"),
+        cuda_driver_version=fp.get("cuda_driver_version"),
+        compute_caps=[x.get("compute_capability") for x in fp.get("gpus", []) or [] if x.get("compute_capability")],
         pip_deps=list(deps.get("pip", []) or []),
+        pip_constraints=list(deps.get("pip_constraints", []) or []),
         conda_deps=list(deps.get("conda", []) or []),
         ros_deps=list(deps.get("ros", []) or []),
         apt_deps=list(deps.get("apt", []) or []),
@@ -0,0 +1,270 @@
+from __future__ import annotations
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+import argparse
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import sys
+import threading
+import time
+
+from ..paths import cache_dir
+
+# Content-addressed environment store shared across repositories.
+#
+#   <root>/<key>/env          the environment itself (venv or conda prefix)
+#   <root>/<key>/meta.json    python/platform/kind, timestamps
+#   <root>/<key>/refs/<h>     one file per repo using it (h = hash of the repo path);
+#                             separate files, so concurrent `ref` processes never
+#                             rewrite each other's entries. mtime = last use
+#   <root>/<key>/READY        written by the plan once installation finished;
+#                             contains the build time in seconds
+#   <root>/<key>/.building/   build lock, held from the first build command until READY;
+#                             dropped early by whichever build command fails
+#
+# key = sha256(lock, python target, platform, kind). venvs are not relocatable, so a
+# repo reuses one through a `.venv` symlink; conda envs are hardlink-cloned with --clone.
+# Planning only looks records up; a repo is added to refs by the plan step that links
+# or publishes the env (`python -m rde_backend.solve.env_store ref`), once it ran.
+
+ENV_STORE_ENV = "RDE_ENV_STORE_DIR"
+
+# unreferenced environments are kept this long before gc removes them
+GC_MIN_IDLE_S = 14 * 24 * 3600
+# an env that never became READY is considered abandoned after this
+GC_STALE_BUILD_S = 24 * 3600
+# a build lock this old is taken over (its build died without releasing it)
+BUILD_LOCK_STALE_MIN = 60
+BUILD_LOCK_NAME = ".building"
+
+@dataclass
+class EnvRecord:
+    key: str
+    kind: str                       # "venv" | "conda"
+    python: str
+    platform: str
+    path: str                       # <root>/<key>/env
+    created_at: float = 0.0
+    last_used: float = 0.0
+    refs: List[str] = field(default_factory=list)
+    ready: bool = False
+    build_seconds: Optional[float] = None
+
+def env_key(lock_text: str, python_target: str, platform: str, kind: str) -> str:
+    # ignore comments/blank lines so regenerating the same lock keeps the key
+    lines = [ln.rstrip() for ln in lock_text.splitlines() if ln.strip() and not ln.lstrip().startswith("#")]
+    h = hashlib.sha256()
+    for part in (kind, python_target, platform, "\n".join(lines)):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+class EnvStore:
+    def __init__(self, root: Optional[Path] = None):
+        base = os.environ.get(ENV_STORE_ENV)
+        self.root = root or (Path(base).expanduser() if base else cache_dir("envs"))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _dir(self, key: str) -> Path:
+        return self.root / key
+
+    def _meta_path(self, key: str) -> Path:
+        return self._dir(key) / "meta.json"
+
+    def ready_marker(self, key: str) -> Path:
+        return self._dir(key) / "READY"
+
+    def _ref_path(self, key: str, repo: str) -> Path:
+        return self._dir(key) / "refs" / hashlib.sha256(repo.encode()).hexdigest()[:16]
+
+    def _read_refs(self, rec: EnvRecord) -> None:
+        try:
+            files = list((self._dir(rec.key) / "refs").iterdir())
+        except OSError:
+            files = []
+        for f in files:
+            try:
+                rec.refs.append(f.read_text())
+                rec.last_used = max(rec.last_used, f.stat().st_mtime)
+            except OSError:
+                continue
+        rec.refs.sort()
+
+    def get(self, key: str) -> Optional[EnvRecord]:
+        try:
+            data = json.loads(self._meta_path(key).read_text())
+        except (OSError, ValueError):
+            return None
+        rec = EnvRecord(**{**data, "refs": []})
+        self._read_refs(rec)
+        marker = self.ready_marker(key)
+        rec.ready = marker.exists() and Path(rec.path).exists()
+        if rec.ready:
+            try:
+                rec.build_seconds = float(marker.read_text().strip() or 0) or rec.build_seconds
+            except (OSError, ValueError):
+                pass
+        return rec
+
+    def _save(self, rec: EnvRecord) -> None:
+        d = self._dir(rec.key)
+        d.mkdir(parents=True, exist_ok=True)
+        tmp = self._meta_path(rec.key).with_suffix(".tmp")
+        # refs live in refs/, never in meta.json
+        tmp.write_text(json.dumps({**asdict(rec), "refs": []}))
+        os.replace(tmp, self._meta_path(rec.key))
+
+    def record(self, key: str, kind: str, python: str, platform: str) -> EnvRecord:
+        """
+        Get-or-create the record for `key`, without referencing it.
+        """
+        with self._lock:
+            rec = self.get(key)
+            if rec is None:
+                rec = EnvRecord(
+                    key=key,
+                    kind=kind,
+                    python=python,
+                    platform=platform,
+                    path=str(self._dir(key) / "env"),
+                    created_at=time.time(),
+                )
+                self._save(rec)
+            return rec
+
+    def add_ref(self, key: str, repo: str) -> bool:
+        """
+        Record that `repo` uses the env; False if there is no such record.
+        """
+        if not self._meta_path(key).exists():
+            return False
+        ref = self._ref_path(key, repo)
+        ref.parent.mkdir(parents=True, exist_ok=True)
+        # write-then-rename (which also bumps mtime, the last use)
+        tmp = ref.with_name(f".{ref.name}.{os.getpid()}.{threading.get_ident()}")
+        tmp.write_text(repo)
+        os.replace(tmp, ref)
+        return True
+
+    def release(self, key: str, repo: str) -> None:
+        try:
+            self._ref_path(key, repo).unlink()
+        except OSError:
+            pass
+
+    def ready_state(self) -> str:
+        """
+        Token that changes when an env becomes (or stops being) READY, for memo keys of
+        plans that reuse or build stored envs.
+        """
+        try:
+            ready = sorted(d.name for d in self.root.iterdir() if self.ready_marker(d.name).exists())
+        except OSError:
+            return "-"
+        return hashlib.sha256("\n".join(ready).encode()).hexdigest()[:16]
+
+    def list(self) -> List[EnvRecord]:
+        out = []
+        for d in sorted(self.root.iterdir()) if self.root.exists() else []:
+            if d.is_dir():
+                rec = self.get(d.name)
+                if rec is not None:
+                    out.append(rec)
+        return out
+
+    def _live_refs(self, rec: EnvRecord) -> List[str]:
+        """
+        Keep only repos that still point at this env (a .venv symlink, or a conda
+        clone recorded by path), so deleted or re-pointed repos drop their reference.
+        """
+        live = []
+        for repo in rec.refs:
+            link = Path(repo) / ".venv"
+            if rec.kind == "venv":
+                try:
+                    if link.is_symlink() and Path(os.readlink(link)) == Path(rec.path):
+                        live.append(repo)
+                except OSError:
+                    continue
+            elif Path(repo).exists():
+                live.append(repo)
+        return live
+
+    def gc(self, min_idle_s: float = GC_MIN_IDLE_S, dry_run: bool = False) -> Dict[str, List[str]]:
+        removed: List[str] = []
+        kept: List[str] = []
+        now = time.time()
+        with self._lock:
+            for rec in self.list():
+                live = self._live_refs(rec)
+                if not dry_run:
+                    for repo in set(rec.refs) - set(live):
+                        self.release(rec.key, repo)
+                rec.refs = live
+                idle = now - (rec.last_used or rec.created_at)
+                abandoned = not rec.ready and idle > GC_STALE_BUILD_S
+                if (not rec.refs and idle > min_idle_s) or abandoned:
+                    removed.append(rec.key)
+                    if not dry_run:
+                        shutil.rmtree(self._dir(rec.key), ignore_errors=True)
+                else:
+                    kept.append(rec.key)
+                    if not dry_run:
+                        self._save(rec)
+        return {"removed": removed, "kept": kept}
+
+def ref_command(root: Path, key: str, repo: str) -> str:
+    """
+    Shell command, run by the plan once the env is linked/published, that adds `repo` to its refs.
+    """
+    backend_dir = Path(__file__).resolve().parents[2]
+    q = shlex.quote
+    return (
+        f"PYTHONPATH={q(str(backend_dir))} {q(sys.executable)} -m rde_backend.solve.env_store ref"
+        f" --root {q(str(root))} --key {q(key)} --repo {q(repo)}"
+    )
+
+def build_lock_command(env_dir: str, repo: str) -> str:
+    """
+    First command of a build: take <env_dir>/.building (mkdir is atomic), or fail while
+    another repo's build holds it. The same repo re-running a failed build, or a lock
+    older than BUILD_LOCK_STALE_MIN, takes it over.
+    """
+    lock = shlex.quote(f"{env_dir}/{BUILD_LOCK_NAME}")
+    owner = shlex.quote(repo)
+    return (
+        f"mkdir -p {shlex.quote(env_dir)} && "
+        f"if mkdir {lock} 2>/dev/null || [ \"$(cat {lock}/repo 2>/dev/null)\" = {owner} ]"
+        f" || [ -n \"$(find {lock} -maxdepth 0 -mmin +{BUILD_LOCK_STALE_MIN})\" ];"
+        f" then echo {owner} > {lock}/repo;"
+        f" else echo \"environment is being built by $(cat {lock}/repo); retry when it finishes\" >&2; exit 1; fi"
+    )
+
+def build_unlock_command(env_dir: str) -> str:
+    return f"rm -rf {shlex.quote(f'{env_dir}/{BUILD_LOCK_NAME}')}"
+
+def unlock_on_failure(cmd: str, env_dir: str, repo: str) -> str:
+    """
+    `cmd`, releasing the build lock when it fails (and `repo` holds it), so a failed
+    build doesn't keep other repos out until the lock goes stale. Exits with cmd's status.
+    """
+    lock = shlex.quote(f"{env_dir}/{BUILD_LOCK_NAME}")
+    return f"( {cmd} ) || {{ rc=$?; [ \"$(cat {lock}/repo 2>/dev/null)\" = {shlex.quote(repo)} ] && rm -rf {lock}; exit $rc; }}"
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="rde_backend.solve.env_store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("ref", help="record that a repo uses a stored environment")
+    p.add_argument("--root", required=True)
+    p.add_argument("--key", required=True)
+    p.add_argument("--repo", required=True)
+    args = ap.parse_args(argv)
+    return 0 if EnvStore(Path(args.root)).add_ref(args.key, args.repo) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+import yaml
+
+from .constraints import ConstraintGraph
+from .pep440 import canonical_name
+from .specifiers import intersect, parse_spec
+
+# Picks the CUDA (or CPU) wheel index and version pins for torch / tensorflow / jax
+# from the fingerprinted driver and compute capability, before anything is resolved:
+# a cu124 torch on a 470 driver, or PyPI's CUDA-bundled Linux torch for a CPU-only
+# goal, are multi-GB downloads that can only fail or go unused. The table lives in
+# gpu_wheels.yaml.
+
+GPU_WHEELS_PATH = Path(__file__).parent / "gpu_wheels.yaml"
+CPU_GOALS = {"cpu_only", "cpu"}
+
+@dataclass
+class WheelChoice:
+    framework: str
+    variant: str                  # table id: "cu124", "and-cuda", "cpu", ...
+    package: str                  # requirement name the pin applies to (may carry extras)
+    pin: Optional[str]
+    index: Optional[str]
+    reason: str
+
+def load_table(path: Path = GPU_WHEELS_PATH) -> Dict[str, Any]:
+    return _load_table(str(path), path.stat().st_mtime_ns)
+
+@lru_cache(maxsize=4)
+def _load_table(path: str, mtime_ns: int) -> Dict[str, Any]:
+    return (yaml.safe_load(Path(path).read_text()) or {}).get("frameworks", {})
+
+def _ver(s: Optional[str]) -> Tuple[int, ...]:
+    return tuple(int(x) for x in re.findall(r"\d+", s or ""))
+
+def _os_key(os_name: str) -> str:
+    n = os_name.lower()
+    if n.startswith("win"):
+        return "windows"
+    if n.startswith("darwin") or n.startswith("mac"):
+        return "darwin"
+    return "linux"
+
+def _wanted_specs(g: ConstraintGraph, framework: str) -> List[str]:
+    # what the repo declares plus any pin the rules already put on it
+    specs = [d["spec"] for d in g.pip_deps if d.get("spec") and canonical_name(str(d.get("name", "")).split("[", 1)[0]) == framework]
+    specs += [v for k, v in g.pin_overrides.items() if canonical_name(k.split("[", 1)[0]) == framework]
+    return specs
+
+def _misfit(v: Dict[str, Any], os_key: str, driver: Tuple[int, ...], ccs: List[Tuple[int, ...]], specs: List[str]) -> Optional[str]:
+    # why variant `v` can't be used here, or None when it fits
+    if os_key not in v.get("os", [os_key]):
+        return f"not built for {os_key}"
+    need = (v.get("min_driver") or {}).get(os_key)
+    if need and driver < _ver(need):
+        return f"needs driver >= {need}"
+    if ccs:
+        lo, hi = _ver(v.get("min_cc")), _ver(v.get("max_cc"))
+        if lo and min(ccs) < lo:
+            return f"needs compute capability >= {v['min_cc']}"
+        if hi and max(ccs) > hi:
+            return f"no kernels for compute capability > {v['max_cc']}"
+    want = parse_spec(v["pin"]) if v.get("pin") else None
+    for spec in specs if want is not None else []:
+        have = parse_spec(spec)
+        if have is not None and not intersect(have, want):
+            return f"repo needs {spec}, variant ships {v['pin']}"
+    return None
+
+def select_wheels(g: ConstraintGraph, table: Optional[Dict[str, Any]] = None) -> List[WheelChoice]:
+    table = table if table is not None else load_table()
+    os_key = _os_key(g.os_name)
+    driver = _ver(g.gpu_driver_version)
+    ccs = [_ver(c) for c in g.compute_caps if c]
+    out: List[WheelChoice] = []
+    for fw in sorted(g.critical & set(table)):
+        entry = table[fw]
+        specs = _wanted_specs(g, fw)
+        chosen, reason = None, ""
+        if g.goal in CPU_GOALS:
+            reason = "goal is CPU-only"
+        elif not driver:
+            reason = "no NVIDIA driver detected"
+        else:
+            rejected = []
+            for v in entry.get("variants", []):
+                why = _misfit(v, os_key, driver, ccs, specs)
+                if why is None:
+                    chosen = v
+                    break
+                rejected.append(f"{v['id']}: {why}")
+            cc = ", compute capability " + ".".join(map(str, max(ccs))) if ccs else ", compute capability not reported"
+            if chosen is not None:
+                reason = f"driver {g.gpu_driver_version} (CUDA {g.cuda_driver_version or '?'}{cc})"
+                if chosen.get("note"):
+                    reason += f"; {chosen['note']}"
+            else:
+                reason = "no CUDA variant fits (" + "; ".join(rejected) + ")"
+        if chosen is None:
+            cpu = entry.get("cpu") or {"id": "cpu"}
+            if os_key not in cpu.get("os", [os_key]):
+                cpu = {"id": "cpu"}     # default PyPI wheels are already CPU-only here
+            chosen = cpu
+        out.append(WheelChoice(
+            framework=fw,
+            variant=chosen["id"],
+            package=chosen.get("package", fw),
+            pin=chosen.get("pin"),
+            index=chosen.get("index"),
+            reason=reason,
+        ))
+    return out
+
+def apply_wheel_choices(g: ConstraintGraph, choices: List[WheelChoice]) -> None:
+    """
+    Record choices on the graph; for pip envs also add the extra indexes and pins
+    that steer resolution to the chosen variant.
+    """
+    g.wheel_choices = [c.__dict__ for c in choices]
+    for c in choices:
+        g.reasons.append(f"{c.framework}: {c.variant} wheels ({c.reason}).")
+        if g.env_type != "venv":
+            continue
+        if c.index and c.index not in g.extra_index_urls:
+            g.extra_index_urls.append(c.index)
+        if c.pin:
+            g.pin_overrides.setdefault(c.package, c.pin)
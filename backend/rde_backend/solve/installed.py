@@ -0,0 +1,271 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from email.parser import HeaderParser
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import os
+import re
+import threading
+
+from .markers import evaluate_marker
+from .pep440 import canonical_name, parse_requirement, parse_version, spec_contains
+
+# Installed-package indexes read straight from disk instead of `dpkg -l` / `pip list`:
+#   dpkg   /var/lib/dpkg/status                 package -> version ("install ok installed")
+#   pip    <site-packages>/*.dist-info|egg-info canonical name -> version (from dir names)
+#   conda  <prefix>/conda-meta/*.json            name -> version (from file names)
+# Each is parsed once per process and reused until the status file's / directory's
+# mtime changes (installs and removals add or rename entries, which bumps it).
+# The split_* helpers let plan builders install only what is missing.
+
+DPKG_STATUS_PATH = "/var/lib/dpkg/status"
+# alternative status file, e.g. a container's or a recorded one
+DPKG_STATUS_ENV = "RDE_DPKG_STATUS"
+
+# venv / conda layouts, plus Debian's system dirs (for prefixes /usr and /usr/local)
+SITE_PACKAGES_GLOBS = ("lib/python3*/site-packages", "Lib/site-packages", "lib/python3/dist-packages", "lib/python3*/dist-packages")
+SITE_PACKAGES_DIR_RE = re.compile(r"python(\d+\.\d+)")
+
+@dataclass
+class InstalledIndex:
+    kind: str                                   # "dpkg" | "pip" | "conda"
+    source: str                                 # file or dir(s) the index was read from
+    packages: Dict[str, str] = field(default_factory=dict)
+    where: Dict[str, str] = field(default_factory=dict)     # name -> dist-info dir / conda-meta file
+    provides: Dict[str, str] = field(default_factory=dict)  # dpkg virtual package -> provider
+
+    def version(self, name: str) -> Optional[str]:
+        return self.packages.get(self.key(name))
+
+    def key(self, name: str) -> str:
+        return canonical_name(name) if self.kind == "pip" else name.lower()
+
+_CACHE: Dict[Tuple[str, str], Tuple[int, InstalledIndex]] = {}
+_CACHE_LOCK = threading.Lock()
+
+def _cached(kind: str, path: Path, build: Callable[[Path], InstalledIndex]) -> Optional[InstalledIndex]:
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    key = (kind, str(path))
+    with _CACHE_LOCK:
+        hit = _CACHE.get(key)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    idx = build(path)
+    with _CACHE_LOCK:
+        _CACHE[key] = (mtime, idx)
+    return idx
+
+# ---- dpkg -------------------------------------------------------------------------
+
+def _build_dpkg(path: Path) -> InstalledIndex:
+    idx = InstalledIndex(kind="dpkg", source=str(path))
+    fields: Dict[str, str] = {}
+
+    def flush() -> None:
+        name = fields.get("package", "").lower()
+        if name and fields.get("status", "").endswith(" installed"):
+            version = fields.get("version", "")
+            idx.packages[name] = version
+            arch = fields.get("architecture")
+            if arch:
+                idx.packages[f"{name}:{arch}"] = version
+            for p in fields.get("provides", "").split(","):
+                virtual = p.split("(", 1)[0].strip().lower()
+                if virtual:
+                    idx.provides.setdefault(virtual, name)
+        fields.clear()
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line == "\n":
+                flush()
+            elif line[0] not in " \t":
+                k, _, v = line.partition(":")
+                # only the short fields; Description/Conffiles continuation lines are skipped
+                if k in ("Package", "Status", "Version", "Architecture", "Provides"):
+                    fields[k.lower()] = v.strip()
+    flush()
+    return idx
+
+def dpkg_index(path: Optional[str] = None) -> Optional[InstalledIndex]:
+    """
+    Installed Debian packages, or None on systems without dpkg.
+    """
+    return _cached("dpkg", Path(path or os.environ.get(DPKG_STATUS_ENV) or DPKG_STATUS_PATH), _build_dpkg)
+
+def dpkg_installed(idx: InstalledIndex, name: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (installed version, providing package when `name` is virtual).
+    """
+    v = idx.version(name)
+    if v is not None:
+        return v, None
+    provider = idx.provides.get(name.lower())
+    if provider is not None:
+        return idx.packages.get(provider), provider
+    return None, None
+
+# ---- site-packages ----------------------------------------------------------------
+
+def _egg_info_version(path: Path) -> str:
+    meta = path / "PKG-INFO" if path.is_dir() else path
+    try:
+        return (HeaderParser().parsestr(meta.read_text(errors="replace")).get("Version") or "").strip()
+    except OSError:
+        return ""
+
+def _build_site_packages(path: Path) -> InstalledIndex:
+    idx = InstalledIndex(kind="pip", source=str(path))
+    try:
+        entries = list(os.scandir(path))
+    except OSError:
+        return idx
+    for e in entries:
+        if e.name.endswith(".dist-info"):
+            # {name}-{version}.dist-info; the name is escaped, the version has no '-'
+            name, _, version = e.name[:-len(".dist-info")].rpartition("-")
+        elif e.name.endswith(".egg-info"):
+            parts = e.name[:-len(".egg-info")].split("-")
+            name = parts[0]
+            version = parts[1] if len(parts) > 1 else _egg_info_version(Path(e.path))
+        else:
+            continue
+        if name:
+            key = canonical_name(name)
+            idx.packages[key] = version
+            idx.where[key] = e.name
+    return idx
+
+def site_packages_dirs(prefix: str | Path, python: Optional[str] = None) -> List[Path]:
+    """
+    Package dirs under `prefix`; with `python` ("3.12"), only that interpreter's.
+    """
+    root = Path(prefix)
+    globs = [g.replace("python3*", f"python{python}") for g in SITE_PACKAGES_GLOBS] if python else SITE_PACKAGES_GLOBS
+    return [p for pattern in dict.fromkeys(globs) for p in sorted(root.glob(pattern)) if p.is_dir()]
+
+def site_packages_python(prefix: str | Path) -> Optional[str]:
+    """
+    "3.12" for a prefix with lib/python3.12/site-packages, or None.
+    """
+    for d in site_packages_dirs(prefix):
+        m = SITE_PACKAGES_DIR_RE.search(d.parent.name)
+        if m:
+            return m.group(1)
+    return None
+
+def pip_index(prefix: str | Path, python: Optional[str] = None) -> Optional[InstalledIndex]:
+    """
+    Distributions installed in a venv / conda prefix, or None if it has no site-packages.
+    """
+    dirs = site_packages_dirs(prefix, python)
+    if not dirs:
+        return None
+    merged = InstalledIndex(kind="pip", source=os.pathsep.join(str(d) for d in dirs))
+    for d in dirs:
+        idx = _cached("pip", d, _build_site_packages)
+        if idx is None:
+            continue
+        for k, v in idx.packages.items():
+            merged.packages.setdefault(k, v)
+            merged.where.setdefault(k, str(d / idx.where[k]))
+    return merged
+
+# ---- conda-meta -------------------------------------------------------------------
+
+def _build_conda_meta(path: Path) -> InstalledIndex:
+    idx = InstalledIndex(kind="conda", source=str(path))
+    try:
+        names = os.listdir(path)
+    except OSError:
+        return idx
+    for fn in names:
+        # {name}-{version}-{build}.json; names may contain '-', version and build don't
+        parts = fn[:-len(".json")].rsplit("-", 2) if fn.endswith(".json") else []
+        if len(parts) == 3:
+            key = parts[0].lower()
+            idx.packages[key] = parts[1]
+            idx.where[key] = str(path / fn)
+    return idx
+
+def conda_index(prefix: str | Path) -> Optional[InstalledIndex]:
+    """
+    Packages in a conda prefix, or None if it isn't one.
+    """
+    return _cached("conda", Path(prefix) / "conda-meta", _build_conda_meta)
+
+# ---- pruning ----------------------------------------------------------------------
+
+def pip_satisfies(have: Optional[str], spec: Optional[str]) -> bool:
+    if have is None:
+        return False
+    v = parse_version(have)
+    # an unparseable installed version can't be compared; presence is what we know
+    return not spec or v is None or spec_contains(spec, v)
+
+def split_pip(reqs: Iterable[str], idx: Optional[InstalledIndex], env: Optional[Dict[str, str]] = None) -> Tuple[List[str], List[str]]:
+    """
+    (missing, satisfied) requirement lines. Lines with extras or URLs, or that can't be
+    parsed, always count as missing: the extras' own deps aren't visible from here.
+    Lines whose marker doesn't hold for `env` are dropped.
+    """
+    missing: List[str] = []
+    satisfied: List[str] = []
+    for line in dict.fromkeys(r.strip() for r in reqs if r.strip()):
+        req = parse_requirement(line)
+        if req is not None and req.marker and env is not None and not evaluate_marker(req.marker, env):
+            continue
+        if req is None or req.extras or req.url or idx is None or not pip_satisfies(idx.version(req.name), req.spec):
+            missing.append(line)
+        else:
+            satisfied.append(line)
+    return missing, satisfied
+
+def split_dpkg(pkgs: Iterable[str], idx: Optional[InstalledIndex]) -> Tuple[List[str], List[str]]:
+    """
+    (missing, installed) Debian packages; virtual packages count when a provider is installed.
+    """
+    missing: List[str] = []
+    present: List[str] = []
+    for p in dict.fromkeys(pkgs):
+        if idx is not None and dpkg_installed(idx, p)[0] is not None:
+            present.append(p)
+        else:
+            missing.append(p)
+    return missing, present
+
+def split_conda(specs: Iterable[Tuple[str, Optional[str]]], idx: Optional[InstalledIndex]) -> Tuple[List[str], List[str]]:
+    """
+    (missing, installed) conda match specs. Conda specs aren't PEP 440, so only exact
+    ("=1.2" / "==1.2") or no version is compared; anything else is installed anyway.
+    """
+    missing: List[str] = []
+    present: List[str] = []
+    for name, spec in dict.fromkeys(specs):
+        line = f"{name}{spec or ''}"
+        have = idx.version(name) if idx is not None else None
+        want = (spec or "").lstrip("=").strip()
+        if have is not None and (not spec or (spec.startswith("=") and have == want)):
+            present.append(line)
+        else:
+            missing.append(line)
+    return missing, present
+
+def installed_state(*paths: str | Path, python: Optional[str] = None) -> str:
+    """
+    Token that changes whenever the dpkg status file or the given prefixes' package dirs
+    change, for memo keys of anything built from these indexes.
+    """
+    files = [Path(os.environ.get(DPKG_STATUS_ENV) or DPKG_STATUS_PATH)]
+    for p in paths:
+        files += site_packages_dirs(p, python) + [Path(p) / "conda-meta"]
+    out = []
+    for f in files:
+        try:
+            out.append(str(f.stat().st_mtime_ns))
+        except OSError:
+            out.append("-")
+    return ":".join(out)
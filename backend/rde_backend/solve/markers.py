@@ -0,0 +1,145 @@
+from __future__ import annotations
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import re
+
+from .pep440 import parse_version, spec_contains, canonical_name
+
+# Tiny PEP 508 environment-marker evaluator (enough for Requires-Dist lines).
+
+TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<str>'[^']*'|"[^"]*")
+      | (?P<op>===|==|!=|<=|>=|~=|<|>|not\s+in\b|in\b)
+      | (?P<bool>and\b|or\b)
+      | (?P<paren>[()])
+      | (?P<var>[A-Za-z_][A-Za-z0-9_.]*)
+    )""",
+    re.VERBOSE,
+)
+
+VERSION_VARS = {"python_version", "python_full_version", "implementation_version", "platform_release"}
+
+def marker_env(python_version: str, os_name: str = "linux", arch: str = "x86_64") -> Dict[str, str]:
+    """
+    Build a marker environment for a target interpreter (e.g. "3.11") on a target OS.
+    """
+    osl = (os_name or "").lower()
+    if osl.startswith("win"):
+        sys_platform, platform_system, py_os = "win32", "Windows", "nt"
+    elif osl.startswith("darwin") or osl.startswith("mac"):
+        sys_platform, platform_system, py_os = "darwin", "Darwin", "posix"
+    else:
+        sys_platform, platform_system, py_os = "linux", "Linux", "posix"
+    parts = python_version.split(".")
+    full = python_version if len(parts) >= 3 else f"{python_version}.0"
+    return {
+        "python_version": ".".join(parts[:2]),
+        "python_full_version": full,
+        "implementation_version": full,
+        "implementation_name": "cpython",
+        "platform_python_implementation": "CPython",
+        "os_name": py_os,
+        "sys_platform": sys_platform,
+        "platform_system": platform_system,
+        "platform_machine": arch or "x86_64",
+        "platform_release": "",
+        "platform_version": "",
+        "extra": "",
+    }
+
+@lru_cache(maxsize=8192)
+def _tokenize(marker: str) -> Tuple[Tuple[str, str], ...]:
+    out: List[Tuple[str, str]] = []
+    pos = 0
+    while pos < len(marker):
+        m = TOKEN_RE.match(marker, pos)
+        if not m or m.end() == pos:
+            if marker[pos:].strip() == "":
+                break
+            raise ValueError(f"bad marker: {marker!r}")
+        kind = m.lastgroup or ""
+        val = m.group(kind)
+        if kind == "op":
+            val = re.sub(r"\s+", " ", val)
+        out.append((kind, val))
+        pos = m.end()
+    return tuple(out)
+
+def _compare(lhs: str, op: str, rhs: str, version_like: bool) -> bool:
+    if op == "in":
+        return lhs in rhs
+    if op == "not in":
+        return lhs not in rhs
+    if version_like:
+        v = parse_version(lhs)
+        if v is not None and parse_version(rhs.rstrip(".*")) is not None:
+            return spec_contains(f"{op}{rhs}", v)
+    if op == "==":
+        return lhs == rhs
+    if op == "!=":
+        return lhs != rhs
+    if op == "===":
+        return lhs == rhs
+    # ordering on non-versions is undefined by PEP 508; be permissive
+    return True
+
+class _Parser:
+    def __init__(self, tokens: Tuple[Tuple[str, str], ...], env: Dict[str, str]):
+        self.toks = tokens
+        self.i = 0
+        self.env = env
+
+    def peek(self) -> Optional[Tuple[str, str]]:
+        return self.toks[self.i] if self.i < len(self.toks) else None
+
+    def take(self) -> Tuple[str, str]:
+        t = self.toks[self.i]
+        self.i += 1
+        return t
+
+    def expr(self) -> bool:
+        val = self.conj()
+        while self.peek() == ("bool", "or"):
+            self.take()
+            rhs = self.conj()
+            val = val or rhs
+        return val
+
+    def conj(self) -> bool:
+        val = self.atom()
+        while self.peek() == ("bool", "and"):
+            self.take()
+            rhs = self.atom()
+            val = val and rhs
+        return val
+
+    def atom(self) -> bool:
+        if self.peek() == ("paren", "("):
+            self.take()
+            val = self.expr()
+            self.take()  # ")"
+            return val
+        lk, lv = self.take()
+        _, op = self.take()
+        rk, rv = self.take()
+        lhs = self.value(lk, lv)
+        rhs = self.value(rk, rv)
+        var = lv if lk == "var" else rv if rk == "var" else ""
+        if var == "extra":
+            lhs, rhs = canonical_name(lhs), canonical_name(rhs)
+        return _compare(lhs, op, rhs, var in VERSION_VARS)
+
+    def value(self, kind: str, val: str) -> str:
+        if kind == "str":
+            return val[1:-1]
+        return self.env.get(val, "")
+
+def evaluate_marker(marker: Optional[str], env: Dict[str, str]) -> bool:
+    if not marker:
+        return True
+    try:
+        return _Parser(_tokenize(marker), env).expr()
+    except (ValueError, IndexError):
+        # malformed marker: keep the requirement, the authoritative resolver decides
+        return True
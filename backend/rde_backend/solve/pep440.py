@@ -0,0 +1,198 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from functools import lru_cache, total_ordering
+from typing import List, Optional, Tuple
+import re
+
+# Minimal PEP 440 / PEP 508 support for the in-process resolver.
+# We deliberately avoid depending on `packaging` so the backend stays light.
+
+VERSION_RE = re.compile(
+    r"""
+    ^\s*v?
+    (?:(?P<epoch>[0-9]+)!)?
+    (?P<release>[0-9]+(?:\.[0-9]+)*)
+    (?P<pre>[-_.]?(?P<pre_l>a|b|c|rc|alpha|beta|pre|preview)[-_.]?(?P<pre_n>[0-9]+)?)?
+    (?P<post>(?:-(?P<post_n1>[0-9]+))|(?:[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>[0-9]+)?))?
+    (?P<dev>[-_.]?dev[-_.]?(?P<dev_n>[0-9]+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+    \s*$
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+PRE_ALIASES = {"alpha": "a", "beta": "b", "c": "rc", "pre": "rc", "preview": "rc"}
+
+CLAUSE_RE = re.compile(r"^\s*(~=|===|==|!=|<=|>=|<|>)\s*(\S+)\s*$")
+
+REQ_RE = re.compile(
+    r"^\s*(?P<name>[A-Za-z0-9][A-Za-z0-9._\-]*)\s*"
+    r"(?:\[(?P<extras>[^\]]*)\])?\s*"
+    r"(?P<spec>\(?[^;@]*?\)?)?\s*"
+    r"(?:@\s*(?P<url>[^;\s]+))?\s*"
+    r"(?:;\s*(?P<marker>.+))?$"
+)
+
+def canonical_name(name: str) -> str:
+    # PEP 503 normalization
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+@total_ordering
+@dataclass(frozen=True)
+class Version:
+    epoch: int
+    release: Tuple[int, ...]
+    pre: Optional[Tuple[str, int]] = None
+    post: Optional[int] = None
+    dev: Optional[int] = None
+    local: Optional[str] = None
+    text: str = field(default="", compare=False)
+
+    @property
+    def is_prerelease(self) -> bool:
+        return self.pre is not None or self.dev is not None
+
+    @property
+    def public(self) -> "Version":
+        return Version(self.epoch, self.release, self.pre, self.post, self.dev, None, self.text.split("+", 1)[0])
+
+    def key(self) -> tuple:
+        # mirrors the ordering rules of PEP 440 (same idea as packaging's _cmpkey)
+        release = list(self.release)
+        while len(release) > 1 and release[-1] == 0:
+            release.pop()
+        if self.pre is None and self.post is None and self.dev is not None:
+            pre: tuple = (-1, "", 0)      # 1.0.dev0 sorts before 1.0a0
+        elif self.pre is None:
+            pre = (1, "", 0)
+        else:
+            pre = (0, self.pre[0], self.pre[1])
+        post = (-1,) if self.post is None else (0, self.post)
+        dev = (1,) if self.dev is None else (0, self.dev)
+        local: tuple = ()
+        if self.local:
+            local = tuple((0, int(p), "") if p.isdigit() else (-1, 0, p) for p in re.split(r"[-_.]", self.local))
+        return (self.epoch, tuple(release), pre, post, dev, local)
+
+    def __lt__(self, other: "Version") -> bool:
+        return self.key() < other.key()
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Version) and self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def __str__(self) -> str:
+        return self.text
+
+@lru_cache(maxsize=65536)
+def parse_version(s: str) -> Optional[Version]:
+    m = VERSION_RE.match(s)
+    if not m:
+        return None
+    pre = None
+    if m.group("pre_l"):
+        label = m.group("pre_l").lower()
+        pre = (PRE_ALIASES.get(label, label), int(m.group("pre_n") or 0))
+    post = None
+    if m.group("post"):
+        post = int(m.group("post_n1") or m.group("post_n2") or 0)
+    dev = int(m.group("dev_n") or 0) if m.group("dev") else None
+    local = m.group("local").lower() if m.group("local") else None
+    return Version(
+        epoch=int(m.group("epoch") or 0),
+        release=tuple(int(x) for x in m.group("release").split(".")),
+        pre=pre,
+        post=post,
+        dev=dev,
+        local=local,
+        text=s.strip(),
+    )
+
+def _pad(rel: Tuple[int, ...], n: int) -> Tuple[int, ...]:
+    return rel + (0,) * (n - len(rel))
+
+def _clause_contains(op: str, target: str, v: Version) -> bool:
+    if op == "===":
+        return str(v) == target
+    if target.endswith(".*") and op in ("==", "!="):
+        prefix = parse_version(target[:-2])
+        if prefix is None:
+            return True
+        n = len(prefix.release)
+        hit = v.epoch == prefix.epoch and _pad(v.release, n)[:n] == prefix.release
+        return hit if op == "==" else not hit
+    t = parse_version(target)
+    if t is None:
+        return True  # unparseable clause -> permissive; the real resolver will judge
+    if op == "~=":
+        if len(t.release) < 2:
+            return True
+        n = len(t.release) - 1
+        return v >= t and v.epoch == t.epoch and _pad(v.release, n)[:n] == t.release[:n]
+    # local versions only take part in == comparisons when the target has one
+    cmp_v = v if (t.local and op in ("==", "!=")) else v.public
+    if op == "==":
+        return cmp_v == t
+    if op == "!=":
+        return cmp_v != t
+    if op == "<=":
+        return cmp_v <= t
+    if op == ">=":
+        return cmp_v >= t
+    if op == "<":
+        return cmp_v < t and not (v.is_prerelease and not t.is_prerelease and v.release == t.release)
+    if op == ">":
+        return cmp_v > t and not (v.post is not None and t.post is None and v.release == t.release)
+    return True
+
+@lru_cache(maxsize=16384)
+def parse_clauses(spec: Optional[str]) -> Tuple[Tuple[str, str], ...]:
+    """
+    Split "!=1.2.*, >=1.0" into (op, version) pairs.
+    Unknown fragments (poetry carets, bare versions) are dropped.
+    """
+    if not spec:
+        return ()
+    out: List[Tuple[str, str]] = []
+    for part in spec.strip().strip("()").split(","):
+        m = CLAUSE_RE.match(part)
+        if m:
+            out.append((m.group(1), m.group(2)))
+    return tuple(out)
+
+def spec_allows_prereleases(spec: Optional[str]) -> bool:
+    for _, target in parse_clauses(spec):
+        t = parse_version(target.rstrip(".*"))
+        if t is not None and t.is_prerelease:
+            return True
+    return False
+
+def spec_contains(spec: Optional[str], v: Version) -> bool:
+    return all(_clause_contains(op, target, v) for op, target in parse_clauses(spec))
+
+@dataclass(frozen=True)
+class Requirement:
+    name: str                        # canonical
+    extras: Tuple[str, ...] = ()
+    spec: Optional[str] = None
+    marker: Optional[str] = None
+    url: Optional[str] = None
+    raw: str = ""
+
+@lru_cache(maxsize=65536)
+def parse_requirement(s: str) -> Optional[Requirement]:
+    m = REQ_RE.match(s)
+    if not m:
+        return None
+    extras = tuple(sorted(canonical_name(e.strip()) for e in (m.group("extras") or "").split(",") if e.strip()))
+    spec = (m.group("spec") or "").strip().strip("()").strip() or None
+    return Requirement(
+        name=canonical_name(m.group("name")),
+        extras=extras,
+        spec=spec,
+        marker=(m.group("marker") or "").strip() or None,
+        url=m.group("url"),
+        raw=s.strip(),
+    )
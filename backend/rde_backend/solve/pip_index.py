@@ -0,0 +1,158 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from email.parser import HeaderParser
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import os
+import zipfile
+
+from ..paths import cache_dir
+from .pep440 import canonical_name, parse_version, Version
+
+# Local package-metadata index: package -> version -> requires-dist / requires-python.
+# Built from any directory containing wheels (a plain wheel dir, `pip download -d`,
+# or a simple-index mirror on disk). PEP 658 sidecars (`<wheel>.metadata`) are
+# preferred over opening the wheel.
+
+INDEX_FORMAT = 1
+
+@dataclass
+class ReleaseMeta:
+    version: str
+    requires_dist: List[str] = field(default_factory=list)
+    requires_python: Optional[str] = None
+    files: List[str] = field(default_factory=list)
+
+@dataclass
+class PackageIndex:
+    root: Path
+    packages: Dict[str, Dict[str, ReleaseMeta]] = field(default_factory=dict)
+
+    def versions(self, name: str) -> List[Tuple[Version, ReleaseMeta]]:
+        """
+        Parsed versions for a canonical name, newest first.
+        """
+        cached = self._sorted.get(name)
+        if cached is not None:
+            return cached
+        out = []
+        for vs, meta in (self.packages.get(name) or {}).items():
+            v = parse_version(vs)
+            if v is not None:
+                out.append((v, meta))
+        out.sort(key=lambda t: t[0], reverse=True)
+        self._sorted[name] = out
+        return out
+
+    def __post_init__(self):
+        self._sorted: Dict[str, List[Tuple[Version, ReleaseMeta]]] = {}
+
+def _parse_metadata(text: str) -> Tuple[List[str], Optional[str]]:
+    msg = HeaderParser().parsestr(text)
+    reqs = [r.strip() for r in (msg.get_all("Requires-Dist") or []) if r.strip()]
+    rp = msg.get("Requires-Python")
+    return reqs, (rp.strip() if rp else None)
+
+def _wheel_name_version(filename: str) -> Optional[Tuple[str, str]]:
+    # {name}-{version}(-{build})?-{py}-{abi}-{plat}.whl
+    parts = filename[:-4].split("-")
+    if len(parts) < 5:
+        return None
+    return canonical_name(parts[0]), parts[1]
+
+def _read_wheel_metadata(path: Path) -> Optional[str]:
+    sidecar = path.with_name(path.name + ".metadata")
+    if sidecar.exists():
+        return sidecar.read_text(errors="ignore")
+    try:
+        with zipfile.ZipFile(path) as zf:
+            for n in zf.namelist():
+                if n.endswith(".dist-info/METADATA") and n.count("/") == 1:
+                    return zf.read(n).decode("utf-8", errors="ignore")
+    except (zipfile.BadZipFile, OSError):
+        return None
+    return None
+
+def _cache_path(root: Path) -> Path:
+    h = hashlib.sha256(str(root).encode()).hexdigest()[:16]
+    return cache_dir("pip-index") / f"{h}.json"
+
+def _load_cache(root: Path) -> Dict[str, dict]:
+    p = _cache_path(root)
+    try:
+        data = json.loads(p.read_text())
+    except (OSError, ValueError):
+        return {}
+    if data.get("format") != INDEX_FORMAT or data.get("root") != str(root):
+        return {}
+    return data.get("files", {})
+
+def build_index(root: Path) -> PackageIndex:
+    """
+    Scan `root` for wheels and build the index. Per-wheel metadata is cached on disk
+    keyed by (size, mtime), so rebuilding after adding a few wheels only reads those.
+    """
+    root = root.resolve()
+    old = _load_cache(root)
+    files: Dict[str, dict] = {}
+    dirty = False
+
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for fn in filenames:
+            if not fn.endswith(".whl"):
+                continue
+            p = Path(dirpath) / fn
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            rel = str(p.relative_to(root))
+            stamp = [st.st_size, int(st.st_mtime)]
+            prev = old.get(rel)
+            if prev and prev.get("stamp") == stamp:
+                files[rel] = prev
+                continue
+            nv = _wheel_name_version(fn)
+            text = _read_wheel_metadata(p)
+            if nv is None or text is None:
+                continue
+            reqs, rp = _parse_metadata(text)
+            files[rel] = {"stamp": stamp, "name": nv[0], "version": nv[1], "requires_dist": reqs, "requires_python": rp}
+            dirty = True
+
+    if dirty or len(files) != len(old):
+        try:
+            _cache_path(root).write_text(json.dumps({"format": INDEX_FORMAT, "root": str(root), "files": files}))
+        except OSError:
+            pass
+
+    idx = PackageIndex(root=root)
+    for rel, e in files.items():
+        rel_versions = idx.packages.setdefault(e["name"], {})
+        meta = rel_versions.get(e["version"])
+        if meta is None:
+            meta = ReleaseMeta(version=e["version"], requires_dist=list(e["requires_dist"]), requires_python=e["requires_python"])
+            rel_versions[e["version"]] = meta
+        meta.files.append(rel)
+    return idx
+
+_LOADED: Dict[str, Tuple[float, PackageIndex]] = {}
+
+def load_index(root: str | Path, refresh: bool = False) -> PackageIndex:
+    """
+    In-process memo on top of build_index; re-scans when the root directory's mtime
+    changes (or when `refresh` is set, e.g. after syncing a nested mirror).
+    """
+    r = Path(root).resolve()
+    try:
+        mtime = r.stat().st_mtime
+    except OSError:
+        return PackageIndex(root=r)
+    hit = _LOADED.get(str(r))
+    if hit and hit[0] == mtime and not refresh:
+        return hit[1]
+    idx = build_index(r)
+    _LOADED[str(r)] = (mtime, idx)
+    return idx
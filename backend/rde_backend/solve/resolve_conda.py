@@ -1,26 +1,149 @@
 from typing import List
+import shlex
 from ..models import PlanStep
 from .constraints import ConstraintGraph
+from .env_store import EnvStore, build_lock_command, build_unlock_command, env_key, ref_command, unlock_on_failure
+from .installed import conda_index, pip_index, split_conda, split_pip
+from .markers import marker_env
+from .resolve_pip import build_requirements_in
 
-def build_conda_plan(g: ConstraintGraph, env_name: str = "rde") -> List[PlanStep]:
+def conda_spec_text(g: ConstraintGraph) -> str:
+    # stand-in for a lock: conda has no lockfile here, so key on the declared specs
+    lines = [f"conda:{d.get('name')}{d.get('spec') or ''}" for d in g.conda_deps if d.get("name")]
+    lines += [f"pip:{d.get('name')}{d.get('spec') or ''}" for d in g.pip_deps if d.get("name")]
+    lines += [f"pin:{k}{v}" for k, v in g.pin_overrides.items()]
+    return "\n".join(sorted(set(lines)))
+
+def build_conda_plan(g: ConstraintGraph, env_name: str = "rde", repo_path: str = "") -> List[PlanStep]:
     python_target = g.python_candidates[0] if g.python_candidates else ""
     pin_note = ", ".join([f"{k}{v}" for k, v in g.pin_overrides.items()]) or "none"
-    return [
-        PlanStep(
+    platform = f"{g.os_name}-{g.arch}".lower()
+    store = EnvStore()
+    key = env_key(conda_spec_text(g), python_target, platform, "conda")
+    rec = store.record(key, "conda", python_target, platform)
+    env_dir = str(store.root / key)
+    evidence = {"env_key": key, "env_path": rec.path}
+    ref = [ref_command(store.root, key, repo_path)] if repo_path else []
+
+    if rec.ready:
+        saved = rec.build_seconds or 0.0
+        return [
+            PlanStep(
+                kind="env",
+                id="conda.create",
+                lock_group="conda",
+                title="Clone stored conda environment",
+                commands=[f"conda create -n {env_name} --clone {rec.path} -y", *ref],
+                why=f"An environment with the same specs already exists (built in {saved:.0f}s); --clone hardlinks its packages instead of reinstalling.",
+                evidence={**evidence, "time_saved_seconds": saved},
+                requires_confirmation=True,
+                est_seconds=10,
+            ),
+            PlanStep(
+                kind="env",
+                id="conda.activate",
+                depends_on=["conda.create"],
+                title="Activate environment",
+                commands=[f"conda activate {env_name}"],
+                why="Required before running the project.",
+                est_seconds=0,
+            ),
+        ]
+
+    # an interrupted build leaves the prefix behind (no READY): finish it instead of
+    # recreating it, installing only what conda-meta / site-packages don't have yet
+    existing = conda_index(rec.path)
+    # python itself is the solver's pick, made by `conda create`
+    specs = [(d["name"], d.get("spec")) for d in g.conda_deps if d.get("name") and d["name"] != "python"]
+    conda_missing, conda_present = split_conda(specs, existing)
+    pip_missing, pip_present = split_pip(
+        build_requirements_in(g).splitlines(),
+        pip_index(rec.path) if existing is not None else None,
+        marker_env(python_target, g.os_name, g.arch) if python_target else None,
+    )
+    present = conda_present + pip_present
+
+    def guarded(cmd: str) -> str:
+        return unlock_on_failure(cmd, env_dir, repo_path)
+
+    install_cmds = []
+    if conda_missing:
+        install_cmds.append(guarded(f"conda install -p {rec.path} -y " + " ".join(shlex.quote(x) for x in conda_missing)))
+    if pip_missing:
+        install_cmds.append(guarded(f"{rec.path}/bin/python -m pip install " + " ".join(shlex.quote(x) for x in pip_missing)))
+    install_why = f"Install repo deps using conda/pip as appropriate. Pins: {pin_note}"
+    if present:
+        install_why += f" {len(present)} already in the environment are skipped."
+
+    if existing is not None:
+        create = PlanStep(
+            kind="env",
+            id="conda.create",
+            lock_group="conda",
+            title="Resume partially built conda environment",
+            commands=[
+                build_lock_command(env_dir, repo_path),
+                guarded(f"[ -f {env_dir}/.build_started ] || date +%s > {env_dir}/.build_started"),
+            ],
+            why=f"{rec.path} exists from an earlier, unfinished build ({len(existing.packages)} packages); completing it instead of recreating it.",
+            evidence={**evidence, "already_installed": present, "pruned_seconds": 60.0 + 5.0 * len(present)},
+            requires_confirmation=True,
+            est_seconds=0,
+        )
+    else:
+        create = PlanStep(
+            kind="env",
+            id="conda.create",
+            lock_group="conda",
             title="Create conda environment",
-            commands=[f"conda create -n {env_name} python={python_target} -y"],
-            why="Creates a reproducible environment with pinned Python.",
+            commands=[
+                build_lock_command(env_dir, repo_path),
+                guarded(f"date +%s > {env_dir}/.build_started"),
+                guarded(f"conda create -p {rec.path} python={python_target} -y"),
+            ],
+            why="Creates a reproducible environment with pinned Python, stored by spec hash so other repos can clone it.",
+            evidence=evidence,
             requires_confirmation=True,
-        ),
+            est_seconds=60,
+        )
+
+    return [
+        create,
         PlanStep(
+            kind="env",
+            id="conda.activate",
+            depends_on=["conda.create"],
             title="Activate environment",
-            commands=[f"conda activate {env_name}"],
+            commands=[f"conda activate {rec.path}"],
             why="Required before installing dependencies.",
+            est_seconds=0,
         ),
         PlanStep(
+            kind="env",
+            id="conda.install",
+            depends_on=["conda.activate"],
+            lock_group="conda",
             title="Install project deps",
-            commands=[],
-            why=f"Install repo deps using conda/pip as appropriate. Pins: {pin_note}",
+            commands=install_cmds,
+            why=install_why,
+            requires_confirmation=True,
+            est_seconds=30 + 5 * (len(conda_missing) + len(pip_missing)) if install_cmds else 0,
+        ),
+        PlanStep(
+            kind="env",
+            id="conda.publish",
+            depends_on=["conda.install"],
+            lock_group="conda",
+            title="Publish environment to store",
+            commands=[
+                guarded(f'echo $(( $(date +%s) - $(cat {env_dir}/.build_started) )) > {env_dir}/READY'),
+                build_unlock_command(env_dir),
+                f"conda create -n {env_name} --clone {rec.path} -y",
+                *ref,
+            ],
+            why="Marks the stored environment reusable and hardlink-clones it as the named env for this repo.",
+            evidence=evidence,
             requires_confirmation=True,
+            est_seconds=10,
         ),
     ]
@@ -0,0 +1,270 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+import sys
+import threading
+import time
+
+from ..models import Conflict, ResolutionAttempt
+from .constraints import ConstraintGraph
+from .markers import evaluate_marker, marker_env
+from .pep440 import Requirement, Version, parse_requirement, parse_version, spec_contains, spec_allows_prereleases
+from .pip_index import PackageIndex, ReleaseMeta, load_index
+
+# In-process feasibility check against a local PackageIndex.
+#
+# This is a PubGrub-flavoured backtracking search: candidates are tried newest-first,
+# the most constrained package is decided next, and on failure we return the set of
+# decisions that caused it so unrelated decisions are jumped over instead of being
+# retried (conflict-directed backjumping). uv stays the authoritative lock step;
+# this only answers "can these requirements resolve for python X?" quickly.
+
+ROOT = "<root>"
+
+# the search recurses once per decision, so it raises the (process-global) recursion
+# limit while it runs; resolves are serialized so one can't restore the limit under another
+_RECURSION_LOCK = threading.Lock()
+
+@dataclass
+class LocalResolution:
+    ok: bool
+    python: str
+    pins: Dict[str, str] = field(default_factory=dict)
+    conflicts: List[Conflict] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)   # not in the local index (assumed resolvable)
+    inconclusive: bool = False
+    steps: int = 0
+    elapsed_ms: float = 0.0
+
+class _BudgetExceeded(Exception):
+    pass
+
+# (requirement, origin package)
+_Req = Tuple[Requirement, str]
+
+class _Resolver:
+    def __init__(self, index: PackageIndex, python_version: str, os_name: str, arch: str, max_steps: int):
+        self.index = index
+        self.env = marker_env(python_version, os_name, arch)
+        self.python = parse_version(self.env["python_full_version"])
+        self.max_steps = max_steps
+        self.steps = 0
+        self.missing: Set[str] = set()
+        self.failures: Dict[str, str] = {}
+        self.solution: Dict[str, Version] = {}
+        self._deps_memo: Dict[Tuple[int, FrozenSet[str]], List[Requirement]] = {}
+
+    # ---- candidate handling -------------------------------------------------
+
+    def _python_ok(self, meta: ReleaseMeta) -> bool:
+        if not meta.requires_python or self.python is None:
+            return True
+        return spec_contains(meta.requires_python, self.python)
+
+    def candidates(self, name: str, reqs: Tuple[_Req, ...]) -> List[Tuple[Version, ReleaseMeta]]:
+        allow_pre = any(spec_allows_prereleases(r.spec) for r, _ in reqs)
+        out = []
+        pre_only = []
+        for v, meta in self.index.versions(name):
+            if not all(spec_contains(r.spec, v) for r, _ in reqs):
+                continue
+            if not self._python_ok(meta):
+                continue
+            if v.is_prerelease and not allow_pre:
+                pre_only.append((v, meta))
+                continue
+            out.append((v, meta))
+        # pip falls back to pre-releases when nothing else matches
+        return out or pre_only
+
+    def dependencies(self, meta: ReleaseMeta, extras: FrozenSet[str]) -> List[Requirement]:
+        key = (id(meta), extras)
+        hit = self._deps_memo.get(key)
+        if hit is not None:
+            return hit
+        out: List[Requirement] = []
+        for raw in meta.requires_dist:
+            r = parse_requirement(raw)
+            if r is None:
+                continue
+            if r.marker and "extra" in r.marker:
+                envs = [dict(self.env, extra=e) for e in extras]
+                if not any(evaluate_marker(r.marker, e) for e in envs):
+                    continue
+            elif not evaluate_marker(r.marker, self.env):
+                continue
+            out.append(r)
+        self._deps_memo[key] = out
+        return out
+
+    # ---- search -------------------------------------------------------------
+
+    def _explain(self, name: str, reqs: Tuple[_Req, ...], decided: Dict[str, Version]) -> str:
+        parts = []
+        for r, origin in reqs:
+            src = "requested" if origin == ROOT else f"{origin} {decided.get(origin, '')}".strip()
+            parts.append(f"{r.spec or '*'} ({src})")
+        if not self.index.versions(name):
+            return f"{name}: no releases in local index"
+        return f"{name}: no release satisfies " + ", ".join(parts) + f" on Python {self.env['python_version']}"
+
+    def search(
+        self,
+        decided: Dict[str, Version],
+        metas: Dict[str, ReleaseMeta],
+        reqs: Dict[str, Tuple[_Req, ...]],
+    ) -> Optional[Set[str]]:
+        """
+        Returns None on success (decided holds the solution), otherwise the conflict set.
+        """
+        pending: List[Tuple[int, str, List[Tuple[Version, ReleaseMeta]]]] = []
+        for name, rs in reqs.items():
+            if name in decided or name in self.missing:
+                continue
+            if not self.index.versions(name):
+                self.missing.add(name)
+                continue
+            cands = self.candidates(name, rs)
+            if not cands:
+                self.failures[name] = self._explain(name, rs, decided)
+                return {origin for _, origin in rs if origin != ROOT} | {name}
+            pending.append((len(cands), name, cands))
+        if not pending:
+            self.solution = dict(decided)
+            return None
+
+        _, name, cands = min(pending, key=lambda t: (t[0], t[1]))
+        extras = frozenset(e for r, _ in reqs[name] for e in r.extras)
+        conflict: Set[str] = set()
+
+        for v, meta in cands:
+            self.steps += 1
+            if self.steps > self.max_steps:
+                raise _BudgetExceeded()
+
+            deps = self.dependencies(meta, extras)
+            clash = False
+            new_reqs = dict(reqs)
+            for d in deps:
+                if d.url:
+                    continue
+                dv = decided.get(d.name)
+                if dv is not None and not spec_contains(d.spec, dv):
+                    conflict.add(d.name)
+                    self.failures[d.name] = f"{name} {v} requires {d.name}{d.spec or ''}, but {d.name} {dv} was chosen"
+                    clash = True
+                    break
+                new_reqs[d.name] = new_reqs.get(d.name, ()) + ((d, name),)
+            if clash:
+                continue
+
+            # extras newly requested on an already-decided package pull in more deps
+            for d in deps:
+                if d.name in decided and d.extras:
+                    have = frozenset(e for r, _ in reqs.get(d.name, ()) for e in r.extras)
+                    extra_new = frozenset(d.extras) - have
+                    if extra_new:
+                        for dd in self.dependencies(metas[d.name], extra_new):
+                            new_reqs[dd.name] = new_reqs.get(dd.name, ()) + ((dd, d.name),)
+
+            res = self.search({**decided, name: v}, {**metas, name: meta}, new_reqs)
+            if res is None:
+                return None
+            if name not in res:
+                # this decision did not contribute: backjump past it
+                return res
+            conflict |= res - {name}
+
+        return conflict | {origin for _, origin in reqs[name] if origin != ROOT}
+
+def _search(r: _Resolver, root: Dict[str, Tuple[_Req, ...]], res: LocalResolution) -> None:
+    old_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(old_limit, 10000))
+    try:
+        conflict = r.search({}, {}, root)
+        res.ok = conflict is None
+        if conflict is not None:
+            for name in sorted(conflict):
+                msg = r.failures.get(name)
+                if msg:
+                    res.conflicts.append(Conflict(package=name, message=msg))
+            if not res.conflicts:
+                res.conflicts.append(Conflict(message="local resolution failed"))
+    except _BudgetExceeded:
+        res.inconclusive = True
+    finally:
+        sys.setrecursionlimit(old_limit)
+
+def resolve_local(
+    index: PackageIndex,
+    requirements: List[str],
+    python_version: str,
+    os_name: str = "linux",
+    arch: str = "x86_64",
+    max_steps: int = 20000,
+) -> LocalResolution:
+    t0 = time.perf_counter()
+    res = LocalResolution(ok=False, python=python_version)
+    r = _Resolver(index, python_version, os_name, arch, max_steps)
+
+    root: Dict[str, Tuple[_Req, ...]] = {}
+    for line in requirements:
+        s = line.strip()
+        if not s or s.startswith("#") or s.startswith("-"):
+            continue
+        req = parse_requirement(s)
+        if req is None or req.url:
+            continue
+        if not evaluate_marker(req.marker, r.env):
+            continue
+        root[req.name] = root.get(req.name, ()) + ((req, ROOT),)
+
+    with _RECURSION_LOCK:
+        _search(r, root, res)
+
+    res.pins = {k: str(v) for k, v in sorted(r.solution.items())}
+    res.missing = sorted(r.missing)
+    res.inconclusive = res.inconclusive or bool(res.missing)
+    res.steps = r.steps
+    res.elapsed_ms = round((time.perf_counter() - t0) * 1000, 2)
+    return res
+
+def local_feasibility(g: ConstraintGraph, req_in: str, index_dir: str) -> Tuple[List[ResolutionAttempt], List[Conflict], List[str]]:
+    """
+    What-if check of requirements.in against the local metadata index for every
+    python candidate. Conflicts are only reported for the preferred candidate.
+    """
+    index = load_index(index_dir)
+    lines = req_in.splitlines()
+    attempts: List[ResolutionAttempt] = []
+    conflicts: List[Conflict] = []
+    notes: List[str] = []
+    feasible: List[str] = []
+    failed: List[str] = []
+
+    for i, py in enumerate(g.python_candidates):
+        r = resolve_local(index, lines, py, os_name=g.os_name, arch=g.arch or "x86_64")
+        # step budget hit or packages missing from the index: neither a pass nor a conflict
+        status = "inconclusive" if r.inconclusive else ("ok" if r.ok else "failed")
+        summary = f"local resolve for Python {py}: {status} ({len(r.pins)} pins, {r.steps} steps, {r.elapsed_ms} ms)"
+        if r.missing:
+            summary += f"; not in local index: {', '.join(r.missing[:10])}"
+        attempts.append(ResolutionAttempt(
+            tool="rde-local",
+            success=r.ok,
+            summary=summary,
+            stdout_tail="\n".join(f"{k}=={v}" for k, v in r.pins.items())[-2000:],
+            stderr_tail="\n".join(c.message for c in r.conflicts)[-2000:],
+        ))
+        if r.inconclusive:
+            continue
+        if r.ok:
+            feasible.append(py)
+        else:
+            failed.append(py)
+            if i == 0:
+                conflicts.extend(r.conflicts)
+
+    if g.python_candidates and g.python_candidates[0] in failed and feasible:
+        notes.append(f"Local index: requirements do not resolve on Python {g.python_candidates[0]}, but do on {', '.join(feasible)}.")
+    return attempts, conflicts, notes
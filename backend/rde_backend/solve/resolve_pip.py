@@ -1,19 +1,168 @@
-from typing import Dict, Any, List, Tuple
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import hashlib
+import os
+import shlex
+import shutil
+import sys
+import tempfile
+import time
 from ..models import PlanStep, ResolutionAttempt, Conflict
 from .constraints import ConstraintGraph
+from .installed import InstalledIndex, pip_index, site_packages_python, split_pip
+from .markers import marker_env
 
 from .subprocess_utils import run_cmd, tail
+from .wheelhouse import parse_lock, prefetch_command, wheelhouse_root
+from .env_store import EnvStore, build_lock_command, build_unlock_command, env_key, ref_command, unlock_on_failure
 
-def try_uv_lock(repo_path: str, requirements_in: str) -> tuple[ResolutionAttempt, List[Conflict]]:
-    # Write temp requirements.in under .rde/
-    import os
-    os.makedirs(f"{repo_path}/.rde", exist_ok=True)
-    req_in_path = f"{repo_path}/.rde/requirements.in"
-    lock_path = f"{repo_path}/.rde/requirements.lock.txt"
-    with open(req_in_path, "w") as f:
-        f.write(requirements_in)
+LOCK_REL_PATH = ".rde/requirements.lock.txt"
+# every published lock also lives under its content hash; plans reference that copy, so
+# a plan keeps installing its own lock whichever combination was solved last
+LOCKS_REL_DIR = ".rde/locks"
+LOCKS_KEEP = 32
+
+# one dir per resolution attempt: <pid>-<random>; the pid lets cleanup spot orphans
+SCRATCH_REL_DIR = ".rde/scratch"
+SCRATCH_MAX_AGE_S = 6 * 3600.0
+
+def _pid_alive(pid: int) -> bool:
+    if sys.platform == "win32":
+        # os.kill(pid, 0) is TerminateProcess on Windows; ask for the exit code instead
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)   # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() == 5             # ERROR_ACCESS_DENIED: exists, not ours
+        try:
+            code = ctypes.c_ulong()
+            return not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)) or code.value == 259   # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True     # exists, not ours
+    return True
+
+def clean_scratch(repo_path: str, max_age_s: float = SCRATCH_MAX_AGE_S) -> int:
+    """
+    Remove scratch dirs left by crashed/killed solves: owner pid gone, or older
+    than max_age_s. Returns how many were removed.
+    """
+    root = Path(repo_path) / SCRATCH_REL_DIR
+    removed = 0
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return 0
+    now = time.time()
+    for e in entries:
+        pid = e.name.split("-", 1)[0]
+        try:
+            stale = not (pid.isdigit() and _pid_alive(int(pid))) or now - e.stat().st_mtime > max_age_s
+        except OSError:
+            continue
+        if stale:
+            shutil.rmtree(e.path, ignore_errors=True)
+            removed += 1
+    return removed
+
+def _atomic_write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def lock_rel_path(lock_text: str) -> str:
+    return f"{LOCKS_REL_DIR}/{hashlib.sha256(lock_text.encode()).hexdigest()[:16]}.txt"
+
+def _prune_locks(locks: Path, keep: Path) -> None:
+    try:
+        files = sorted(locks.glob("*.txt"), key=lambda p: p.stat().st_mtime)
+    except OSError:
+        return
+    for p in files[:-LOCKS_KEEP]:
+        if p != keep:
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+def publish_lock(repo_path: str, lock_text: str, requirements_in: Optional[str] = None, constraints_in: Optional[str] = None) -> None:
+    """
+    Publish a lock (and the inputs it came from) under .rde/ with write-then-rename,
+    so readers never see a torn file. The content-addressed copy (lock_rel_path) is
+    what plans install; LOCK_REL_PATH is the latest one, for /prefetch and /validate.
+    """
+    rde = Path(repo_path) / ".rde"
+    if requirements_in is not None:
+        _atomic_write(rde / "requirements.in", requirements_in)
+    if constraints_in and constraints_in.strip():
+        _atomic_write(rde / "constraints.txt", constraints_in)
+    addressed = Path(repo_path) / lock_rel_path(lock_text)
+    if addressed.exists():
+        os.utime(addressed)
+    else:
+        _atomic_write(addressed, lock_text)
+        _prune_locks(addressed.parent, addressed)
+    lock = Path(repo_path) / LOCK_REL_PATH
+    try:
+        if lock.read_text() == lock_text:
+            return
+    except OSError:
+        pass
+    _atomic_write(lock, lock_text)
+
+def try_uv_lock(repo_path: str, requirements_in: str, constraints_in: str = "", python_version: str = "", extra_index_urls: Sequence[str] = ()) -> tuple[ResolutionAttempt, List[Conflict], Optional[str]]:
+    """
+    Run `uv pip compile` in a private scratch dir under .rde/scratch/, so concurrent
+    solves of one repo never share inputs/outputs. Returns the lock text on success;
+    publishing it is the caller's call (see publish_lock).
+    """
+    clean_scratch(repo_path)
+    root = Path(repo_path) / SCRATCH_REL_DIR
+    root.mkdir(parents=True, exist_ok=True)
+    scratch = Path(tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=str(root)))
+    try:
+        (scratch / "requirements.in").write_text(requirements_in)
+        # relative names keep uv's header identical whichever scratch dir ran it
+        cmd = ["uv", "pip", "compile", "--generate-hashes", "requirements.in", "-o", "requirements.lock.txt"]
+        if constraints_in.strip():
+            (scratch / "constraints.txt").write_text(constraints_in)
+            cmd += ["-c", "constraints.txt"]
+        if python_version:
+            # lock for the target interpreter, not whichever python uv finds first
+            cmd += ["--python-version", python_version]
+        if extra_index_urls:
+            # uv's default (first-index) would take every package the torch index also
+            # hosts from it alone; best-match compares versions across all indexes, so the
+            # local-version build (2.6.0+cu126 > 2.6.0) wins for torch and the rest stay current
+            cmd += ["--index-strategy", "unsafe-best-match"]
+        for url in extra_index_urls:
+            cmd += ["--extra-index-url", url]
+
+        # hashes let the wheelhouse prefetch (and pip) verify every download
+        code, out, err = run_cmd(cmd, cwd=str(scratch), timeout_s=120)
+        lock_text = None
+        if code == 0:
+            try:
+                lock_text = (scratch / "requirements.lock.txt").read_text()
+            except OSError:
+                code = 1
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
 
-    code, out, err = run_cmd(["uv", "pip", "compile", req_in_path, "-o", lock_path], cwd=repo_path, timeout_s=120)
     attempt = ResolutionAttempt(
         tool="uv",
         success=(code == 0),
@@ -25,27 +174,228 @@ def try_uv_lock(repo_path: str, requirements_in: str) -> tuple[ResolutionAttempt
     conflicts: List[Conflict] = []
     if code != 0:
         conflicts.append(Conflict(message="uv/pip resolution failed", raw=tail(err, 4000)))
-    return attempt, conflicts
+    return attempt, conflicts, lock_text
 
 
-def build_pip_plan(g: ConstraintGraph) -> List[PlanStep]:
+def build_pip_plan(g: ConstraintGraph, lock_text: Optional[str] = None, repo_path: str = "") -> List[PlanStep]:
     pins = [f"{k}{v}" for k, v in g.pin_overrides.items()]
     pin_note = f"Pins applied: {', '.join(pins)}" if pins else "No pins applied."
+    if lock_text is not None:
+        return build_locked_pip_plan(g, pin_note, lock_text, repo_path)
+    venv = Path(repo_path) / ".venv" if repo_path else None
+    # a symlinked .venv is a shared store env; never install into it
+    installed = pip_index(venv) if venv is not None and not venv.is_symlink() else None
+    if installed is not None:
+        return build_existing_venv_plan(g, pin_note, venv, installed)
     return [
         PlanStep(
+            kind="env",
+            id="pip.venv",
             title="Create Python venv",
             commands=["python -m venv .venv", "source .venv/bin/activate"],
             why="Isolates project dependencies.",
             requires_confirmation=True,
+            est_seconds=5,
         ),
         PlanStep(
+            kind="env",
+            id="pip.install",
+            depends_on=["pip.venv"],
+            lock_group="pip:.venv",
             title="Install pip dependencies",
-            commands=["python -m pip install -U pip", "pip install -r requirements.txt"],
+            # call the venv interpreter directly so this works without an activated shell
+            commands=[".venv/bin/python -m pip install -U pip", ".venv/bin/python -m pip install -r requirements.txt" + _extra_index_args(g)],
             why=f"Installs dependencies from repo. {pin_note}",
             requires_confirmation=True,
+            est_seconds=30 + 5 * len(g.pip_deps),
         ),
     ]
 
+def _extra_index_args(g: ConstraintGraph) -> str:
+    return "".join(f" --extra-index-url {u}" for u in g.extra_index_urls)
+
+def build_existing_venv_plan(g: ConstraintGraph, pin_note: str, venv: Path, installed: InstalledIndex) -> List[PlanStep]:
+    """
+    Unlocked plan for a repo that already has a .venv: install only the requirements
+    its site-packages don't satisfy.
+    """
+    python = site_packages_python(venv)
+    env = marker_env(python, g.os_name, g.arch) if python else None
+    reqs = build_requirements_in(g).splitlines()
+    missing, present = split_pip(reqs, installed, env)
+    pruned = {"already_installed": present, "pruned_seconds": 5.0 * len(present)} if present else {}
+    steps = [
+        PlanStep(
+            kind="env",
+            id="pip.venv",
+            title="Use existing Python venv",
+            commands=["source .venv/bin/activate"],
+            why=f"{venv.name} already exists (Python {python or 'unknown'}); reusing it.",
+            requires_confirmation=False,
+            est_seconds=0,
+        ),
+    ]
+    if not missing:
+        steps.append(PlanStep(
+            kind="env",
+            id="pip.install",
+            depends_on=["pip.venv"],
+            title="Python dependencies already installed",
+            commands=[],
+            why=f"All {len(present)} requirements are satisfied by {venv.name}. {pin_note}",
+            evidence=pruned or None,
+            requires_confirmation=False,
+            est_seconds=0,
+        ))
+        return steps
+    steps.append(PlanStep(
+        kind="env",
+        id="pip.install",
+        depends_on=["pip.venv"],
+        lock_group="pip:.venv",
+        title=f"Install missing pip dependencies ({len(missing)})",
+        commands=[".venv/bin/python -m pip install " + " ".join(shlex.quote(r) for r in missing) + _extra_index_args(g)],
+        why=f"{len(present)} of {len(present) + len(missing)} requirements are already satisfied by {venv.name}; installing the rest. {pin_note}",
+        evidence=pruned or None,
+        requires_confirmation=True,
+        est_seconds=30 + 5 * len(missing),
+    ))
+    return steps
+
+# Move a real .venv aside (a symlink is simply replaced) and point .venv at the stored env.
+def _link_venv_commands(env: str) -> List[str]:
+    return [
+        '[ -L .venv ] || [ ! -e .venv ] || mv .venv ".venv.bak.$(date +%s)"',
+        f"ln -sfn {env} .venv",
+    ]
+
+def build_locked_pip_plan(g: ConstraintGraph, pin_note: str, lock_text: str, repo_path: str = "") -> List[PlanStep]:
+    """
+    After a successful lock: the venv lives in the shared environment store keyed by
+    (lock, python, platform). If another repo already built it, just link it;
+    otherwise prefetch wheels into the shared wheelhouse and install offline into it.
+    """
+    python_target = g.python_candidates[0] if g.python_candidates else (g.python_current or "3")
+    lock_path = lock_rel_path(lock_text)
+    platform = f"{g.os_name}-{g.arch}".lower()
+
+    # a repo-local .venv (not a store link) that already matches the whole lock is kept
+    venv = Path(repo_path) / ".venv" if repo_path else None
+    installed = pip_index(venv) if venv is not None and not venv.is_symlink() else None
+    if installed is not None and site_packages_python(venv) == python_target:
+        pins = [f"{p.name}=={p.version}" + (f"; {p.marker}" if p.marker else "") for p in parse_lock(lock_text)]
+        missing, present = split_pip(pins, installed, marker_env(python_target, g.os_name, g.arch))
+        if pins and not missing:
+            return [
+                PlanStep(
+                    kind="env",
+                    id="pip.venv",
+                    title="Use existing Python venv",
+                    commands=["source .venv/bin/activate"],
+                    why=f"{venv.name} already has every locked requirement at the locked version.",
+                    requires_confirmation=False,
+                    est_seconds=0,
+                ),
+                PlanStep(
+                    kind="env",
+                    id="pip.install",
+                    depends_on=["pip.venv"],
+                    title="Locked dependencies already installed",
+                    commands=[],
+                    why=f"All {len(present)} pins in {lock_path} are satisfied. {pin_note}",
+                    evidence={"lock": lock_path, "already_installed": present, "pruned_seconds": 75.0 + 2.0 * len(present)},
+                    requires_confirmation=False,
+                    est_seconds=0,
+                ),
+            ]
+
+    store = EnvStore()
+    key = env_key(lock_text, python_target, platform, "venv")
+    rec = store.record(key, "venv", python_target, platform)
+    env_dir = str(store.root / key)
+    evidence = {"env_key": key, "env_path": rec.path, "lock": lock_path}
+    shared_note = "The environment is shared by every repo with the same lock; install extra packages in a separate venv."
+    # the repo becomes a ref once it actually links the env, not when a plan is shown
+    ref = [ref_command(store.root, key, repo_path)] if repo_path else []
+
+    if rec.ready:
+        saved = rec.build_seconds or 0.0
+        return [
+            PlanStep(
+                kind="env",
+                id="pip.venv",
+                title="Reuse stored Python environment",
+                commands=_link_venv_commands(rec.path) + ref + ["source .venv/bin/activate"],
+                why=f"An environment for this exact lock already exists (built in {saved:.0f}s); linking it instead of reinstalling. {shared_note}",
+                evidence={**evidence, "time_saved_seconds": saved},
+                requires_confirmation=True,
+                est_seconds=1,
+            ),
+        ]
+
+    root = wheelhouse_root()
+    links = root / "links"
+
+    def guarded(cmd: str) -> str:
+        return unlock_on_failure(cmd, env_dir, repo_path)
+
+    return [
+        PlanStep(
+            kind="env",
+            id="pip.venv",
+            title="Create Python venv in environment store",
+            commands=[
+                # concurrent builds of one env (two repos, same lock) would --clear each other
+                build_lock_command(env_dir, repo_path),
+                guarded(f"date +%s > {env_dir}/.build_started"),
+                guarded(f"python{python_target} -m venv --clear {rec.path}"),
+                *(guarded(c) for c in _link_venv_commands(rec.path)),
+                "source .venv/bin/activate",
+            ],
+            why=f"Isolates project dependencies; stored by lock hash so other repos with the same lock reuse it. {shared_note}",
+            evidence=evidence,
+            requires_confirmation=True,
+            est_seconds=5,
+        ),
+        PlanStep(
+            kind="env",
+            id="pip.prefetch",
+            title="Prefetch wheels into shared wheelhouse",
+            # a failed prefetch skips pip.install, so it must not leave the build lock behind
+            commands=[guarded(prefetch_command(lock_path, python_target, str(root), g.extra_index_urls))],
+            why="Downloads every locked wheel once (parallel, sha256-verified) into a content-addressed cache shared by all repos.",
+            evidence={"wheelhouse": str(root), "lock": lock_path},
+            requires_confirmation=False,
+            est_seconds=60,
+        ),
+        PlanStep(
+            kind="env",
+            id="pip.install",
+            depends_on=["pip.venv", "pip.prefetch"],
+            lock_group=f"pip:{rec.path}",
+            title="Install locked dependencies from wheelhouse",
+            commands=[
+                # pins the wheelhouse couldn't hold (or sdists whose build deps aren't in it)
+                # come from the index, still verified against the lock's hashes
+                guarded(
+                    f".venv/bin/python -m pip install --no-index --find-links {links} -r {lock_path}"
+                    f" || .venv/bin/python -m pip install --require-hashes --find-links {links}{_extra_index_args(g)} -r {lock_path}"
+                ),
+                # READY (with the build time) is what makes the env reusable
+                guarded(f'echo $(( $(date +%s) - $(cat {env_dir}/.build_started) )) > {env_dir}/READY'),
+                build_unlock_command(env_dir),
+                *ref,
+            ],
+            why=f"Offline install of the exact lock from the shared wheelhouse, falling back to the index for anything it lacks. {pin_note}",
+            requires_confirmation=True,
+            est_seconds=10 + 2 * len(g.pip_deps),
+        ),
+    ]
+
+def build_constraints_txt(g: ConstraintGraph) -> str:
+    lines = [f"{d['name']}{d.get('spec') or ''}" for d in g.pip_constraints if d.get("name")]
+    return "\n".join(dict.fromkeys(lines)) + "\n" if lines else ""
+
 def build_requirements_in(g: ConstraintGraph) -> str:
     lines = []
     # pins first
@@ -55,6 +405,7 @@ def build_requirements_in(g: ConstraintGraph) -> str:
     for d in g.pip_deps:
         name = d.get("name")
         spec = d.get("spec") or ""
-        if name:
+        # extras_require groups are opt-in
+        if name and not d.get("extra"):
             lines.append(f"{name}{spec}")
     return "\n".join(dict.fromkeys(lines)) + "\n"
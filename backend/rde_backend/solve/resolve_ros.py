@@ -1,5 +1,152 @@
-from typing import Dict, Any, List, Optional
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+import os
+import re
+import shlex
+import shutil
+
+import yaml
+
 from ..models import PlanStep
+from .installed import dpkg_index, installed_state, pip_index, split_dpkg, split_pip
+from .rosdep_index import RosdepIndex, resolve_ros_deps, workspace_package_names
+from .ros_graph import build_workspace_graph, changed_packages, find_package_xmls
+
+# Build acceleration for colcon: compiler launcher (ccache, else sccache), a faster
+# linker (mold, else lld), Ninja and a job count bounded by cores and by memory (big C++
+# translation units - rclcpp, Eigen, PCL - need ~2 GB each). The build step writes a colcon
+# defaults file under .rde/ and selects it with COLCON_DEFAULTS_FILE, so ~/.colcon and
+# the repo's own colcon.meta/defaults are left alone. colcon mixins would need the
+# colcon-mixin extension plus a mixin index; a defaults file needs nothing.
+COLCON_DEFAULTS_REL_PATH = ".rde/colcon-defaults.yaml"
+CXX_JOB_MEMORY_MB = 2048
+# gcc learned -fuse-ld=mold in 12.1; lld works with any gcc/clang we'd meet
+MOLD_MIN_GCC = (12, 1)
+
+# any of these means ROS itself is already installed
+ROS_METAPACKAGES = ("ros-core", "ros-base", "desktop", "desktop-full")
+# where `python3 -m pip install` (as root or --user) puts rosdep's pip packages
+SYSTEM_PIP_PREFIXES = ("/usr/local", "/usr", "~/.local")
+PYTHON_VERSION_RE = re.compile(r"python(\d+\.\d+)$")
+
+def system_pip_python() -> Optional[str]:
+    """
+    "3.12" for the python3 on PATH (from its symlink target), so only that interpreter's
+    dirs under SYSTEM_PIP_PREFIXES count; None (all of them) when it can't be told.
+    """
+    exe = shutil.which("python3")
+    m = PYTHON_VERSION_RE.search(Path(exe).resolve().name) if exe else None
+    return m.group(1) if m else None
+
+def system_pip_state() -> str:
+    """
+    installed_state() of the dirs the ros.pip step checks.
+    """
+    return installed_state(*(Path(p).expanduser() for p in SYSTEM_PIP_PREFIXES), python=system_pip_python())
+
+def _ver(s: str) -> Tuple[int, ...]:
+    return tuple(int(x) for x in re.findall(r"\d+", s or ""))
+
+def _previous_cmake_build(ws_root: Path) -> Optional[Dict[str, str]]:
+    """
+    Generator / symlink-install of an existing build (first CMakeCache.txt found), or None.
+    Switching either in place breaks the build dir, so an existing build keeps its own.
+    """
+    try:
+        caches = sorted((ws_root / "build").glob("*/CMakeCache.txt"))
+    except OSError:
+        return None
+    for cache in caches:
+        out: Dict[str, str] = {}
+        try:
+            for line in cache.read_text(errors="replace").splitlines():
+                if line.startswith("CMAKE_GENERATOR:"):
+                    out["generator"] = line.split("=", 1)[1]
+                elif line.startswith("AMENT_CMAKE_SYMLINK_INSTALL:"):
+                    out["symlink_install"] = line.split("=", 1)[1]
+        except OSError:
+            continue
+        if "generator" in out:
+            return out
+    return None
+
+def colcon_acceleration(fp: Dict[str, Any], ws_root: Path, workers: int) -> Tuple[Dict[str, Any], Dict[str, str], List[str], Dict[str, Any]]:
+    """
+    (colcon defaults, build env, why fragments, evidence) for the tools in the fingerprint.
+    """
+    tools: Dict[str, str] = fp.get("build_tools") or {}
+    cores = int(fp.get("cpu_count") or os.cpu_count() or 1)
+    mem = fp.get("memory_mb")
+    prev = _previous_cmake_build(ws_root)
+    why: List[str] = []
+    cmake_args: List[str] = []
+
+    symlink = prev is None or prev.get("symlink_install", "").upper() in ("1", "ON", "TRUE")
+    if symlink:
+        why.append("--symlink-install: Python files, launch files and configs are used from src without a rebuild")
+    else:
+        why.append("kept the existing non-symlink install (switching needs a clean build/ and install/)")
+
+    launcher = next((t for t in ("ccache", "sccache") if t in tools), None)
+    if launcher:
+        cmake_args += [f"-DCMAKE_C_COMPILER_LAUNCHER={launcher}", f"-DCMAKE_CXX_COMPILER_LAUNCHER={launcher}"]
+        why.append(f"{launcher} caches object files, so clean rebuilds and branch switches recompile only what changed")
+
+    linker = None
+    if "mold" in tools and ("gcc" not in tools or _ver(tools["gcc"]) >= MOLD_MIN_GCC):
+        linker = "mold"
+    elif "ld.lld" in tools:
+        linker = "lld"
+    if linker:
+        cmake_args += [f"-DCMAKE_{kind}_LINKER_FLAGS=-fuse-ld={linker}" for kind in ("EXE", "SHARED", "MODULE")]
+        why.append(f"{linker} links several times faster than GNU ld")
+    elif "mold" in tools:
+        why.append(f"mold found but gcc {tools['gcc']} can't use it (needs >= 12.1)")
+
+    if "ninja" in tools:
+        if prev is None or prev["generator"] == "Ninja":
+            cmake_args += ["-GNinja"]
+            why.append("Ninja schedules and re-checks targets faster than make")
+        else:
+            why.append(f"kept the existing {prev['generator']} build dirs (changing generator needs a clean build)")
+
+    # colcon runs `workers` packages at once, each with its own compiler jobs
+    jobs = cores
+    if mem:
+        jobs = max(1, min(cores, int(mem) // CXX_JOB_MEMORY_MB))
+    workers = max(1, min(workers, jobs))
+    per_worker = max(1, jobs // workers)
+    mem_txt = f", {int(mem) // 1024} GB RAM" if mem else ""
+    why.append(f"{workers} package(s) x {per_worker} compile job(s) for {cores} cores{mem_txt}")
+
+    defaults: Dict[str, Any] = {"build": {"parallel-workers": workers}}
+    if symlink:
+        defaults["build"]["symlink-install"] = True
+    if cmake_args:
+        defaults["build"]["cmake-args"] = cmake_args
+    # ninja ignores MAKEFLAGS; `cmake --build` passes CMAKE_BUILD_PARALLEL_LEVEL to either tool
+    env = {"MAKEFLAGS": f"-j{per_worker}", "CMAKE_BUILD_PARALLEL_LEVEL": str(per_worker)}
+    evidence = {
+        "tools": tools,
+        "cores": cores,
+        "memory_mb": mem,
+        "parallel_workers": workers,
+        "jobs_per_worker": per_worker,
+        "launcher": launcher,
+        "linker": linker,
+        "previous_build": prev,
+        "defaults_file": COLCON_DEFAULTS_REL_PATH,
+    }
+    return defaults, env, why, evidence
+
+def colcon_defaults_command(defaults: Dict[str, Any]) -> str:
+    """
+    Shell command (run from the workspace root) that writes the defaults file; solving
+    itself never touches the workspace.
+    """
+    text = "# generated by rde from the machine fingerprint; rewritten on every build\n" + yaml.safe_dump(defaults, sort_keys=False)
+    path = shlex.quote(COLCON_DEFAULTS_REL_PATH)
+    return f"mkdir -p {shlex.quote(str(Path(COLCON_DEFAULTS_REL_PATH).parent))} && printf %s {shlex.quote(text)} > {path}.tmp && mv {path}.tmp {path}"
 
 def infer_ros2_distro(os_name: str, os_version: str) -> Optional[str]:
     # Minimal heuristic: Ubuntu 24.04 -> jazzy
@@ -10,7 +157,7 @@ def infer_ros2_distro(os_name: str, os_version: str) -> Optional[str]:
             return "humble"
     return None
 
-def build_ros_plan(analysis: Dict[str, Any], os_name: str, os_version: str) -> List[PlanStep]:
+def build_ros_plan(analysis: Dict[str, Any], os_name: str, os_version: str, rosdep: Optional[RosdepIndex] = None) -> List[PlanStep]:
     deps = (analysis.get("dependencies") or {}).get("ros") or []
     readme_blocks = (analysis.get("setup_intent") or {}).get("install_blocks") or []
 
@@ -22,15 +169,91 @@ def build_ros_plan(analysis: Dict[str, Any], os_name: str, os_version: str) -> L
     distro = infer_ros2_distro(os_name, os_version)
     steps: List[PlanStep] = []
 
-    steps.append(PlanStep(
-        title=f"Install ROS 2 ({distro or 'distro TBD'})",
-        commands=[],
-        why="ROS packages are required for this workspace. We infer distro from OS; confirm if README specifies otherwise.",
-        requires_confirmation=True,
-    ))
+    # only what dpkg doesn't already list gets installed
+    dpkg = dpkg_index()
+    _, ros_present = split_dpkg([f"ros-{distro}-{m}" for m in ROS_METAPACKAGES] if distro else [], dpkg)
+    if ros_present:
+        steps.append(PlanStep(
+            kind="ros",
+            id="ros.install",
+            title=f"ROS 2 {distro} already installed",
+            commands=[],
+            why=f"{ros_present[0]} is installed; nothing to do.",
+            evidence={"already_installed": ros_present},
+            requires_confirmation=False,
+        ))
+    else:
+        steps.append(PlanStep(
+            kind="ros",
+            id="ros.install",
+            lock_group="apt",
+            title=f"Install ROS 2 ({distro or 'distro TBD'})",
+            commands=[],
+            why="ROS packages are required for this workspace. We infer distro from OS; confirm if README specifies otherwise.",
+            requires_confirmation=True,
+        ))
 
-    if mentions_rosdep:
+    # Resolve ros keys locally when a rosdep index is available
+    unresolved: List[str] = []
+    if rosdep is not None:
+        repo_path = analysis.get("repoPath")
+        internal = workspace_package_names(Path(repo_path)) if repo_path else set()
+        resolved = resolve_ros_deps(deps, rosdep, internal)
+        apt_pkgs = sorted({p for r in resolved.values() if r.status == "apt" for p in r.packages})
+        pip_pkgs = sorted({p for r in resolved.values() if r.status == "pip" for p in r.packages})
+        unresolved = sorted(k for k, r in resolved.items() if r.status in ("unresolved", "source"))
+        unavailable = sorted(k for k, r in resolved.items() if r.status == "unavailable")
+        n_internal = sum(1 for r in resolved.values() if r.status == "internal")
+        evidence = {
+            "rosdep_index": {"distro": rosdep.distro, "os": rosdep.os, "release": rosdep.release},
+            "internal": n_internal,
+            "unresolved": unresolved,
+            "unavailable": unavailable,
+        }
+        why = f"Resolved {len(resolved)} ros keys from the local rosdep index ({n_internal} workspace-internal)."
+        apt_missing, apt_present = split_dpkg(apt_pkgs, dpkg)
+        if apt_pkgs:
+            pruned = {"already_installed": apt_present, "pruned_seconds": 2.0 * len(apt_present)} if apt_present else {}
+            steps.append(PlanStep(
+                kind="ros",
+                id="ros.apt",
+                depends_on=["ros.install"],
+                lock_group="apt",
+                est_seconds=10 + 2 * len(apt_missing) if apt_missing else 0,
+                title=f"Install ROS system dependencies ({len(apt_missing)} apt packages)" if apt_missing
+                else f"ROS system dependencies already installed ({len(apt_present)} apt packages)",
+                commands=["sudo apt-get update", "sudo apt-get install -y " + " ".join(apt_missing)] if apt_missing else [],
+                why=why + (f" {len(apt_present)} of {len(apt_pkgs)} packages are already installed and skipped." if apt_present else ""),
+                evidence={**evidence, **pruned},
+                requires_confirmation=bool(apt_missing),
+            ))
+        pip_missing = list(pip_pkgs)
+        python = system_pip_python()
+        for prefix in SYSTEM_PIP_PREFIXES:
+            pip_missing, _ = split_pip(pip_missing, pip_index(Path(prefix).expanduser(), python))
+        pip_present = [p for p in pip_pkgs if p not in pip_missing]
+        if pip_pkgs:
+            pruned = {"already_installed": pip_present, "pruned_seconds": 5.0 * len(pip_present)} if pip_present else {}
+            steps.append(PlanStep(
+                kind="ros",
+                id="ros.pip",
+                lock_group="pip:system",
+                est_seconds=10 + 5 * len(pip_missing) if pip_missing else 0,
+                title="Install ROS python dependencies (pip)" if pip_missing else "ROS python dependencies already installed",
+                commands=["python3 -m pip install " + " ".join(pip_missing)] if pip_missing else [],
+                why="rosdep rules map these keys to the pip installer."
+                + (f" {len(pip_present)} of {len(pip_pkgs)} are already installed and skipped." if pip_present else ""),
+                evidence={**evidence, **pruned},
+                requires_confirmation=bool(pip_missing),
+            ))
+
+    if mentions_rosdep and (rosdep is None or unresolved):
         steps.append(PlanStep(
+            kind="ros",
+            id="ros.rosdep",
+            depends_on=["ros.install"],
+            lock_group="apt",
+            est_seconds=120,
             title="Install ROS dependencies with rosdep",
             commands=[
                 "sudo rosdep init || true",
@@ -40,17 +263,87 @@ def build_ros_plan(analysis: Dict[str, Any], os_name: str, os_version: str) -> L
             why="README includes rosdep install for system/ROS dependencies.",
         ))
 
-    steps.append(PlanStep(
-        title="Build workspace (colcon)",
-        commands=["colcon build"],
-        why="Most ROS2 workspaces build with colcon; adjust if repo specifies.",
-        requires_confirmation=True,
-    ))
+    repo_path = analysis.get("repoPath")
+    if repo_path and Path(repo_path).is_dir():
+        build = build_colcon_step(Path(repo_path), analysis.get("fingerprint") or {})
+    else:
+        build = PlanStep(
+            kind="ros",
+            id="ros.build",
+            title="Build workspace (colcon)",
+            commands=["colcon build --symlink-install"],
+            why="Most ROS2 workspaces build with colcon; adjust if repo specifies. --symlink-install lets Python and launch file edits take effect without a rebuild.",
+            requires_confirmation=True,
+        )
+    # the build needs everything installed above
+    build.depends_on = [s.id for s in steps]
+    steps.append(build)
 
     steps.append(PlanStep(
+        kind="ros",
+        id="ros.source",
+        depends_on=["ros.build"],
         title="Source environment",
         commands=["source install/setup.bash"],
         why="Required for ROS packages and launch files.",
     ))
 
     return steps
+
+def build_colcon_step(ws_root: Path, fp: Optional[Dict[str, Any]] = None) -> PlanStep:
+    """
+    colcon build sized to the workspace DAG and the machine; incremental when a previous
+    build exists.
+    """
+    g = build_workspace_graph(find_package_xmls(ws_root))
+    cores = int((fp or {}).get("cpu_count") or os.cpu_count() or 1)
+    defaults, env, accel_why, accel = colcon_acceleration(fp or {}, ws_root, min(cores, g.width or 1))
+    evidence: Dict[str, Any] = {
+        "packages": len(g.packages),
+        "levels": g.levels,
+        "width": g.width,
+        "critical_path": g.critical_path,
+        "cycles": g.cycles,
+        "acceleration": accel,
+    }
+    accel_txt = "; ".join(accel_why)
+    why = (
+        f"{len(g.packages)} packages in {g.critical_path} dependency levels (widest level: {g.width}). "
+        f"{accel_txt[:1].upper()}{accel_txt[1:]}."
+    )
+    if g.cycles:
+        why += " Dependency cycles detected: " + "; ".join(" <-> ".join(c) for c in g.cycles) + ". colcon will refuse to build these."
+
+    # parallel workers, symlink-install and cmake args come from the defaults file
+    cmd = [*(f"{k}={v}" for k, v in env.items()), f"COLCON_DEFAULTS_FILE={COLCON_DEFAULTS_REL_PATH}", "colcon", "build"]
+    changed = changed_packages(ws_root, g)
+    if changed is not None:
+        affected = g.dependents(changed)
+        evidence["changed"] = sorted(changed)
+        evidence["rebuild"] = sorted(affected)
+        if not changed:
+            return PlanStep(
+                kind="ros",
+                id="ros.build",
+                title="Build workspace (colcon)",
+                commands=[],
+                why="No package changed since the last colcon build; nothing to rebuild.",
+                evidence=evidence,
+                requires_confirmation=False,
+            )
+        if affected == changed:
+            cmd += ["--packages-select", *sorted(changed)]
+        else:
+            cmd += ["--packages-above", *sorted(changed)]
+        why += f" Incremental: {len(changed)} changed, {len(affected)} to rebuild including dependents."
+
+    return PlanStep(
+        kind="ros",
+        id="ros.build",
+        est_seconds=60.0 * max(1, g.critical_path),
+        title="Build workspace (colcon)",
+        commands=[colcon_defaults_command(defaults), " ".join(cmd)],
+        why=why,
+        evidence=evidence,
+        requires_confirmation=True,
+    )
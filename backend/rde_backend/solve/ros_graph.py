@@ -0,0 +1,199 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+import os
+import xml.etree.ElementTree as ET
+
+from ..repo_scan import IGNORE_MARKERS, SKIP_DIRS
+from ..ros_deps import _strip_ns
+
+# Workspace package DAG from package.xml files: only edges between packages that
+# live in the workspace matter for build ordering and incremental rebuilds.
+
+BUILD_EDGE_TAGS = {"depend", "build_depend", "buildtool_depend", "build_export_depend"}
+
+@dataclass
+class WorkspaceGraph:
+    packages: Dict[str, Path] = field(default_factory=dict)      # name -> package root
+    deps: Dict[str, Set[str]] = field(default_factory=dict)      # name -> internal build deps
+    levels: List[List[str]] = field(default_factory=list)        # topological levels
+    cycles: List[List[str]] = field(default_factory=list)
+
+    @property
+    def width(self) -> int:
+        return max((len(lv) for lv in self.levels), default=0)
+
+    @property
+    def critical_path(self) -> int:
+        # every level depends on the previous one, so depth == longest chain
+        return len(self.levels)
+
+    def dependents(self, names: Set[str]) -> Set[str]:
+        """
+        Transitive reverse-dependency closure of `names` (including them).
+        """
+        rev: Dict[str, Set[str]] = {n: set() for n in self.packages}
+        for n, ds in self.deps.items():
+            for d in ds:
+                rev[d].add(n)
+        out = set(names)
+        stack = list(names)
+        while stack:
+            n = stack.pop()
+            for m in rev.get(n, ()):
+                if m not in out:
+                    out.add(m)
+                    stack.append(m)
+        return out
+
+def find_package_xmls(ws_root: Path) -> List[Path]:
+    """
+    colcon-style discovery: stop descending at a package, honor *_IGNORE markers.
+    """
+    src = ws_root / "src"
+    base = src if src.is_dir() else ws_root
+    out: List[Path] = []
+    for dirpath, dirnames, filenames in os.walk(base):
+        if any(m in filenames for m in IGNORE_MARKERS):
+            dirnames[:] = []
+            continue
+        if "package.xml" in filenames:
+            out.append(Path(dirpath) / "package.xml")
+            dirnames[:] = []
+            continue
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")]
+    return sorted(out)
+
+def _read_manifest(p: Path) -> Optional[tuple]:
+    try:
+        root = ET.fromstring(p.read_text(errors="ignore"))
+    except Exception:
+        return None
+    name = None
+    deps: Set[str] = set()
+    for elem in root.iter():
+        tag = _strip_ns(elem.tag)
+        if tag == "name" and name is None:
+            name = (elem.text or "").strip() or None
+        elif tag in BUILD_EDGE_TAGS:
+            dep = (elem.text or "").strip()
+            if dep:
+                deps.add(dep)
+    return (name or p.parent.name), deps
+
+def _tarjan(nodes: List[str], deps: Dict[str, Set[str]]) -> List[List[str]]:
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    out: List[List[str]] = []
+    counter = [0]
+
+    def visit(v: str):
+        index[v] = low[v] = counter[0]
+        counter[0] += 1
+        stack.append(v)
+        on_stack.add(v)
+        for w in deps.get(v, ()):
+            if w not in index:
+                visit(w)
+                low[v] = min(low[v], low[w])
+            elif w in on_stack:
+                low[v] = min(low[v], index[w])
+        if low[v] == index[v]:
+            comp = []
+            while True:
+                w = stack.pop()
+                on_stack.discard(w)
+                comp.append(w)
+                if w == v:
+                    break
+            if len(comp) > 1 or v in deps.get(v, ()):
+                out.append(sorted(comp))
+
+    for n in nodes:
+        if n not in index:
+            visit(n)
+    return out
+
+def build_workspace_graph(package_xmls: List[Path]) -> WorkspaceGraph:
+    g = WorkspaceGraph()
+    raw: Dict[str, Set[str]] = {}
+    for p in package_xmls:
+        parsed = _read_manifest(p)
+        if parsed is None:
+            continue
+        name, deps = parsed
+        g.packages.setdefault(name, p.parent)
+        raw.setdefault(name, set()).update(deps)
+
+    internal = set(g.packages)
+    g.deps = {n: {d for d in ds if d in internal} for n, ds in raw.items()}
+
+    # Kahn's algorithm, level by level
+    indeg = {n: len(ds) for n, ds in g.deps.items()}
+    rev: Dict[str, Set[str]] = {n: set() for n in g.deps}
+    for n, ds in g.deps.items():
+        for d in ds:
+            rev[d].add(n)
+    level = sorted(n for n, k in indeg.items() if k == 0)
+    done: Set[str] = set()
+    while level:
+        g.levels.append(level)
+        done.update(level)
+        nxt: Set[str] = set()
+        for n in level:
+            for m in rev[n]:
+                indeg[m] -= 1
+                if indeg[m] == 0:
+                    nxt.add(m)
+        level = sorted(nxt)
+
+    if len(done) < len(g.deps):
+        rest = sorted(set(g.deps) - done)
+        g.cycles = _tarjan(rest, {n: g.deps[n] & set(rest) for n in rest})
+    return g
+
+def _last_build_time(ws_root: Path, name: str) -> Optional[float]:
+    """
+    When `name` last built successfully, or None. colcon writes colcon_build.rc (the
+    build's return code) on failures too, so only "0" with an installed package counts.
+    """
+    stamp = ws_root / "build" / name / "colcon_build.rc"
+    try:
+        if stamp.read_text().strip() != "0":
+            return None
+        built = stamp.stat().st_mtime
+    except OSError:
+        return None
+    # isolated installs get install/<pkg>, --merge-install puts it under install/share/<pkg>
+    install = ws_root / "install"
+    if not (install / name).is_dir() and not (install / "share" / name).is_dir():
+        return None
+    return built
+
+def _newest_mtime(root: Path) -> float:
+    newest = 0.0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")]
+        for fn in filenames:
+            try:
+                newest = max(newest, os.stat(os.path.join(dirpath, fn)).st_mtime)
+            except OSError:
+                continue
+    return newest
+
+def changed_packages(ws_root: Path, g: WorkspaceGraph) -> Optional[Set[str]]:
+    """
+    Packages modified since their last successful colcon build, or whose last build
+    failed. None when there is no previous build.
+    """
+    if not (ws_root / "build").is_dir() or not (ws_root / "install").is_dir():
+        return None
+    out: Set[str] = set()
+    for name, root in g.packages.items():
+        built = _last_build_time(ws_root, name)
+        if built is None or _newest_mtime(root) > built:
+            out.add(name)
+    return out
@@ -0,0 +1,230 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import hashlib
+import marshal
+import os
+import re
+import xml.etree.ElementTree as ET
+
+import yaml
+
+from ..paths import cache_dir
+from .ros_graph import find_package_xmls
+
+# Local rosdep key index: rosdep YAML (base.yaml, python.yaml, ...) plus rosdistro
+# distribution.yaml files are flattened for one (distro, os, release) into
+# key -> (installer, packages) and stored as a marshal blob in the RDE cache,
+# so resolving thousands of keys is a dict lookup instead of a `rosdep` run.
+
+INDEX_FORMAT = 1
+
+# ':'-separated list of rosdep YAML / distribution.yaml files or directories
+ROSDEP_SOURCES_ENV = "RDE_ROSDEP_SOURCES"
+
+UBUNTU_CODENAMES = {
+    "18.04": "bionic",
+    "20.04": "focal",
+    "22.04": "jammy",
+    "24.04": "noble",
+}
+
+UBUNTU_VERSION_RE = re.compile(r"\b(\d{2}\.\d{2})\b")
+
+INSTALLERS = ("apt", "pip", "source")
+
+@dataclass
+class RosdepResolution:
+    key: str
+    status: str                    # "apt" | "pip" | "source" | "internal" | "unresolved" | "unavailable"
+    packages: List[str] = field(default_factory=list)
+
+@dataclass
+class RosdepIndex:
+    distro: str
+    os: str
+    release: str
+    keys: Dict[str, Tuple[str, Tuple[str, ...]]] = field(default_factory=dict)
+    sources: List[str] = field(default_factory=list)
+
+    def lookup(self, key: str) -> Optional[Tuple[str, Tuple[str, ...]]]:
+        return self.keys.get(key)
+
+def ubuntu_codename(os_version: str) -> Optional[str]:
+    for m in UBUNTU_VERSION_RE.finditer(os_version or ""):
+        name = UBUNTU_CODENAMES.get(m.group(1))
+        if name:
+            return name
+    return None
+
+def source_files(spec: Optional[str] = None) -> List[Path]:
+    spec = spec if spec is not None else os.environ.get(ROSDEP_SOURCES_ENV, "")
+    out: List[Path] = []
+    for part in spec.split(os.pathsep):
+        if not part.strip():
+            continue
+        p = Path(part).expanduser()
+        if p.is_dir():
+            out.extend(sorted(q for q in p.rglob("*.yaml") if q.is_file()))
+        elif p.is_file():
+            out.append(p)
+    return out
+
+def _normalize_rule(rule: Any) -> Optional[Tuple[str, Tuple[str, ...]]]:
+    """
+    One os/release rule -> (installer, packages). None means "explicitly unavailable".
+    Accepts the rosdep shapes: [pkgs], "pkg", {apt: {packages: [...]}}, {packages: [...]}.
+    """
+    if rule is None:
+        return None
+    if isinstance(rule, str):
+        return ("apt", tuple(rule.split()))
+    if isinstance(rule, list):
+        return ("apt", tuple(str(x) for x in rule))
+    if isinstance(rule, dict):
+        if "packages" in rule:
+            return ("apt", tuple(str(x) for x in rule.get("packages") or []))
+        for inst in INSTALLERS:
+            if inst in rule:
+                body = rule[inst]
+                pkgs = body.get("packages") if isinstance(body, dict) else body
+                if isinstance(pkgs, str):
+                    pkgs = pkgs.split()
+                return (inst, tuple(str(x) for x in pkgs or []))
+    return None
+
+def _is_release_map(d: Dict[str, Any]) -> bool:
+    return not any(k in d for k in INSTALLERS + ("packages",))
+
+def _rules_for(entry: Any, os_name: str, release: str) -> Tuple[bool, Optional[Tuple[str, Tuple[str, ...]]]]:
+    """
+    (found, rule) for one rosdep key entry on os/release.
+    """
+    if not isinstance(entry, dict) or os_name not in entry:
+        return False, None
+    os_rule = entry[os_name]
+    if isinstance(os_rule, dict) and _is_release_map(os_rule):
+        if release in os_rule:
+            return True, _normalize_rule(os_rule[release])
+        if "*" in os_rule:
+            return True, _normalize_rule(os_rule["*"])
+        return False, None
+    return True, _normalize_rule(os_rule)
+
+def _debian_name(distro: str, pkg: str) -> str:
+    return f"ros-{distro}-{pkg.replace('_', '-')}"
+
+def _load_yaml(p: Path) -> Dict[str, Any]:
+    try:
+        # libyaml loader when available: rosdep base.yaml is large
+        data = yaml.load(p.read_text(errors="ignore"), Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def _build(files: List[Path], distro: str, os_name: str, release: str) -> Dict[str, Tuple[str, Tuple[str, ...]]]:
+    keys: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+    unavailable: Set[str] = set()
+    for p in files:
+        data = _load_yaml(p)
+        if "repositories" in data and data.get("type") == "distribution":
+            # rosdistro layout: <distro>/distribution.yaml
+            if p.parent.name != distro:
+                continue
+            for repo_name, repo in (data.get("repositories") or {}).items():
+                rel = (repo or {}).get("release") or {}
+                if not rel:
+                    continue
+                for pkg in rel.get("packages") or [repo_name]:
+                    keys.setdefault(str(pkg), ("apt", (_debian_name(distro, str(pkg)),)))
+            continue
+        for key, entry in data.items():
+            found, rule = _rules_for(entry, os_name, release)
+            if not found:
+                continue
+            if rule is None:
+                unavailable.add(str(key))
+                continue
+            # first source wins, matching rosdep's sources.list precedence
+            keys.setdefault(str(key), rule)
+    for key in unavailable:
+        keys.setdefault(key, ("unavailable", ()))
+    return keys
+
+def _signature(files: List[Path], distro: str, os_name: str, release: str) -> str:
+    h = hashlib.sha256(f"{INDEX_FORMAT}|{distro}|{os_name}|{release}".encode())
+    for p in files:
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        h.update(f"|{p}:{st.st_size}:{int(st.st_mtime)}".encode())
+    return h.hexdigest()[:24]
+
+_LOADED: Dict[str, RosdepIndex] = {}
+
+def load_rosdep_index(files: List[Path], distro: str, os_name: str = "ubuntu", release: str = "noble") -> RosdepIndex:
+    """
+    Load (or build and persist) the flattened index for one distro/os/release.
+    """
+    sig = _signature(files, distro, os_name, release)
+    hit = _LOADED.get(sig)
+    if hit is not None:
+        return hit
+
+    blob = cache_dir("rosdep") / f"{sig}.marshal"
+    keys: Optional[Dict[str, Tuple[str, Tuple[str, ...]]]] = None
+    try:
+        data = marshal.loads(blob.read_bytes())
+        if isinstance(data, dict) and data.get("format") == INDEX_FORMAT:
+            keys = data["keys"]
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        keys = None
+
+    if keys is None:
+        keys = _build(files, distro, os_name, release)
+        try:
+            tmp = blob.with_suffix(".tmp")
+            tmp.write_bytes(marshal.dumps({"format": INDEX_FORMAT, "keys": keys}))
+            os.replace(tmp, blob)
+        except OSError:
+            pass
+
+    idx = RosdepIndex(distro=distro, os=os_name, release=release, keys=keys, sources=[str(p) for p in files])
+    _LOADED[sig] = idx
+    return idx
+
+def workspace_package_names(ws_root: Path) -> Set[str]:
+    """
+    `<name>` of every package.xml in the workspace (falls back to the directory name),
+    including packages that declare no dependencies of their own.
+    """
+    names: Set[str] = set()
+    for p in find_package_xmls(ws_root):
+        name = None
+        try:
+            root = ET.fromstring(p.read_text(errors="ignore"))
+            el = root.find("name")
+            name = (el.text or "").strip() if el is not None else None
+        except Exception:
+            name = None
+        names.add(name or p.parent.name)
+    return names
+
+def resolve_ros_deps(deps: List[Dict[str, Any]], index: RosdepIndex, internal: Set[str]) -> Dict[str, RosdepResolution]:
+    out: Dict[str, RosdepResolution] = {}
+    for d in deps:
+        key = d.get("name")
+        if not key or key in out:
+            continue
+        if key in internal:
+            out[key] = RosdepResolution(key=key, status="internal")
+            continue
+        hit = index.lookup(key)
+        if hit is None:
+            out[key] = RosdepResolution(key=key, status="unresolved")
+        else:
+            installer, pkgs = hit
+            out[key] = RosdepResolution(key=key, status=installer, packages=list(pkgs))
+    return out
@@ -1,10 +1,16 @@
+from functools import lru_cache
 from typing import Any, Dict
 import yaml
 from pathlib import Path
 from .constraints import ConstraintGraph
 
 def load_rules(path: Path) -> Dict[str, Any]:
-    return yaml.safe_load(path.read_text())
+    return _load_rules(str(path), path.stat().st_mtime_ns)
+
+@lru_cache(maxsize=8)
+def _load_rules(path: str, mtime_ns: int) -> Dict[str, Any]:
+    # keyed on mtime so edits to rules_db.yaml apply without a restart; treat as read-only
+    return yaml.safe_load(Path(path).read_text())
 
 def apply_rules(g: ConstraintGraph, rules_obj: Dict[str, Any]) -> None:
     rules = rules_obj.get("rules", [])
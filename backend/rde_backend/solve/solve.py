@@ -1,18 +1,184 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Callable, ContextManager, Dict, Any, List, Optional, Tuple
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
 from ..models import SolveResponse, SolveDecision, PlanStep, ResolutionAttempt, Conflict, DecisionPoint, DecisionPointOption
 from .constraints import build_constraints
 from .rules import load_rules, apply_rules
-from .resolve_ros import build_ros_plan, infer_ros2_distro
-from .resolve_pip import build_pip_plan, build_requirements_in, try_uv_lock
+from .gpu_wheels import apply_wheel_choices, select_wheels
+from .installed import installed_state
+from .env_store import EnvStore
+from .resolve_ros import build_colcon_step, build_ros_plan, infer_ros2_distro, system_pip_state
+from .resolve_pip import build_constraints_txt, build_pip_plan, build_requirements_in, publish_lock, try_uv_lock
 from .resolve_conda import build_conda_plan
+from .resolve_local import local_feasibility
+from .specifiers import find_spec_conflicts, spec_entries
+from .rosdep_index import load_rosdep_index, source_files, ubuntu_codename
+from ..memory import phase
+from ..singleflight import SingleFlight
 
 RULES_PATH = Path(__file__).parent / "rules_db.yaml"
 
-def solve(repo_path: str, choices: Dict[str, Any], analysis: Dict[str, Any]) -> SolveResponse:
-    g = build_constraints(analysis, choices)
-    rules = load_rules(RULES_PATH)
-    apply_rules(g, rules)
+# Directory of wheels / simple-index mirror used for fast in-process feasibility checks.
+PIP_INDEX_ENV = "RDE_PIP_INDEX_DIR"
+
+# Solves are memoized on (repo, analysis hash, choices) and uv locks on
+# (requirements.in, constraints, python), so switching wizard options or evaluating
+# a choices matrix only pays for each distinct lock once. Installed packages and READY
+# stored envs are part of the solve key, a hit whose stored env prefix changed since is
+# dropped, and the colcon build step is recomputed on every hit
+# (it depends on workspace edits since the last build). Entries expire so that index
+# changes (new releases) are eventually picked up.
+# Solve entries are partitioned per repo (a shared daemon serves many workspaces, and
+# one repo's churn must not evict another's); locks are content-keyed and shared.
+SOLVE_MEMO_SIZE = 64
+SOLVE_MEMO_REPOS = 16
+SOLVE_MEMO_TTL_S = 600.0
+MATRIX_MAX_COMBINATIONS = 64
+MATRIX_WORKERS = 4
+
+_SOLVE_MEMO: "OrderedDict[str, OrderedDict[str, Tuple[float, SolveResponse, Optional[str], List[str], str]]]" = OrderedDict()
+_LOCK_MEMO: "OrderedDict[str, Tuple[float, ResolutionAttempt, List[Conflict], Optional[str]]]" = OrderedDict()
+_MEMO_LOCK = threading.Lock()
+_LOCK_FLIGHT = SingleFlight()
+
+def analysis_hash(analysis: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(analysis, sort_keys=True, default=str).encode()).hexdigest()
+
+def _memo_get(memo: OrderedDict, key: str):
+    with _MEMO_LOCK:
+        hit = memo.get(key)
+        if hit is None:
+            return None
+        if time.time() - hit[0] > SOLVE_MEMO_TTL_S:
+            del memo[key]
+            return None
+        memo.move_to_end(key)
+        return hit
+
+def _memo_put(memo: OrderedDict, key: str, value: tuple) -> None:
+    with _MEMO_LOCK:
+        memo[key] = (time.time(),) + value
+        memo.move_to_end(key)
+        while len(memo) > SOLVE_MEMO_SIZE:
+            memo.popitem(last=False)
+
+def _repo_memo(repo_path: str) -> OrderedDict:
+    with _MEMO_LOCK:
+        memo = _SOLVE_MEMO.get(repo_path)
+        if memo is None:
+            memo = _SOLVE_MEMO[repo_path] = OrderedDict()
+            while len(_SOLVE_MEMO) > SOLVE_MEMO_REPOS:
+                _SOLVE_MEMO.popitem(last=False)
+        _SOLVE_MEMO.move_to_end(repo_path)
+        return memo
+
+def memo_stats() -> Dict[str, Any]:
+    with _MEMO_LOCK:
+        return {"solve": {repo: len(m) for repo, m in _SOLVE_MEMO.items()}, "lock": len(_LOCK_MEMO)}
+
+def clear_solve_memo() -> None:
+    with _MEMO_LOCK:
+        _SOLVE_MEMO.clear()
+        _LOCK_MEMO.clear()
+
+def solve(repo_path: str, choices: Dict[str, Any], analysis: Dict[str, Any], analysis_digest: Optional[str] = None) -> SolveResponse:
+    digest = analysis_digest or analysis_hash(analysis)
+    # plans skip what's already installed (in .venv, or system-wide for rosdep's pip keys)
+    # and reuse READY envs, so changes to either invalidate them
+    state = [installed_state(Path(repo_path) / ".venv"), system_pip_state(), EnvStore().ready_state()]
+    key = hashlib.sha256(json.dumps([repo_path, digest, choices, state], sort_keys=True, default=str).encode()).hexdigest()
+    memo = _repo_memo(repo_path)
+    hit = _memo_get(memo, key)
+    # stored envs the plan looked into (a partly built conda prefix is resumed) must be unchanged
+    if hit is not None and installed_state(*hit[3]) == hit[4]:
+        _, cached, lock_text, _, _ = hit
+        # the lock on disk may belong to another combination solved since
+        if lock_text is not None:
+            publish_lock(repo_path, lock_text)
+        resp = cached.model_copy(deep=True)
+        _refresh_ros_build(resp, analysis)
+        resp.notes.append("Served from solve cache.")
+        return resp
+    resp, lock_text = _solve(repo_path, choices, analysis)
+    envs = sorted({str(s.evidence["env_path"]) for s in resp.plan_steps if (s.evidence or {}).get("env_path")})
+    _memo_put(memo, key, (resp.model_copy(deep=True), lock_text, envs, installed_state(*envs)))
+    return resp
+
+def _refresh_ros_build(resp: SolveResponse, analysis: Dict[str, Any]) -> None:
+    # which packages to rebuild follows from workspace edits since the last colcon build,
+    # which no memo key captures cheaply; the step is rebuilt in place instead
+    repo_path = analysis.get("repoPath")
+    if not repo_path or not Path(repo_path).is_dir():
+        return
+    for i, s in enumerate(resp.plan_steps):
+        if s.id == "ros.build":
+            fresh = build_colcon_step(Path(repo_path), analysis.get("fingerprint") or {})
+            fresh.depends_on = s.depends_on
+            resp.plan_steps[i] = fresh
+
+def solve_matrix(
+    repo_path: str,
+    base: Dict[str, Any],
+    axes: Dict[str, List[Any]],
+    analysis: Dict[str, Any],
+    slot: Callable[[], ContextManager[Any]] = nullcontext,
+) -> List[Tuple[Dict[str, Any], SolveResponse]]:
+    """
+    Solve every combination of `axes` (choice name -> values) on top of `base`.
+    The analysis is hashed once; rules, the rosdep index and uv locks are shared.
+    Each combination runs inside its own slot() (a scheduler worker slot), so a matrix
+    gets no more concurrency than the daemon's worker limit allows.
+    """
+    names = list(axes)
+    combos = list(itertools.product(*(axes[n] for n in names)))
+    if len(combos) > MATRIX_MAX_COMBINATIONS:
+        raise ValueError(f"{len(combos)} combinations requested; at most {MATRIX_MAX_COMBINATIONS} allowed")
+    digest = analysis_hash(analysis)
+    all_choices = [{**base, **dict(zip(names, values))} for values in combos]
+
+    def one(choices: Dict[str, Any]) -> SolveResponse:
+        with slot():
+            return solve(repo_path, choices, analysis, analysis_digest=digest)
+
+    # locks resolve in private scratch dirs and publish under their content hash, so
+    # combinations can run side by side
+    with ThreadPoolExecutor(max_workers=MATRIX_WORKERS) as pool:
+        results = list(pool.map(one, all_choices))
+    return list(zip(all_choices, results))
+
+def _locked(repo_path: str, req_in: str, constraints_in: str, python_target: str, extra_index_urls: List[str]) -> Tuple[ResolutionAttempt, List[Conflict], Optional[str]]:
+    indexes = "\n".join(extra_index_urls)
+    lock_key = hashlib.sha256(f"{python_target}\0{req_in}\0{constraints_in}\0{indexes}".encode()).hexdigest()[:16]
+
+    def lock():
+        hit = _memo_get(_LOCK_MEMO, lock_key)
+        if hit is not None:
+            return hit[1:]
+        result = try_uv_lock(repo_path, req_in, constraints_in, python_target, extra_index_urls)
+        _memo_put(_LOCK_MEMO, lock_key, result)
+        return result
+
+    # combinations sharing a lock (matrix, concurrent solves) wait for one uv run
+    (attempt, confs, lock_text), _ = _LOCK_FLIGHT.do(lock_key, lock)
+    if lock_text is not None:
+        publish_lock(repo_path, lock_text, req_in, constraints_in)
+    return attempt.model_copy(deep=True), [c.model_copy(deep=True) for c in confs], lock_text
+
+def _solve(repo_path: str, choices: Dict[str, Any], analysis: Dict[str, Any]) -> Tuple[SolveResponse, Optional[str]]:
+    with phase("constraints"):
+        g = build_constraints(analysis, choices)
+        rules = load_rules(RULES_PATH)
+        apply_rules(g, rules)
+        # after the rules: a CUDA variant's pin must coexist with the rule pins
+        apply_wheel_choices(g, select_wheels(g))
 
     decision = SolveDecision(
         envType=str(choices.get("envType")),
@@ -26,26 +192,63 @@ def solve(repo_path: str, choices: Dict[str, Any], analysis: Dict[str, Any]) ->
     plan_steps: List[PlanStep] = []
     attempts: List[ResolutionAttempt] = []
     conflicts: List[Conflict] = []
-    notes: List[str] = []
+    notes: List[str] = [f"{c['framework']}: using {c['variant']} wheels ({c['reason']})." for c in g.wheel_choices]
+    lock_text: Optional[str] = None
 
     # C) ROS plan (independent of env type)
-    plan_steps.extend(build_ros_plan(analysis, g.os_name, g.os_version))
+    with phase("ros_plan"):
+        rosdep = None
+        rosdep_files = source_files()
+        release = ubuntu_codename(g.os_version)
+        if rosdep_files and decision.ros2Distro and release:
+            rosdep = load_rosdep_index(rosdep_files, decision.ros2Distro, "ubuntu", release)
+        plan_steps.extend(build_ros_plan(analysis, g.os_name, g.os_version, rosdep=rosdep))
 
     # A/B plans + attempts
     if decision.envType == "venv":
-        plan_steps.extend(build_pip_plan(g))
         # try lock if uv exists
         req_in = build_requirements_in(g)
-        try:
-            attempt, confs = try_uv_lock(repo_path, req_in)
-            attempts.append(attempt)
-            conflicts.extend(confs)
-        except FileNotFoundError:
-            attempts.append(ResolutionAttempt(tool="uv", success=False, summary="uv not installed", stderr_tail="Install uv to enable lock."))
+        # cheap specifier pre-check: an empty intersection can never lock
+        spec_conflicts = find_spec_conflicts(spec_entries(g, decision.pythonTarget))
+        if spec_conflicts:
+            conflicts.extend(spec_conflicts)
+            attempts.append(ResolutionAttempt(
+                tool="rde-specifiers",
+                success=False,
+                summary=f"{len(spec_conflicts)} specifier conflict(s); uv lock skipped",
+            ))
+        else:
+            index_dir = os.environ.get(PIP_INDEX_ENV)
+            if index_dir:
+                la, lc, ln = local_feasibility(g, req_in, index_dir)
+                attempts.extend(la)
+                conflicts.extend(lc)
+                notes.extend(ln)
+            try:
+                with phase("lock"):
+                    attempt, confs, lock_text = _locked(repo_path, req_in, build_constraints_txt(g), decision.pythonTarget or "", g.extra_index_urls)
+                attempts.append(attempt)
+                conflicts.extend(confs)
+            except FileNotFoundError:
+                attempts.append(ResolutionAttempt(tool="uv", success=False, summary="uv not installed", stderr_tail="Install uv to enable lock."))
+        plan_steps.extend(build_pip_plan(g, lock_text=lock_text, repo_path=repo_path))
     elif decision.envType == "conda":
-        plan_steps.extend(build_conda_plan(g))
+        plan_steps.extend(build_conda_plan(g, repo_path=repo_path))
         # conda dry-run can be added next
 
+    pruned, pruned_s = 0, 0.0
+    for s in plan_steps:
+        saved = (s.evidence or {}).get("time_saved_seconds")
+        if saved is not None:
+            notes.append(f"Reusing stored environment {s.evidence['env_key'][:12]} saves ~{saved:.0f}s of environment build time.")
+        present = (s.evidence or {}).get("already_installed") or []
+        if present:
+            pruned += len(present)
+            pruned_s += s.evidence.get("pruned_seconds") or 0.0
+            notes.append(f"{s.id}: {len(present)} already installed, skipped ({', '.join(present[:5])}{', ...' if len(present) > 5 else ''}).")
+    if pruned:
+        notes.append(f"Skipped {pruned} already-installed dependencies, saving ~{pruned_s:.0f}s.")
+
     # Decision point example (Windows TF case)
     # (You can expand this later; keeping it simple)
     decision_point = None
@@ -65,11 +268,13 @@ def solve(repo_path: str, choices: Dict[str, Any], analysis: Dict[str, Any]) ->
         "python_candidates": g.python_candidates,
         "critical": sorted(list(g.critical)),
         "pin_overrides": g.pin_overrides,
+        "wheel_selection": g.wheel_choices,
+        "extra_index_urls": g.extra_index_urls,
         "warnings": g.warnings,
         "reasons": g.reasons,
     }
 
-    return SolveResponse(
+    resp = SolveResponse(
         repoPath=repo_path,
         decision=decision,
         constraints_summary=constraints_summary,
@@ -79,3 +284,4 @@ def solve(repo_path: str, choices: Dict[str, Any], analysis: Dict[str, Any]) ->
         decision_point=decision_point,
         notes=notes,
     )
+    return resp, lock_text
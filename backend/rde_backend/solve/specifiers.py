@@ -0,0 +1,267 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+from ..models import Conflict, Evidence
+from .constraints import ConstraintGraph
+from .markers import evaluate_marker, marker_env
+from .pep440 import Version, canonical_name, parse_version
+
+# Specifier -> interval engine for cheap cross-package conflict pre-checks.
+# Each specifier string is parsed once (lru_cache) into a sorted union of
+# disjoint version intervals; intersecting per canonical name finds things like
+# numpy<1.24 vs numpy>=1.26 before any external resolver runs.
+
+POETRY_RE = re.compile(r"^\s*(\^|~(?!=))\s*(\S+)\s*$")
+OP_RE = re.compile(r"^\s*(~=|===|==|!=|<=|>=|<|>|=)?\s*(\S+?)\s*$")
+
+@dataclass(frozen=True)
+class Bound:
+    version: Optional[Version]     # None = unbounded
+    inclusive: bool = False
+
+@dataclass(frozen=True)
+class Interval:
+    lo: Bound
+    hi: Bound
+
+    def is_empty(self) -> bool:
+        if self.lo.version is None or self.hi.version is None:
+            return False
+        if self.lo.version < self.hi.version:
+            return False
+        if self.lo.version == self.hi.version:
+            return not (self.lo.inclusive and self.hi.inclusive)
+        return True
+
+    def __str__(self) -> str:
+        lo = "(-inf" if self.lo.version is None else ("[" if self.lo.inclusive else "(") + str(self.lo.version)
+        hi = "+inf)" if self.hi.version is None else str(self.hi.version) + ("]" if self.hi.inclusive else ")")
+        return f"{lo}, {hi}"
+
+UNBOUNDED = Bound(None)
+ANY: Tuple[Interval, ...] = (Interval(UNBOUNDED, UNBOUNDED),)
+
+def _v(s: str) -> Optional[Version]:
+    return parse_version(s)
+
+def _dev0(release: Tuple[int, ...], epoch: int = 0) -> Version:
+    text = ".".join(str(x) for x in release) + ".dev0"
+    if epoch:
+        text = f"{epoch}!{text}"
+    return Version(epoch=epoch, release=release, dev=0, text=text)
+
+def _bump(release: Tuple[int, ...], idx: int) -> Tuple[int, ...]:
+    rel = list(release[: idx + 1])
+    rel[idx] += 1
+    return tuple(rel)
+
+def _max_lo(a: Bound, b: Bound) -> Bound:
+    if a.version is None:
+        return b
+    if b.version is None:
+        return a
+    if a.version == b.version:
+        return Bound(a.version, a.inclusive and b.inclusive)
+    return a if a.version > b.version else b
+
+def _min_hi(a: Bound, b: Bound) -> Bound:
+    if a.version is None:
+        return b
+    if b.version is None:
+        return a
+    if a.version == b.version:
+        return Bound(a.version, a.inclusive and b.inclusive)
+    return a if a.version < b.version else b
+
+def intersect(a: Tuple[Interval, ...], b: Tuple[Interval, ...]) -> Tuple[Interval, ...]:
+    out: List[Interval] = []
+    for x in a:
+        for y in b:
+            iv = Interval(_max_lo(x.lo, y.lo), _min_hi(x.hi, y.hi))
+            if not iv.is_empty():
+                out.append(iv)
+    out.sort(key=lambda iv: (iv.lo.version is not None, iv.lo.version.key() if iv.lo.version else ()))
+    return tuple(out)
+
+def _clause(op: str, target: str) -> Optional[Tuple[Interval, ...]]:
+    if target.endswith(".*") and op in ("==", "!="):
+        p = _v(target[:-2])
+        if p is None:
+            return None
+        lo = _dev0(p.release, p.epoch)
+        hi = _dev0(_bump(p.release, len(p.release) - 1), p.epoch)
+        inside = (Interval(Bound(lo, True), Bound(hi, False)),)
+        if op == "==":
+            return inside
+        return (Interval(UNBOUNDED, Bound(lo, False)), Interval(Bound(hi, True), UNBOUNDED))
+    if target.endswith(".*") and op in ("<=", "<", ">=", ">"):
+        # not valid PEP 440, but common in hand-written caps like "<=2.10.*"
+        p = _v(target[:-2])
+        if p is None:
+            return None
+        lo = _dev0(p.release, p.epoch)
+        hi = _dev0(_bump(p.release, len(p.release) - 1), p.epoch)
+        return {
+            "<=": (Interval(UNBOUNDED, Bound(hi, False)),),
+            "<": (Interval(UNBOUNDED, Bound(lo, False)),),
+            ">=": (Interval(Bound(lo, True), UNBOUNDED),),
+            ">": (Interval(Bound(hi, True), UNBOUNDED),),
+        }[op]
+
+    v = _v(target)
+    if v is None:
+        return None
+    if op in ("==", "===", "="):
+        return (Interval(Bound(v, True), Bound(v, True)),)
+    if op == "!=":
+        return (Interval(UNBOUNDED, Bound(v, False)), Interval(Bound(v, False), UNBOUNDED))
+    if op == ">=":
+        return (Interval(Bound(v, True), UNBOUNDED),)
+    if op == ">":
+        return (Interval(Bound(v, False), UNBOUNDED),)
+    if op == "<=":
+        return (Interval(UNBOUNDED, Bound(v, True)),)
+    if op == "<":
+        return (Interval(UNBOUNDED, Bound(v, False)),)
+    if op == "~=":
+        if len(v.release) < 2:
+            return None
+        hi = _dev0(_bump(v.release, len(v.release) - 2), v.epoch)
+        return (Interval(Bound(v, True), Bound(hi, False)),)
+    return None
+
+def _poetry(op: str, target: str) -> Optional[Tuple[Interval, ...]]:
+    v = _v(target)
+    if v is None:
+        return None
+    rel = v.release
+    if op == "^":
+        # ^1.2.3 -> <2.0.0, ^0.2.3 -> <0.3.0, ^0.0.3 -> <0.0.4
+        idx = next((i for i, x in enumerate(rel) if x != 0), len(rel) - 1)
+    else:
+        # ~1.2.3 -> <1.3.0, ~1 -> <2
+        idx = 0 if len(rel) == 1 else 1
+    hi = _dev0(_bump(rel, idx), v.epoch)
+    return (Interval(Bound(v, True), Bound(hi, False)),)
+
+@lru_cache(maxsize=16384)
+def parse_spec(spec: Optional[str]) -> Optional[Tuple[Interval, ...]]:
+    """
+    Parse a PEP 440 (or poetry caret/tilde) specifier into a union of intervals.
+    Returns None when the specifier can't be understood; callers treat that as "unknown".
+    """
+    if not spec or not spec.strip() or spec.strip() == "*":
+        return ANY
+    s = spec.split(";", 1)[0].strip().strip("()")
+    acc = ANY
+    for part in s.split(","):
+        part = part.strip()
+        if not part or part == "*":
+            continue
+        m = POETRY_RE.match(part)
+        if m:
+            ivs = _poetry(m.group(1), m.group(2))
+        else:
+            m = OP_RE.match(part)
+            if not m:
+                return None
+            ivs = _clause(m.group(1) or "==", m.group(2))
+        if ivs is None:
+            return None
+        acc = intersect(acc, ivs)
+    return acc
+
+def format_intervals(ivs: Tuple[Interval, ...]) -> str:
+    return " | ".join(str(iv) for iv in ivs) if ivs else "(empty)"
+
+@dataclass
+class SpecEntry:
+    name: str                     # canonical
+    spec: Optional[str]
+    evidence: Optional[Evidence] = None
+
+    def describe(self) -> str:
+        where = f" ({self.evidence.location})" if self.evidence else ""
+        return f"'{self.spec or '*'}'{where}"
+
+def _split_extras(name: str) -> str:
+    return canonical_name(name.split("[", 1)[0].strip())
+
+def spec_entries(g: ConstraintGraph, python_version: Optional[str] = None) -> List[SpecEntry]:
+    """
+    Version specifiers that apply on the target (python_version, else the first python
+    candidate): entries whose marker is false there are dropped, and marker-gated ones
+    are left to the resolver when no target python is known.
+    """
+    python = python_version or (g.python_candidates[0] if g.python_candidates else g.python_current)
+    env = marker_env(python, g.os_name, g.arch or "x86_64") if python else None
+
+    def applies(d: Dict[str, Any]) -> bool:
+        if not d.get("name") or d.get("extra"):
+            return False
+        marker = str(d.get("spec") or "").partition(";")[2].strip()
+        return not marker or (env is not None and evaluate_marker(marker, env))
+
+    out: List[SpecEntry] = []
+    for pkg, spec in g.pin_overrides.items():
+        out.append(SpecEntry(
+            name=_split_extras(pkg),
+            spec=spec,
+            evidence=Evidence(source="rules_db.yaml", location="pin_overrides", excerpt=f"{pkg}{spec}"),
+        ))
+    deps = [d for d in g.pip_deps if applies(d)]
+    # a constraint only matters for a package something requires
+    required = {_split_extras(str(d["name"])) for d in deps}
+    constraints = [c for c in g.pip_constraints if applies(c) and _split_extras(str(c["name"])) in required]
+    for d in deps + constraints:
+        ev = d.get("evidence")
+        out.append(SpecEntry(
+            name=_split_extras(str(d["name"])),
+            spec=str(d.get("spec") or "").partition(";")[0].strip() or None,
+            evidence=Evidence(**ev) if isinstance(ev, dict) else None,
+        ))
+    return out
+
+def find_spec_conflicts(entries: List[SpecEntry]) -> List[Conflict]:
+    """
+    Intersect specifiers per canonical name; report every package whose
+    combined range is empty, naming the pair of entries that clash.
+    """
+    by_name: Dict[str, List[Tuple[SpecEntry, Tuple[Interval, ...]]]] = {}
+    for e in entries:
+        ivs = parse_spec(e.spec)
+        if ivs is None:
+            continue
+        by_name.setdefault(e.name, []).append((e, ivs))
+
+    conflicts: List[Conflict] = []
+    for name, items in by_name.items():
+        acc = ANY
+        for k, (e, ivs) in enumerate(items):
+            nxt = intersect(acc, ivs)
+            if nxt:
+                acc = nxt
+                continue
+            # name the earliest entry that is incompatible with this one on its own
+            other = next((o for o, oivs in items[:k] if not intersect(oivs, ivs)), None)
+            if not ivs:
+                msg = f"{e.describe()} can never be satisfied"
+                evidence = [e.evidence] if e.evidence else []
+            elif other is not None:
+                msg = f"{other.describe()} is incompatible with {e.describe()}"
+                evidence = [x.evidence for x in (other, e) if x.evidence]
+            else:
+                prev = [o for o, _ in items[:k]]
+                msg = f"{', '.join(o.describe() for o in prev)} together leave {format_intervals(acc)}, incompatible with {e.describe()}"
+                evidence = [x.evidence for x in prev + [e] if x.evidence]
+            conflicts.append(Conflict(
+                package=name,
+                message=msg,
+                raw="\n".join(f"{x.spec or '*'} -> {format_intervals(iv)}" for x, iv in items),
+                evidence=evidence,
+            ))
+            break
+    return conflicts
@@ -0,0 +1,496 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urljoin, urlparse, unquote
+from urllib.request import Request, urlopen
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import shlex
+import sys
+import tempfile
+import threading
+import time
+
+from ..paths import cache_dir
+from .markers import evaluate_marker, marker_env
+from .pep440 import canonical_name
+
+# Shared, content-addressed wheelhouse filled from a lock file.
+#
+#   <root>/blobs/sha256/ab/abcdef...   the wheel bytes, named by their sha256
+#   <root>/links/<wheel filename>      hardlink to the blob, used with --find-links
+#   <root>/index.json                  sha256 -> {filename, size, last_used} for LRU eviction;
+#                                      prefetches of several repos share it, so it is
+#                                      merged and rewritten under <root>/index.lock
+#
+# Pins with no compatible wheel get their sdist instead, so pip can build them from
+# the wheelhouse too.
+#
+# Any simple index works as the source (PEP 691 JSON or PEP 503 HTML), including a
+# file:// directory laid out as <root>/<project>/<files>, which doubles as a test stand-in.
+
+WHEELHOUSE_ENV = "RDE_WHEELHOUSE_DIR"
+WHEELHOUSE_MAX_GB_ENV = "RDE_WHEELHOUSE_MAX_GB"
+INDEX_URL_ENV = "RDE_INDEX_URL"
+DEFAULT_INDEX_URL = "https://pypi.org/simple"
+DEFAULT_MAX_GB = 20.0
+
+LOCK_PIN_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._\-]*)(?:\[[^\]]*\])?\s*==\s*([^\s;\\]+)")
+HASH_RE = re.compile(r"--hash=sha256:([0-9a-f]{64})")
+
+@dataclass
+class LockedPin:
+    name: str                      # canonical
+    version: str
+    hashes: Set[str] = field(default_factory=set)
+    marker: Optional[str] = None   # e.g. 'sys_platform == "win32"'; None = always
+
+@dataclass
+class PrefetchReport:
+    wheelhouse: str
+    fetched: List[str] = field(default_factory=list)
+    reused: List[str] = field(default_factory=list)
+    sdists: List[str] = field(default_factory=list)      # no compatible wheel; sdist stored (built at install)
+    missing: List[str] = field(default_factory=list)     # neither a compatible wheel nor an sdist on the index
+    failed: List[str] = field(default_factory=list)      # download / hash errors
+    skipped: List[str] = field(default_factory=list)     # marker false on the target
+    bytes_downloaded: int = 0
+    evicted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing and not self.failed
+
+def wheelhouse_root() -> Path:
+    base = os.environ.get(WHEELHOUSE_ENV)
+    root = Path(base).expanduser() if base else cache_dir("wheelhouse")
+    (root / "links").mkdir(parents=True, exist_ok=True)
+    return root
+
+def parse_lock(text: str) -> List[LockedPin]:
+    """
+    Pins and sha256 hashes from a `uv pip compile` / pip-compile lock (with or without --generate-hashes).
+    """
+    pins: List[LockedPin] = []
+    # join backslash continuations so hashes stay with their requirement
+    for line in text.replace("\\\n", " ").splitlines():
+        s = line.split("#", 1)[0].strip()
+        if not s:
+            continue
+        m = LOCK_PIN_RE.match(s)
+        if not m:
+            continue
+        marker = s.split(";", 1)[1].split("--hash", 1)[0].strip() if ";" in s else None
+        pins.append(LockedPin(name=canonical_name(m.group(1)), version=m.group(2), hashes=set(HASH_RE.findall(s)), marker=marker or None))
+    return pins
+
+# ---- wheel tag selection --------------------------------------------------------
+
+def supported_tags(python_version: str, os_name: str = "linux", arch: str = "x86_64") -> List[Tuple[str, str, str]]:
+    """
+    Ordered (python, abi, platform) tags, most specific first. A pragmatic subset of
+    what pip computes: CPython only, manylinux/macosx/win by OS.
+    """
+    major, minor = (python_version.split(".") + ["0"])[:2]
+    cp = f"cp{major}{minor}"
+    osl = (os_name or "").lower()
+    arch = (arch or "x86_64").lower().replace("amd64", "x86_64").replace("arm64", "aarch64")
+    if osl.startswith("win"):
+        plats = ["win_amd64" if arch == "x86_64" else f"win_{arch}"]
+    elif osl.startswith("darwin") or osl.startswith("mac"):
+        mac_arch = "arm64" if arch == "aarch64" else arch
+        plats = [f"macosx_{v}_{a}" for v in ("14_0", "13_0", "12_0", "11_0", "10_15", "10_14", "10_13", "10_12", "10_9")
+                 for a in (mac_arch, "universal2")]
+    else:
+        plats = [f"manylinux_2_{v}_{arch}" for v in range(39, 16, -1)]
+        plats += [f"manylinux2014_{arch}", f"manylinux2010_{arch}", f"manylinux1_{arch}", f"linux_{arch}"]
+    tags: List[Tuple[str, str, str]] = []
+    for p in plats:
+        tags.append((cp, cp, p))
+    for p in plats:
+        tags.append((cp, "abi3", p))
+        for m in range(int(minor) - 1, 1, -1):
+            tags.append((f"cp{major}{m}", "abi3", p))
+    for p in plats:
+        tags.append((cp, "none", p))
+        tags.append((f"py{major}", "none", p))
+    for py in (cp, f"py{major}{minor}", f"py{major}"):
+        tags.append((py, "none", "any"))
+    return tags
+
+def wheel_tags(filename: str) -> List[Tuple[str, str, str]]:
+    parts = filename[:-4].split("-")
+    if len(parts) < 5:
+        return []
+    py, abi, plat = parts[-3], parts[-2], parts[-1]
+    return [(a, b, c) for a in py.split(".") for b in abi.split(".") for c in plat.split(".")]
+
+def pick_wheel(files: List[Tuple[str, str, Optional[str]]], version: str, tags: List[Tuple[str, str, str]]) -> Optional[Tuple[str, str, Optional[str]]]:
+    """
+    Best (filename, url, sha256) for a pinned version, by tag preference order.
+    """
+    rank = {t: i for i, t in enumerate(tags)}
+    best: Optional[Tuple[int, Tuple[str, str, Optional[str]]]] = None
+    for f in files:
+        fn = f[0]
+        if not fn.endswith(".whl"):
+            continue
+        parts = fn.split("-")
+        if len(parts) < 5 or parts[1] != version:
+            continue
+        r = min((rank[t] for t in wheel_tags(fn) if t in rank), default=None)
+        if r is not None and (best is None or r < best[0]):
+            best = (r, f)
+    return best[1] if best else None
+
+SDIST_SUFFIXES = (".tar.gz", ".zip")
+
+def pick_sdist(files: List[Tuple[str, str, Optional[str]]], version: str) -> Optional[Tuple[str, str, Optional[str]]]:
+    """
+    (filename, url, sha256) of the pinned version's sdist, for pins with no usable wheel.
+    """
+    for f in files:
+        for suffix in SDIST_SUFFIXES:
+            if f[0].endswith(suffix) and f[0][:-len(suffix)].rpartition("-")[2] == version:
+                return f
+    return None
+
+# ---- simple index client --------------------------------------------------------
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.links: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+def _split_hash(url: str) -> Tuple[str, Optional[str]]:
+    base, _, frag = url.partition("#")
+    if frag.startswith("sha256="):
+        return base, frag[len("sha256="):]
+    return base, None
+
+def list_project_files(index_url: str, project: str, timeout: float = 30.0) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    (filename, url, sha256) for every file the index lists for `project`.
+    """
+    base = index_url.rstrip("/") + f"/{project}/"
+    if base.startswith("file://"):
+        d = Path(unquote(urlparse(base).path))
+        if not d.is_dir():
+            return []
+        return [(p.name, p.as_uri(), None) for p in sorted(d.iterdir()) if p.is_file()]
+
+    req = Request(base, headers={"Accept": "application/vnd.pypi.simple.v1+json, text/html;q=0.1"})
+    with urlopen(req, timeout=timeout) as resp:
+        ctype = resp.headers.get("Content-Type", "")
+        body = resp.read()
+    if "json" in ctype:
+        data = json.loads(body)
+        return [
+            (f["filename"], urljoin(base, f["url"]), (f.get("hashes") or {}).get("sha256"))
+            for f in data.get("files", [])
+        ]
+    parser = _LinkParser()
+    parser.feed(body.decode("utf-8", errors="ignore"))
+    out = []
+    for href in parser.links:
+        url, sha = _split_hash(urljoin(base, href))
+        out.append((unquote(url.rsplit("/", 1)[-1]), url, sha))
+    return out
+
+# ---- content-addressed store ----------------------------------------------------
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """
+    Exclusive lock across processes (flock, or msvcrt on Windows), held for the block.
+    """
+    with open(path, "a+b") as f:
+        if sys.platform == "win32":
+            import msvcrt
+            f.seek(0)
+            # LK_LOCK retries for ~10 s before raising
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+class Wheelhouse:
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.root = root or wheelhouse_root()
+        (self.root / "links").mkdir(parents=True, exist_ok=True)
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get(WHEELHOUSE_MAX_GB_ENV, DEFAULT_MAX_GB)) * 1024 ** 3)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._meta = self._load_meta()
+
+    @property
+    def links_dir(self) -> Path:
+        return self.root / "links"
+
+    def _meta_path(self) -> Path:
+        return self.root / "index.json"
+
+    def _load_meta(self) -> Dict[str, dict]:
+        try:
+            return json.loads(self._meta_path().read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _merge_meta(self) -> None:
+        """
+        Fold in what other processes saved since this one loaded the index (newest
+        last_used wins), and forget blobs someone else evicted. Index lock held.
+        """
+        for sha, m in self._load_meta().items():
+            mine = self._meta.get(sha)
+            if mine is None:
+                self._meta[sha] = m
+            elif m.get("last_used", 0) > mine.get("last_used", 0):
+                mine["last_used"] = m["last_used"]
+        for sha in [sha for sha in self._meta if not self.blob_path(sha).exists()]:
+            del self._meta[sha]
+
+    def _save_meta(self) -> None:
+        tmp = self._meta_path().with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self._meta))
+        os.replace(tmp, self._meta_path())
+
+    def blob_path(self, sha: str) -> Path:
+        return self.root / "blobs" / "sha256" / sha[:2] / sha
+
+    def lookup(self, filename: str) -> Optional[str]:
+        for sha, m in self._meta.items():
+            if m.get("filename") == filename and self.blob_path(sha).exists():
+                return sha
+        return None
+
+    def touch(self, sha: str) -> None:
+        with self._lock:
+            if sha in self._meta:
+                self._meta[sha]["last_used"] = time.time()
+
+    def reuse(self, filename: str, allowed: Set[str]) -> Optional[str]:
+        """
+        sha of a stored copy of `filename` (matching `allowed`, if any), marked used and
+        linked for --find-links; None when it has to be downloaded.
+        """
+        sha = self.lookup(filename)
+        if sha is None or (allowed and sha not in allowed):
+            return None
+        self.touch(sha)
+        with self._lock:
+            self._link(sha, filename)
+        return sha
+
+    def _link(self, sha: str, filename: str) -> None:
+        link = self.links_dir / filename
+        if link.exists():
+            return
+        try:
+            os.link(self.blob_path(sha), link)
+        except OSError:
+            link.symlink_to(self.blob_path(sha))
+
+    def add(self, url: str, filename: str, allowed: Set[str], timeout: float = 300.0) -> Tuple[str, int]:
+        """
+        Download into the store, verifying sha256 against `allowed` (if any). Returns (sha, bytes).
+        """
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+        h = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as out, urlopen(url, timeout=timeout) as resp:
+                while True:
+                    chunk = resp.read(1 << 20)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            sha = h.hexdigest()
+            if allowed and sha not in allowed:
+                raise ValueError(f"hash mismatch for {filename}: got {sha}")
+            dest = self.blob_path(sha)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_name, dest)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+        with self._lock:
+            self._meta[sha] = {"filename": filename, "size": size, "last_used": time.time()}
+            self._link(sha, filename)
+        return sha, size
+
+    def total_bytes(self) -> int:
+        return sum(int(m.get("size", 0)) for m in self._meta.values())
+
+    def evict(self, keep: Set[str]) -> int:
+        """
+        Drop least-recently-used blobs (never those in `keep`) until under max_bytes.
+        """
+        removed = 0
+        with self._lock, _file_lock(self.root / "index.lock"):
+            self._merge_meta()
+            total = self.total_bytes()
+            for sha, m in sorted(self._meta.items(), key=lambda kv: kv[1].get("last_used", 0)):
+                if total <= self.max_bytes:
+                    break
+                if sha in keep:
+                    continue
+                for p in (self.links_dir / m.get("filename", ""), self.blob_path(sha)):
+                    try:
+                        p.unlink()
+                    except OSError:
+                        pass
+                total -= int(m.get("size", 0))
+                del self._meta[sha]
+                removed += 1
+            self._save_meta()
+        return removed
+
+def prefetch(
+    lock_text: str,
+    python_version: str,
+    os_name: str = "linux",
+    arch: str = "x86_64",
+    index_url: Optional[str] = None,
+    wheelhouse: Optional[Wheelhouse] = None,
+    workers: int = 8,
+    extra_index_urls: Sequence[str] = (),
+) -> PrefetchReport:
+    """
+    Fill the wheelhouse with one compatible wheel per locked pin (else its sdist),
+    downloading in parallel. Extra indexes (e.g. PyTorch's cu121 index) are looked up
+    first, but only files matching the lock's hashes are taken from any index.
+    """
+    t0 = time.perf_counter()
+    wh = wheelhouse or Wheelhouse()
+    index_url = index_url or os.environ.get(INDEX_URL_ENV) or DEFAULT_INDEX_URL
+    indexes = list(dict.fromkeys([*extra_index_urls, index_url]))
+    if "." not in python_version:
+        # no target minor ("3"): tags for cp30 would match nothing; assume this interpreter's
+        python_version = f"{sys.version_info.major}.{sys.version_info.minor}"
+    tags = supported_tags(python_version, os_name, arch)
+    env = marker_env(python_version, os_name, arch)
+    report = PrefetchReport(wheelhouse=str(wh.links_dir))
+    keep: Set[str] = set()
+    keep_lock = threading.Lock()
+
+    def one(pin: LockedPin) -> None:
+        label = f"{pin.name}=={pin.version}"
+        if pin.marker and not evaluate_marker(pin.marker, env):
+            report.skipped.append(label)
+            return
+        choice = sdist = None
+        for i, idx in enumerate(indexes):
+            try:
+                files = list_project_files(idx, pin.name)
+            except Exception as e:
+                if i + 1 < len(indexes):
+                    continue    # extra indexes only carry a few projects
+                report.failed.append(f"{label}: index error: {e}")
+                return
+            if pin.hashes:
+                # the lock's hashes are authoritative; only consider files it allows
+                files = [f for f in files if f[2] is None or f[2] in pin.hashes]
+            choice = pick_wheel(files, pin.version, tags)
+            if choice is not None:
+                break
+            sdist = sdist or pick_sdist(files, pin.version)
+        if choice is None and sdist is not None:
+            choice = sdist
+            report.sdists.append(label)
+        if choice is None:
+            report.missing.append(label)
+            return
+        filename, url, index_sha = choice
+        sha = wh.reuse(filename, pin.hashes)
+        if sha is not None:
+            report.reused.append(label)
+        else:
+            allowed = set(pin.hashes) or ({index_sha} if index_sha else set())
+            try:
+                sha, n = wh.add(url, filename, allowed)
+            except Exception as e:
+                report.failed.append(f"{label}: {e}")
+                return
+            report.fetched.append(label)
+            report.bytes_downloaded += n
+        with keep_lock:
+            keep.add(sha)
+
+    pins = parse_lock(lock_text)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(one, pins))
+
+    report.evicted = wh.evict(keep)
+    report.seconds = round(time.perf_counter() - t0, 3)
+    return report
+
+def prefetch_command(lock_path: str, python_version: str, wheelhouse_dir: str, extra_index_urls: Sequence[str] = ()) -> str:
+    """
+    Shell command that runs the prefetch with the backend's own interpreter.
+    """
+    backend_dir = Path(__file__).resolve().parents[2]
+    q = shlex.quote
+    extra = "".join(f" --extra-index-url {q(u)}" for u in extra_index_urls)
+    return (
+        f"PYTHONPATH={q(str(backend_dir))} {q(sys.executable)} -m rde_backend.solve.wheelhouse prefetch"
+        f" --lock {q(lock_path)} --python {q(python_version)} --wheelhouse {q(wheelhouse_dir)}{extra}"
+    )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="rde_backend.solve.wheelhouse")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("prefetch", help="fill the shared wheelhouse from a lock file")
+    p.add_argument("--lock", required=True)
+    p.add_argument("--python", required=True)
+    p.add_argument("--wheelhouse", default=None, help="wheelhouse root (default: shared RDE cache)")
+    p.add_argument("--index-url", default=None)
+    p.add_argument("--extra-index-url", action="append", default=[], help="tried before --index-url; repeatable")
+    p.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args(argv)
+
+    rep = prefetch(
+        Path(args.lock).read_text(),
+        args.python,
+        os_name=platform.system(),
+        arch=platform.machine(),
+        index_url=args.index_url,
+        wheelhouse=Wheelhouse(Path(args.wheelhouse)) if args.wheelhouse else None,
+        workers=args.workers,
+        extra_index_urls=args.extra_index_url,
+    )
+    print(json.dumps(rep.__dict__, indent=2))
+    # missing pins are left to the install step's online fallback; only errors fail
+    return 0 if not rep.failed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+# backend/rde_backend/store.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from .models import AnalyzeResponse, SolveResponse
+from .paths import cache_dir
+from .solve.pep440 import canonical_name
+from .solve.specifiers import intersect, parse_spec
+
+# Optional fleet store: with RDE_ANALYSIS_STORE set (a .db path, or "1" for the shared
+# cache dir) every /analyze and /solve result is recorded in SQLite. The latest analysis
+# per repo is kept (fingerprint, dependency index, diagnostics); solves are appended.
+# Requests only enqueue; a writer thread commits in batches, one transaction each.
+# Records are numbered as they are queued, and a query waits only until the records
+# queued before it are committed (never for the queue to drain, which under steady
+# traffic it may not).
+#
+# deps is indexed on (name_norm, kind), so "which repos depend on tensorflow<2.11" is an
+# index lookup plus an interval check against the specifier engine; solves on
+# (python_minor, locked) for "which repos failed to lock on 3.12".
+
+STORE_ENV = "RDE_ANALYSIS_STORE"
+SCHEMA_VERSION = 1
+BATCH_SIZE = 64
+BATCH_WINDOW_S = 0.25
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repos (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    analyzed_at REAL,
+    os TEXT,
+    os_version TEXT,
+    arch TEXT,
+    gpu_present INTEGER,
+    fingerprint TEXT
+);
+CREATE TABLE IF NOT EXISTS deps (
+    repo_id INTEGER NOT NULL REFERENCES repos(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_norm TEXT NOT NULL,
+    spec TEXT,
+    extra TEXT,
+    source TEXT,
+    location TEXT
+);
+CREATE INDEX IF NOT EXISTS deps_name ON deps(name_norm, kind);
+CREATE INDEX IF NOT EXISTS deps_repo ON deps(repo_id);
+CREATE TABLE IF NOT EXISTS diagnostics (
+    repo_id INTEGER NOT NULL REFERENCES repos(id) ON DELETE CASCADE,
+    level TEXT,
+    code TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS diagnostics_code ON diagnostics(code);
+CREATE INDEX IF NOT EXISTS diagnostics_repo ON diagnostics(repo_id);
+CREATE TABLE IF NOT EXISTS solves (
+    id INTEGER PRIMARY KEY,
+    repo_id INTEGER NOT NULL REFERENCES repos(id) ON DELETE CASCADE,
+    solved_at REAL,
+    env_type TEXT,
+    python_target TEXT,
+    python_minor TEXT,
+    locked INTEGER,
+    conflicts INTEGER,
+    summary TEXT,
+    choices TEXT
+);
+CREATE INDEX IF NOT EXISTS solves_python ON solves(python_minor, locked);
+CREATE INDEX IF NOT EXISTS solves_repo ON solves(repo_id, solved_at);
+"""
+
+def _python_minor(v: Optional[str]) -> Optional[str]:
+    if not v:
+        return None
+    return ".".join(v.strip().split(".")[:2])
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+class AnalysisStore:
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = _connect(path)
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        conn.close()
+        self._q: "queue.Queue[tuple]" = queue.Queue()
+        self._cond = threading.Condition()
+        self._queued = 0        # records handed to the writer
+        self._written = 0       # records committed (or dropped) by it, in queue order
+        self._writer = threading.Thread(target=self._write_loop, name="rde-store-writer", daemon=True)
+        self._writer.start()
+
+    # --- writes (batched, off the request path) ---
+
+    def _put(self, kind: str, item: Any) -> None:
+        with self._cond:
+            self._queued += 1
+            self._q.put((kind, time.time(), item, self._queued))
+
+    def record_analysis(self, resp: AnalyzeResponse) -> None:
+        self._put("analysis", resp)
+
+    def record_solve(self, repo_path: str, choices: Dict[str, Any], resp: SolveResponse) -> None:
+        self._put("solve", (repo_path, choices, resp))
+
+    def flush(self) -> None:
+        """
+        Wait until everything recorded before this call is committed.
+        """
+        with self._cond:
+            target = self._queued
+            self._cond.wait_for(lambda: self._written >= target)
+
+    def _write_loop(self) -> None:
+        conn = _connect(self.path)
+        while True:
+            batch = [self._q.get()]
+            deadline = time.monotonic() + BATCH_WINDOW_S
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._q.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    for kind, ts, item, _ in batch:
+                        if kind == "analysis":
+                            self._write_analysis(conn, ts, item)
+                        else:
+                            self._write_solve(conn, ts, *item)
+            except Exception:
+                # the transaction is rolled back; the thread must survive or flush() never returns
+                log.exception("store: dropped %d record(s)", len(batch))
+            finally:
+                with self._cond:
+                    self._written = batch[-1][3]
+                    self._cond.notify_all()
+
+    def _repo_id(self, conn: sqlite3.Connection, path: str) -> int:
+        conn.execute("INSERT OR IGNORE INTO repos(path) VALUES (?)", (path,))
+        return conn.execute("SELECT id FROM repos WHERE path = ?", (path,)).fetchone()[0]
+
+    def _write_analysis(self, conn: sqlite3.Connection, ts: float, resp: AnalyzeResponse) -> None:
+        fp = resp.fingerprint
+        rid = self._repo_id(conn, resp.repoPath)
+        conn.execute(
+            "UPDATE repos SET analyzed_at=?, os=?, os_version=?, arch=?, gpu_present=?, fingerprint=? WHERE id=?",
+            (ts, fp.os, fp.os_version, fp.arch, int(fp.gpu_present), fp.model_dump_json(), rid),
+        )
+        conn.execute("DELETE FROM deps WHERE repo_id=?", (rid,))
+        conn.execute("DELETE FROM diagnostics WHERE repo_id=?", (rid,))
+        d = resp.dependencies
+        conn.executemany(
+            "INSERT INTO deps(repo_id, kind, name, name_norm, spec, extra, source, location) VALUES (?,?,?,?,?,?,?,?)",
+            [
+                (rid, dep.kind, dep.name, canonical_name(dep.name), dep.spec, dep.extra, dep.evidence.source, dep.evidence.location)
+                for deps in (d.pip, d.conda, d.apt, d.ros)
+                for dep in deps
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO diagnostics(repo_id, level, code, message) VALUES (?,?,?,?)",
+            [(rid, x.level, x.code, x.message) for x in resp.diagnostics],
+        )
+
+    def _write_solve(self, conn: sqlite3.Connection, ts: float, repo_path: str, choices: Dict[str, Any], resp: SolveResponse) -> None:
+        rid = self._repo_id(conn, repo_path)
+        # None: nothing was resolved (conda, plan-only); 0 covers spec conflicts and uv failures
+        attempts = resp.resolution_attempts
+        locked = None if not attempts else int(any(a.tool == "uv" and a.success for a in attempts))
+        summary = "; ".join(a.summary for a in resp.resolution_attempts)[:500]
+        conn.execute(
+            "INSERT INTO solves(repo_id, solved_at, env_type, python_target, python_minor, locked, conflicts, summary, choices) VALUES (?,?,?,?,?,?,?,?,?)",
+            (rid, ts, resp.decision.envType, resp.decision.pythonTarget, _python_minor(resp.decision.pythonTarget),
+             locked, len(resp.conflicts), summary, json.dumps(choices, sort_keys=True, default=str)),
+        )
+
+    # --- queries ---
+
+    def _read(self) -> sqlite3.Connection:
+        self.flush()
+        conn = _connect(self.path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def repos_depending_on(self, name: str, spec: Optional[str] = None, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Repos with a dependency on `name` whose declared range overlaps `spec`
+        (no spec = any). Unparseable declared specs are reported, flagged unknown.
+        """
+        want = parse_spec(spec) if spec else None
+        if spec and want is None:
+            raise ValueError(f"Can't parse specifier: {spec}")
+        sql = "SELECT r.path, d.kind, d.name, d.spec, d.extra, d.source, d.location FROM deps d JOIN repos r ON r.id = d.repo_id WHERE d.name_norm = ?"
+        args: List[Any] = [canonical_name(name)]
+        if kind:
+            sql += " AND d.kind = ?"
+            args.append(kind)
+        conn = self._read()
+        try:
+            rows = conn.execute(sql, args).fetchall()
+        finally:
+            conn.close()
+        out = []
+        for r in rows:
+            hit = dict(r)
+            if want is not None:
+                have = parse_spec(r["spec"])
+                if have is None:
+                    hit["match"] = "unknown"
+                elif not intersect(have, want):
+                    continue
+            out.append(hit)
+        return out
+
+    def solves(self, python: Optional[str] = None, locked: Optional[bool] = None, env_type: Optional[str] = None, latest: bool = True) -> List[Dict[str, Any]]:
+        """
+        Solve outcomes, by default only each repo's latest per (python, env type).
+        """
+        where, args = [], []
+        if python:
+            where.append("s.python_minor = ?")
+            args.append(_python_minor(python))
+        if locked is not None:
+            where.append("s.locked = ?")
+            args.append(int(locked))
+        if env_type:
+            where.append("s.env_type = ?")
+            args.append(env_type)
+        if latest:
+            where.append(
+                "s.solved_at = (SELECT MAX(t.solved_at) FROM solves t WHERE t.repo_id = s.repo_id"
+                " AND t.python_minor IS s.python_minor AND t.env_type IS s.env_type)"
+            )
+        sql = (
+            "SELECT r.path, s.solved_at, s.env_type, s.python_target, s.locked, s.conflicts, s.summary, s.choices"
+            " FROM solves s JOIN repos r ON r.id = s.repo_id"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " ORDER BY s.solved_at DESC"
+        )
+        conn = self._read()
+        try:
+            rows = [dict(r) for r in conn.execute(sql, args).fetchall()]
+        finally:
+            conn.close()
+        for r in rows:
+            r["locked"] = None if r["locked"] is None else bool(r["locked"])
+            r["choices"] = json.loads(r["choices"] or "{}")
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._read()
+        try:
+            counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("repos", "deps", "diagnostics", "solves")}
+        finally:
+            conn.close()
+        return {"path": str(self.path), **counts}
+
+_STORE: Optional[AnalysisStore] = None
+_STORE_LOCK = threading.Lock()
+
+def get_store() -> Optional[AnalysisStore]:
+    """
+    The process-wide store, or None when RDE_ANALYSIS_STORE is unset.
+    """
+    global _STORE
+    setting = os.environ.get(STORE_ENV, "").strip()
+    if not setting or setting.lower() in ("0", "false", "no"):
+        return None
+    with _STORE_LOCK:
+        if _STORE is None:
+            path = cache_dir("store") / "analyses.db" if setting.lower() in ("1", "true", "yes") else Path(setting).expanduser()
+            try:
+                _STORE = AnalysisStore(path)
+            except (OSError, sqlite3.Error) as e:
+                log.warning("store: disabled: %s", e)
+                return None
+        return _STORE
@@ -0,0 +1,196 @@
+# backend/rde_backend/validate.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+import platform
+import time
+
+from .models import DepCheck, ValidateRequest, ValidateResponse
+from .solve.installed import InstalledIndex, conda_index, dpkg_index, dpkg_installed, pip_index, pip_satisfies, site_packages_python
+from .solve.markers import evaluate_marker, marker_env
+from .solve.pep440 import parse_version
+from .solve.resolve_pip import LOCK_REL_PATH
+from .solve.resolve_ros import infer_ros2_distro
+from .solve.rosdep_index import load_rosdep_index, resolve_ros_deps, source_files, ubuntu_codename, workspace_package_names
+from .solve.wheelhouse import parse_lock
+
+# Checks an environment against what the plan installs without spawning pip or dpkg:
+# the lock (or, with nothing locked, the analysis' pip deps) against the env's
+# site-packages, conda deps against conda-meta, apt and ros deps against the dpkg status
+# file. Every dependency gets a pass/fail/skip with where the answer came from.
+
+def _check_pip_lock(lock_text: str, idx: Optional[InstalledIndex], env: Dict[str, str], missing_env: str) -> List[DepCheck]:
+    out: List[DepCheck] = []
+    for pin in parse_lock(lock_text):
+        required = f"=={pin.version}"
+        if pin.marker and not evaluate_marker(pin.marker, env):
+            out.append(DepCheck(kind="pip", name=pin.name, required=required, status="skip", evidence=f"marker not met: {pin.marker}"))
+            continue
+        have = idx.version(pin.name) if idx else None
+        if have is None:
+            out.append(DepCheck(kind="pip", name=pin.name, required=required, status="fail", evidence=missing_env if idx is None else "not installed"))
+            continue
+        hv, lv = parse_version(have), parse_version(pin.version)
+        same = hv == lv if hv is not None and lv is not None else have == pin.version
+        out.append(DepCheck(
+            kind="pip",
+            name=pin.name,
+            required=required,
+            installed=have,
+            status="pass" if same else "fail",
+            evidence=idx.where.get(idx.key(pin.name), idx.source),
+        ))
+    return out
+
+def _check_pip_deps(deps: List[Dict[str, Any]], idx: Optional[InstalledIndex], missing_env: str) -> List[DepCheck]:
+    out: List[DepCheck] = []
+    for d in deps:
+        name = str(d.get("name") or "").split("[", 1)[0]
+        if not name or d.get("extra"):
+            continue
+        spec = d.get("spec") or None
+        have = idx.version(name) if idx else None
+        if have is None:
+            out.append(DepCheck(kind="pip", name=name, required=spec, status="fail", evidence=missing_env if idx is None else "not installed"))
+            continue
+        out.append(DepCheck(
+            kind="pip",
+            name=name,
+            required=spec,
+            installed=have,
+            status="pass" if pip_satisfies(have, spec) else "fail",
+            evidence=idx.where.get(idx.key(name), idx.source),
+        ))
+    return out
+
+def _check_conda(deps: List[Dict[str, Any]], idx: Optional[InstalledIndex], env_path: Path) -> List[DepCheck]:
+    out: List[DepCheck] = []
+    for d in deps:
+        name = str(d.get("name") or "")
+        if not name:
+            continue
+        spec = d.get("spec") or None
+        if idx is None:
+            out.append(DepCheck(kind="conda", name=name, required=spec, status="skip", evidence=f"{env_path} is not a conda prefix"))
+            continue
+        have = idx.version(name)
+        # conda match specs aren't PEP 440; presence is checked, the version reported
+        out.append(DepCheck(
+            kind="conda",
+            name=name,
+            required=spec,
+            installed=have,
+            status="pass" if have is not None else "fail",
+            evidence=idx.where.get(idx.key(name), "not installed"),
+        ))
+    return out
+
+def _check_apt(names: List[str], dpkg: Optional[InstalledIndex], kind: str = "apt") -> DepCheck:
+    """
+    One check for a dep that needs all of `names` (a rosdep key can map to several).
+    """
+    if dpkg is None:
+        return DepCheck(kind=kind, name=names[0], status="skip", evidence="no dpkg status file")
+    found, missing = [], []
+    for n in names:
+        v, provider = dpkg_installed(dpkg, n)
+        if v is None:
+            missing.append(n)
+        else:
+            found.append(f"{n} {v}" + (f" (via {provider})" if provider else ""))
+    return DepCheck(
+        kind=kind,
+        name=names[0],
+        installed="; ".join(found) or None,
+        status="fail" if missing else "pass",
+        evidence=dpkg.source + (f"; missing: {', '.join(missing)}" if missing else ""),
+    )
+
+def _check_ros(deps: List[Dict[str, Any]], ws_root: Path, dpkg: Optional[InstalledIndex], distro: Optional[str], release: Optional[str]) -> List[DepCheck]:
+    keys = list(dict.fromkeys(str(d.get("name")) for d in deps if d.get("name")))
+    if not keys:
+        return []
+    internal: Set[str] = workspace_package_names(ws_root)
+    resolved = {}
+    files = source_files()
+    if files and distro and release:
+        resolved = resolve_ros_deps(deps, load_rosdep_index(files, distro, "ubuntu", release), internal)
+
+    out: List[DepCheck] = []
+    for key in keys:
+        r = resolved.get(key)
+        if key in internal or (r is not None and r.status == "internal"):
+            out.append(DepCheck(kind="ros", name=key, status="skip", evidence="workspace package (built by colcon)"))
+        elif r is not None and r.status == "apt":
+            c = _check_apt(r.packages, dpkg, kind="ros")
+            out.append(c.model_copy(update={"name": key, "required": ", ".join(r.packages), "evidence": f"rosdep; {c.evidence}"}))
+        elif r is not None and r.status in ("pip", "source"):
+            out.append(DepCheck(kind="ros", name=key, status="skip", evidence=f"rosdep installs it with {r.status}; not checked"))
+        elif r is not None and r.status == "unavailable":
+            out.append(DepCheck(kind="ros", name=key, status="fail", evidence=f"rosdep has no rule for {distro}/{release}"))
+        else:
+            # no index (or no rule): the usual ros-<distro>-<name> package, else a system package of that name
+            candidates = ([f"ros-{distro}-{key.replace('_', '-')}"] if distro else []) + [key]
+            hit = None
+            for cand in candidates:
+                c = _check_apt([cand], dpkg, kind="ros")
+                if c.status != "fail":
+                    hit = c
+                    break
+            if hit is None:
+                out.append(DepCheck(kind="ros", name=key, required=", ".join(candidates), status="fail", evidence=f"not installed (tried {', '.join(candidates)})"))
+            else:
+                out.append(hit.model_copy(update={"name": key, "required": cand}))
+    return out
+
+def validate_environment(req: ValidateRequest) -> ValidateResponse:
+    t0 = time.perf_counter()
+    repo = Path(req.repoPath)
+    analysis = req.analysis or {}
+    deps = analysis.get("dependencies") or {}
+    fp = analysis.get("fingerprint") or {}
+    env_path = Path(req.envPath).expanduser() if req.envPath else repo / ".venv"
+    notes: List[str] = []
+    checks: List[DepCheck] = []
+
+    pip = pip_index(env_path)
+    missing_env = f"no site-packages under {env_path}"
+    lock = repo / LOCK_REL_PATH
+    try:
+        lock_text: Optional[str] = lock.read_text()
+    except OSError:
+        lock_text = None
+    if lock_text is not None:
+        python = site_packages_python(env_path) or "3"
+        menv = marker_env(python, str(fp.get("os") or platform.system()), str(fp.get("arch") or platform.machine()))
+        checks += _check_pip_lock(lock_text, pip, menv, missing_env)
+        notes.append(f"pip: checked {LOCK_REL_PATH} against {env_path}.")
+    elif deps.get("pip"):
+        checks += _check_pip_deps(list(deps.get("pip") or []), pip, missing_env)
+        notes.append(f"pip: no lock; checked the analysis' pip requirements against {env_path}.")
+
+    if deps.get("conda"):
+        checks += _check_conda(list(deps.get("conda") or []), conda_index(env_path), env_path)
+
+    dpkg = dpkg_index()
+    apt_names = list(dict.fromkeys(str(d.get("name")) for d in deps.get("apt") or [] if d.get("name")))
+    checks += [_check_apt([n], dpkg) for n in apt_names]
+    if deps.get("ros"):
+        os_version = str(fp.get("os_version") or "")
+        distro = req.ros2Distro or infer_ros2_distro(str(fp.get("os") or platform.system()), os_version)
+        checks += _check_ros(list(deps.get("ros") or []), repo, dpkg, distro, ubuntu_codename(os_version))
+
+    counts = {s: sum(1 for c in checks if c.status == s) for s in ("pass", "fail", "skip")}
+    if counts["fail"]:
+        notes.append(f"{counts['fail']} of {len(checks)} dependencies are missing or at the wrong version.")
+    return ValidateResponse(
+        repoPath=req.repoPath,
+        ok=counts["fail"] == 0,
+        env_path=str(env_path),
+        checks=checks,
+        passed=counts["pass"],
+        failed=counts["fail"],
+        skipped=counts["skip"],
+        notes=notes,
+        elapsed_ms=round((time.perf_counter() - t0) * 1000, 2),
+    )
@@ -0,0 +1,21 @@
+from rde_backend.deps import iter_dockerfile_instructions
+
+def _dockerfile(tmp_path, text):
+    p = tmp_path / "Dockerfile"
+    p.write_text(text)
+    return list(iter_dockerfile_instructions(p))
+
+def test_blank_and_comment_lines_inside_a_continuation_are_dropped(tmp_path):
+    got = _dockerfile(tmp_path, "FROM ubuntu:22.04\nRUN apt-get install -y \\\n    curl \\\n\n    # vcs\n    git\nCMD bash\n")
+    assert got == [
+        (1, 1, "FROM ubuntu:22.04"),
+        (2, 6, "RUN apt-get install -y curl git"),
+        (7, 7, "CMD bash"),
+    ]
+
+def test_escape_directive_and_leading_comments(tmp_path):
+    got = _dockerfile(tmp_path, "# escape=`\n# syntax comment\nFROM mcr.microsoft.com/windows `\n    AS base\nRUN pip install `\n    numpy\n")
+    assert got == [(3, 4, "FROM mcr.microsoft.com/windows AS base"), (5, 6, "RUN pip install numpy")]
+
+def test_trailing_continuation_at_end_of_file(tmp_path):
+    assert _dockerfile(tmp_path, "FROM x\nRUN echo a \\\n") == [(1, 1, "FROM x"), (2, 2, "RUN echo a")]
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pytest
+
+from rde_backend.fingerprint import NVIDIA_SMI_FIXTURE_ENV, probe_nvidia
+from rde_backend.solve.constraints import build_constraints
+from rde_backend.solve.gpu_wheels import select_wheels
+
+FIXTURES = Path(__file__).parent / "fixtures" / "nvidia-smi"
+
+# fixture dir -> (driver, driver CUDA, compute capabilities, torch variant)
+EXPECTED = {
+    "gtx1080-470": ("470.239.06", "11.4", [], "cu118"),
+    "rtx3090-535": ("535.104.05", "12.2", ["8.6"], "cu126"),
+    "rtx5090-570": ("570.133.07", "12.8", ["12.0", "12.0"], "cu128"),
+}
+
+def test_every_fixture_is_covered():
+    assert sorted(p.name for p in FIXTURES.iterdir()) == sorted(EXPECTED)
+
+@pytest.mark.parametrize("machine", sorted(EXPECTED))
+def test_replayed_nvidia_smi(machine, monkeypatch):
+    monkeypatch.setenv(NVIDIA_SMI_FIXTURE_ENV, str(FIXTURES / machine))
+    driver_want, cuda_want, ccs_want, variant = EXPECTED[machine]
+    ran, driver, cuda, gpus = probe_nvidia()
+    assert ran
+    assert (driver, cuda) == (driver_want, cuda_want)
+    assert [g.compute_capability for g in gpus if g.compute_capability] == ccs_want
+    assert all(g.memory_mb for g in gpus)
+
+    analysis = {
+        "fingerprint": {
+            "os": "Linux",
+            "arch": "x86_64",
+            "gpu_present": True,
+            "gpu_driver_version": driver,
+            "cuda_driver_version": cuda,
+            "gpus": [g.model_dump() for g in gpus],
+        },
+        "dependencies": {"pip": [{"kind": "pip", "name": "torch", "spec": None}]},
+    }
+    g = build_constraints(analysis, {"envType": "venv", "goal": "gpu_if_available", "strictness": "compatible", "runTarget": "host"})
+    [choice] = [c for c in select_wheels(g) if c.framework == "torch"]
+    assert choice.variant == variant
+
+def test_missing_fixture_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv(NVIDIA_SMI_FIXTURE_ENV, str(tmp_path / "nope"))
+    assert probe_nvidia() == (False, None, None, [])
@@ -0,0 +1,41 @@
+import shutil
+import subprocess
+
+import pytest
+
+from rde_backend.git_files import git_files
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git to create the index")
+
+def _repo(tmp_path):
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    (tmp_path / ".gitignore").write_text("out/\n*.log\n!keep.log\n/top.txt\n")
+    (tmp_path / "pkg" / "out").mkdir(parents=True)
+    for rel in ("pkg/setup.py", "pkg/out/gen.py", "pkg/run.log", "pkg/keep.log", "top.txt", "pkg/top.txt"):
+        (tmp_path / rel).write_text("")
+    subprocess.run(["git", "add", ".gitignore", "pkg/setup.py"], cwd=tmp_path, check=True)
+    (tmp_path / "pkg" / "requirements.txt").write_text("numpy\n")
+    (tmp_path / "src" / "vendor").mkdir(parents=True)
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path / "src" / "vendor", check=True)
+    return tmp_path
+
+def _ls_files(repo):
+    out = subprocess.run(
+        ["git", "ls-files", "--cached", "--others", "--exclude-standard"],
+        cwd=repo, capture_output=True, text=True, check=True,
+    ).stdout
+    return sorted(out.split())
+
+def test_index_fallback_lists_untracked_files_like_ls_files(tmp_path):
+    repo = _repo(tmp_path)
+    worktree, files, used = git_files(repo, "index")
+    assert used == "git-index"
+    assert sorted(files) == _ls_files(repo)
+    assert "pkg/requirements.txt" in files
+    assert "src/vendor/" in files
+
+def test_index_fallback_walks_only_the_requested_dir(tmp_path):
+    repo = _repo(tmp_path)
+    _, files, _ = git_files(repo / "pkg", "index")
+    untracked = [f for f in files if f not in (".gitignore", "pkg/setup.py")]
+    assert sorted(untracked) == ["pkg/keep.log", "pkg/requirements.txt", "pkg/top.txt"]
@@ -0,0 +1,45 @@
+import pytest
+
+from rde_backend.solve.markers import evaluate_marker, marker_env
+from rde_backend.solve.pep440 import canonical_name, parse_requirement, parse_version, spec_contains
+
+def test_version_ordering():
+    order = ["1.0.dev0", "1.0a1", "1.0b2", "1.0rc1", "1.0", "1.0.post1", "1.1"]
+    versions = [parse_version(v) for v in order]
+    assert versions == sorted(reversed(versions))
+    assert parse_version("1.0") == parse_version("1.0.0")
+    assert parse_version("1.0+local") > parse_version("1.0")
+    assert parse_version("not-a-version") is None
+
+@pytest.mark.parametrize("spec, version, ok", [
+    (">=1.21,<2", "1.26.4", True),
+    (">=1.21,<2", "2.0", False),
+    ("==2.1.*", "2.1.3", True),
+    ("!=2.1.*", "2.1.3", False),
+    ("~=1.4.2", "1.4.9", True),
+    ("~=1.4.2", "1.5", False),
+])
+def test_spec_contains(spec, version, ok):
+    assert spec_contains(spec, parse_version(version)) is ok
+
+def test_parse_requirement():
+    req = parse_requirement('Torch_Vision[Extra-A]>=0.15; python_version >= "3.9"')
+    assert (req.name, req.extras, req.spec, req.marker) == ("torch-vision", ("extra-a",), ">=0.15", 'python_version >= "3.9"')
+    assert canonical_name("ruamel.yaml") == "ruamel-yaml"
+
+@pytest.mark.parametrize("marker, ok", [
+    ('python_version >= "3.9"', True),
+    ('python_version < "3.10"', False),
+    ('python_full_version >= "3.11.0" and sys_platform == "linux"', True),
+    ('sys_platform == "win32" or platform_machine == "x86_64"', True),
+    ('(os_name == "nt" or platform_system == "Darwin") and python_version > "3"', False),
+    ('"linux" in sys_platform', True),
+    ('this is not a marker', True),
+])
+def test_evaluate_marker(marker, ok):
+    assert evaluate_marker(marker, marker_env("3.11", "Linux", "x86_64")) is ok
+
+def test_marker_env_by_os():
+    assert marker_env("3.10", "Windows")["sys_platform"] == "win32"
+    assert marker_env("3.10", "Darwin")["platform_system"] == "Darwin"
+    assert marker_env("3.10.4")["python_version"] == "3.10"
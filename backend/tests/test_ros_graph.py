@@ -0,0 +1,59 @@
+import os
+
+from rde_backend.solve.ros_graph import build_workspace_graph, changed_packages, find_package_xmls
+
+PACKAGE_XML = """<?xml version="1.0"?>
+<package format="3">
+  <name>{name}</name>
+  <version>0.0.1</version>
+  {deps}
+</package>
+"""
+
+def _workspace(tmp_path):
+    for name, deps in (("core", []), ("app", ["core"])):
+        pkg = tmp_path / "src" / name
+        pkg.mkdir(parents=True)
+        (pkg / "package.xml").write_text(PACKAGE_XML.format(name=name, deps="".join(f"<depend>{d}</depend>" for d in deps)))
+    return build_workspace_graph(find_package_xmls(tmp_path))
+
+def _built(tmp_path, name, rc="0", when=None):
+    build = tmp_path / "build" / name
+    build.mkdir(parents=True, exist_ok=True)
+    (build / "colcon_build.rc").write_text(rc)
+    (tmp_path / "install" / name).mkdir(parents=True, exist_ok=True)
+    if when is not None:
+        os.utime(build / "colcon_build.rc", (when, when))
+
+def _age_sources(tmp_path, when):
+    for p in (tmp_path / "src").rglob("*"):
+        os.utime(p, (when, when))
+
+def test_no_previous_build(tmp_path):
+    g = _workspace(tmp_path)
+    assert changed_packages(tmp_path, g) is None
+
+def test_edit_after_build_is_changed(tmp_path):
+    g = _workspace(tmp_path)
+    _age_sources(tmp_path, 1000)
+    _built(tmp_path, "core", when=2000)
+    _built(tmp_path, "app", when=2000)
+    assert changed_packages(tmp_path, g) == set()
+    os.utime(tmp_path / "src" / "core" / "package.xml", (3000, 3000))
+    assert changed_packages(tmp_path, g) == {"core"}
+    assert g.dependents({"core"}) == {"core", "app"}
+
+def test_failed_build_is_changed(tmp_path):
+    g = _workspace(tmp_path)
+    _age_sources(tmp_path, 1000)
+    _built(tmp_path, "core", when=2000)
+    _built(tmp_path, "app", rc="2", when=2000)
+    assert changed_packages(tmp_path, g) == {"app"}
+
+def test_missing_install_is_changed(tmp_path):
+    g = _workspace(tmp_path)
+    _age_sources(tmp_path, 1000)
+    _built(tmp_path, "core", when=2000)
+    _built(tmp_path, "app", when=2000)
+    (tmp_path / "install" / "app").rmdir()
+    assert changed_packages(tmp_path, g) == {"app"}
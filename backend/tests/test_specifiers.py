@@ -0,0 +1,33 @@
+from rde_backend.deps import parse_requirements_txt
+from rde_backend.solve.constraints import build_constraints
+from rde_backend.solve.specifiers import find_spec_conflicts, parse_spec, spec_entries
+
+CHOICES = {"envType": "venv", "goal": "auto", "strictness": "compatible", "runTarget": "host"}
+
+def _graph(tmp_path, text):
+    req = tmp_path / "requirements.txt"
+    req.write_text(text)
+    deps = [d.model_dump() for d in parse_requirements_txt(req)]
+    analysis = {"fingerprint": {"os": "Linux", "arch": "x86_64"}, "dependencies": {"pip": deps}}
+    return build_constraints(analysis, CHOICES)
+
+def test_disjoint_ranges_conflict(tmp_path):
+    g = _graph(tmp_path, "numpy<1.24\nnumpy>=1.26\n")
+    conflicts = find_spec_conflicts(spec_entries(g))
+    assert [c.package for c in conflicts] == ["numpy"]
+
+def test_marker_split_pair_is_not_a_conflict(tmp_path):
+    g = _graph(tmp_path, 'numpy<1.24; python_version<"3.9"\nnumpy>=1.26; python_version>="3.9"\n')
+    entries = spec_entries(g, "3.11")
+    assert [(e.name, e.spec) for e in entries] == [("numpy", ">=1.26")]
+    assert find_spec_conflicts(entries) == []
+
+def test_marker_gated_entries_left_to_resolver_without_target(tmp_path):
+    g = _graph(tmp_path, 'numpy<1.24; python_version<"3.9"\nnumpy>=1.26\n')
+    g.python_candidates, g.python_current = [], None
+    assert [e.spec for e in spec_entries(g)] == [">=1.26"]
+
+def test_compatible_release_and_exclusion():
+    assert parse_spec("~=1.4.2") == parse_spec(">=1.4.2,<1.5.dev0")
+    assert parse_spec(">=1,!=1.5") != parse_spec(">=1")
+    assert parse_spec("not a spec!") is None
@@ -0,0 +1,28 @@
+import threading
+import time
+
+from rde_backend.store import AnalysisStore
+
+def test_queries_do_not_wait_for_later_records(tmp_path, monkeypatch):
+    store = AnalysisStore(tmp_path / "store.db")
+    written = []
+    monkeypatch.setattr(store, "_write_solve", lambda conn, ts, *item: (time.sleep(0.005), written.append(item)))
+    stop = threading.Event()
+
+    def traffic():
+        while not stop.is_set():
+            store.record_solve("/repo", {}, None)
+            time.sleep(0.001)
+
+    t = threading.Thread(target=traffic)
+    t.start()
+    try:
+        time.sleep(0.05)
+        store.record_solve("/mine", {}, None)
+        started = time.monotonic()
+        assert store.stats()["path"] == str(tmp_path / "store.db")
+        assert time.monotonic() - started < 2.0
+        assert ("/mine", {}, None) in written
+    finally:
+        stop.set()
+        t.join()
@@ -0,0 +1,40 @@
+from rde_backend.solve.wheelhouse import parse_lock, pick_wheel, supported_tags
+
+A, B, C = "a" * 64, "b" * 64, "c" * 64
+
+LOCK = f"""\
+# This file was autogenerated by uv via the following command:
+#    uv pip compile requirements.in --generate-hashes
+Numpy==1.26.4 \\
+    --hash=sha256:{A} \\
+    --hash=sha256:{B}
+    # via -r requirements.in
+pywin32==306 ; sys_platform == 'win32' \\
+    --hash=sha256:{C}
+-e ./local_pkg
+"""
+
+def test_parse_lock():
+    pins = {p.name: p for p in parse_lock(LOCK)}
+    assert sorted(pins) == ["numpy", "pywin32"]
+    assert pins["numpy"].version == "1.26.4"
+    assert pins["numpy"].hashes == {A, B}
+    assert pins["numpy"].marker is None
+    assert pins["pywin32"].marker == "sys_platform == 'win32'"
+
+FILES = [
+    ("numpy-1.26.4-cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64.whl", "u1", "h1"),
+    ("numpy-1.26.4-cp311-cp311-win_amd64.whl", "u2", "h2"),
+    ("numpy-1.26.4-cp312-cp312-manylinux_2_17_x86_64.manylinux2014_x86_64.whl", "u3", "h3"),
+    ("numpy-1.26.3-cp311-cp311-manylinux_2_28_x86_64.whl", "u4", "h4"),
+    ("numpy-1.26.4.tar.gz", "u5", "h5"),
+]
+
+def test_pick_wheel_by_tag_and_version():
+    assert pick_wheel(FILES, "1.26.4", supported_tags("3.11", "Linux", "x86_64"))[1] == "u1"
+    assert pick_wheel(FILES, "1.26.4", supported_tags("3.11", "Windows", "AMD64"))[1] == "u2"
+    assert pick_wheel(FILES, "1.26.4", supported_tags("3.10", "Linux", "x86_64")) is None
+
+def test_pick_wheel_prefers_specific_over_pure_python():
+    files = [("six-1.16.0-py2.py3-none-any.whl", "pure", None), ("six-1.16.0-cp311-abi3-manylinux_2_17_x86_64.whl", "abi3", None)]
+    assert pick_wheel(files, "1.16.0", supported_tags("3.11"))[1] == "abi3"
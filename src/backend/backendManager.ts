@@ -1,16 +1,31 @@
 import * as vscode from "vscode";
-import { spawn, ChildProcessWithoutNullStreams } from "child_process";
+import * as fs from "fs";
+import * as os from "os";
+import * as path from "path";
+import { spawn, ChildProcess } from "child_process";
 import { getServices } from "../servicesSingleton";
 
+// A backend started by hand (`python -m rde_backend`) listens here.
 const DEFAULT_BASE_URL = "http://127.0.0.1:8844";
 
-let backendProc: ChildProcessWithoutNullStreams | undefined;
+let backendProc: ChildProcess | undefined;
 let readyPromise: Promise<string> | undefined;
+let readyUrl: string | undefined;
 
 type HealthResponse = {
   ok: boolean;
   service?: string;
   version?: string;
+  pid?: number;
+};
+
+// Written by `python -m rde_backend --daemon`; shared by every window.
+type DaemonDiscovery = {
+  pid: number;
+  url: string;
+  port: number;
+  version?: string;
+  log?: string;
 };
 
 
@@ -18,7 +33,7 @@ async function sleep(ms: number) {
   return new Promise((r) => setTimeout(r, ms));
 }
 
-async function isHealthy(baseUrl: string): Promise<boolean> {
+async function isHealthy(baseUrl: string, pid?: number): Promise<boolean> {
   try {
     const res = await fetch(`${baseUrl}/health`, { method: "GET" });
     if (!res.ok) {
@@ -26,12 +41,38 @@ async function isHealthy(baseUrl: string): Promise<boolean> {
     }
 
     const data = (await res.json()) as HealthResponse;
-    return data.ok === true;
+    return data.ok === true && (pid === undefined || data.pid === pid);
   } catch {
     return false;
   }
 }
 
+function daemonDir(): string {
+  // mirrors rde_backend.paths.cache_dir
+  const base = process.env.RDE_CACHE_DIR || path.join(os.homedir(), ".cache", "rde");
+  return path.join(base, "daemon");
+}
+
+function readDiscovery(): DaemonDiscovery | undefined {
+  try {
+    const info = JSON.parse(fs.readFileSync(path.join(daemonDir(), "daemon.json"), "utf8")) as DaemonDiscovery;
+    return info.url ? info : undefined;
+  } catch {
+    return undefined;
+  }
+}
+
+async function findRunningBackend(): Promise<string | undefined> {
+  const info = readDiscovery();
+  if (info && (await isHealthy(info.url, info.pid))) {
+    return info.url;
+  }
+  if (await isHealthy(DEFAULT_BASE_URL)) {
+    return DEFAULT_BASE_URL;
+  }
+  return undefined;
+}
+
 
 function getWorkspaceRoot(): string | undefined {
   return vscode.workspace.workspaceFolders?.[0]?.uri.fsPath;
@@ -45,7 +86,7 @@ function pickPythonCommand(): { cmd: string; argsPrefix: string[] } {
   return { cmd: "python3", argsPrefix: [] };
 }
 
-function spawnBackend(baseUrl: string) {
+function spawnBackend() {
   const { backendLog } = getServices();
 
   const workspaceRoot = getWorkspaceRoot();
@@ -56,24 +97,31 @@ function spawnBackend(baseUrl: string) {
   const backendDir = `${workspaceRoot}/backend`;
   const { cmd, argsPrefix } = pickPythonCommand();
 
-  // Run: python -m rde_backend
-  const args = [...argsPrefix, "-m", "rde_backend"];
+  // Run: python -m rde_backend --daemon
+  // Detached with output in the daemon log, so it outlives this window and later
+  // windows reuse it (and its warm caches) through the discovery file.
+  const args = [...argsPrefix, "-m", "rde_backend", "--daemon"];
+  fs.mkdirSync(daemonDir(), { recursive: true });
+  const logPath = path.join(daemonDir(), "daemon.log");
+  const logFd = fs.openSync(logPath, "a");
 
   backendLog.appendLine(`[backend] spawning: ${cmd} ${args.join(" ")}`);
   backendLog.appendLine(`[backend] cwd: ${backendDir}`);
+  backendLog.appendLine(`[backend] log: ${logPath}`);
 
   backendProc = spawn(cmd, args, {
     cwd: backendDir,
     env: process.env,
+    detached: true,
+    stdio: ["ignore", logFd, logFd],
   });
-
-  backendProc.stdout.on("data", (buf) => backendLog.appendLine(buf.toString()));
-  backendProc.stderr.on("data", (buf) => backendLog.appendLine(buf.toString()));
+  fs.closeSync(logFd);
+  backendProc.unref();
 
   backendProc.on("exit", (code, signal) => {
+    // exit 0 right after spawn: another window's daemon holds the lock (we poll discovery)
     backendLog.appendLine(`[backend] exited code=${code} signal=${signal}`);
     backendProc = undefined;
-    readyPromise = undefined;
   });
 
   backendProc.on("error", (err) => {
@@ -89,36 +137,47 @@ function spawnBackend(baseUrl: string) {
  */
 export async function ensureBackendReady(): Promise<string> {
   const { backendLog } = getServices();
-  const baseUrl = DEFAULT_BASE_URL;
+
+  // the shared daemon exits when idle; re-discover if it went away
+  if (readyUrl && !(await isHealthy(readyUrl))) {
+    backendLog.appendLine("[backend] daemon went away; reconnecting.");
+    readyUrl = undefined;
+    readyPromise = undefined;
+  }
 
   if (readyPromise) {
     return readyPromise;
   } 
 
   readyPromise = (async () => {
-    // If already healthy, don’t spawn
-    if (await isHealthy(baseUrl)) {
-      backendLog.appendLine("[backend] already healthy.");
-      return baseUrl;
+    // If another window already started the daemon, don’t spawn
+    const running = await findRunningBackend();
+    if (running) {
+      backendLog.appendLine(`[backend] already healthy at ${running}.`);
+      readyUrl = running;
+      return running;
     }
 
-    // Spawn if not running
+    // Spawn if not running (a racing window's daemon wins the lock; we then find it)
     if (!backendProc) {
-      spawnBackend(baseUrl);
+      spawnBackend();
     }
 
-    // Poll health
+    // Poll discovery file + health
     const timeoutMs = 15_000;
     const start = Date.now();
 
     while (Date.now() - start < timeoutMs) {
-      if (await isHealthy(baseUrl)) {
-        backendLog.appendLine("[backend] healthy.");
-        return baseUrl;
+      const url = await findRunningBackend();
+      if (url) {
+        backendLog.appendLine(`[backend] healthy at ${url}.`);
+        readyUrl = url;
+        return url;
       }
       await sleep(250);
     }
 
+    readyPromise = undefined;
     throw new Error("Backend did not become healthy within 15s. Check RDE Backend logs.");
   })();
 
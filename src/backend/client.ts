@@ -16,3 +16,47 @@ export async function postJson<T>(
 
   return (await res.json()) as T;
 }
+
+/**
+ * POST and consume an NDJSON stream, calling onEvent for every line.
+ */
+export async function postNdjson<T>(
+  baseUrl: string,
+  path: string,
+  body: unknown,
+  onEvent: (ev: T) => void
+): Promise<void> {
+  const res = await fetch(`${baseUrl}${path}`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+
+  if (!res.ok || !res.body) {
+    const text = await res.text().catch(() => "");
+    throw new Error(`HTTP ${res.status} for ${path}: ${text}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) {
+      break;
+    }
+    buf += decoder.decode(value, { stream: true });
+    let nl = buf.indexOf("\n");
+    while (nl >= 0) {
+      const line = buf.slice(0, nl).trim();
+      buf = buf.slice(nl + 1);
+      if (line) {
+        onEvent(JSON.parse(line) as T);
+      }
+      nl = buf.indexOf("\n");
+    }
+  }
+  if (buf.trim()) {
+    onEvent(JSON.parse(buf) as T);
+  }
+}
@@ -73,6 +73,9 @@ function formatConflicts(conflicts: Conflict[]): string[] {
   for (const c of conflicts) {
     const pkg = c.package ? `${c.package}: ` : "";
     lines.push(`- ${pkg}${c.message}`);
+    for (const ev of c.evidence ?? []) {
+        lines.push(...indent([`at ${ev.location}${ev.excerpt ? `: ${ev.excerpt}` : ""}`], 4));
+    }
     if (c.raw) {
         lines.push(...indent(tailLines(c.raw), 4));
     }
@@ -1,8 +1,9 @@
 import * as vscode from "vscode";
-import { runOneClickWizard } from "./oneClickWizard";
+import { applyDecision, runOneClickWizard, solveChoiceMatrix } from "./oneClickWizard";
 import { getServices } from "../servicesSingleton";
 import { ensureBackendReady } from "../backend/backendManager";
 import { postJson } from "../backend/client";
+import type { SetupChoices } from "../types";
 import type { SolveResponse } from "../types/backendTypes";
 import { formatSolveReport } from "./formatSolveReport";
 import { handleDecisionPoint } from "./handleDecisionPoint";
@@ -29,8 +30,15 @@ type AnalyzeResponse = {
   fingerprint?: any;
   diagnostics?: Diagnostic[];
   notes?: string[];
+  partial?: boolean;
+  truncated?: { stage: string; reason: string; processed: number; total?: number | null; message: string }[];
 };
 
+// Bounds for /analyze so a mis-pointed folder (home dir, monorepo root) returns a
+// partial result instead of hanging the wizard.
+const ANALYZE_DEADLINE_MS = 20_000;
+const ANALYZE_MAX_FILES = 200_000;
+
 export async function runOneClickSetup(): Promise<void> {
   const { log, solverLog, validatorLog } = getServices();
 
@@ -62,8 +70,16 @@ export async function runOneClickSetup(): Promise<void> {
     log.appendLine("Calling /analyze ...");
     const analysis = await postJson<AnalyzeResponse>(baseUrl, "/analyze", {
       repoPath: workspaceRoot,
+      deadline_ms: ANALYZE_DEADLINE_MS,
+      max_files: ANALYZE_MAX_FILES,
     });
 
+    if (analysis.partial) {
+      vscode.window.showWarningMessage(
+        "RDE: repository too large to analyze fully; continuing with a partial analysis (see RDE logs)."
+      );
+    }
+
     log.appendLine("Analyze response:");
     log.appendLine(JSON.stringify(analysis, null, 2));
 
@@ -99,6 +115,9 @@ export async function runOneClickSetup(): Promise<void> {
       analysis,
     });
 
+    // every option a decision point offers, solved in one call while the user picks
+    let matrix: Promise<(c: SetupChoices) => SolveResponse | undefined> | undefined;
+
     // up to 10 decision rounds to avoid infinite loops
     for (let i = 0; i < 10; i++) {
       if (!solve.decision_point) {
@@ -108,27 +127,22 @@ export async function runOneClickSetup(): Promise<void> {
       log.appendLine("Decision point requested by solver.");
       log.appendLine(solve.decision_point.reason);
 
+      matrix ??= solveChoiceMatrix(baseUrl, workspaceRoot, analysis, { ...choices }).catch(() => () => undefined);
       const selected = await handleDecisionPoint(solve.decision_point);
       if (!selected) {
         log.appendLine("User cancelled decision point.");
         return;
       }
 
-      // map selection into choice overrides (your backend can formalize this later)
-      if (selected === "cpu") {
-        choices.goal = "cpu";
-      }
-      if (selected === "wsl2") {
-        choices.runTarget = "wsl2";
-      }
-      if (selected === "docker") {
-        choices.envType = "docker";
-        choices.runTarget = "container";
-      }
-
+      applyDecision(choices, selected);
       log.appendLine(`Decision selected: ${selected}`);
-      log.appendLine("Re-solving with updated choices...");
 
+      const solved = (await matrix)(choices);
+      if (solved) {
+        solve = solved;
+        continue;
+      }
+      log.appendLine("Re-solving with updated choices...");
       solve = await postJson<SolveResponse>(baseUrl, "/solve", {
         repoPath: workspaceRoot,
         choices,
@@ -138,7 +152,7 @@ export async function runOneClickSetup(): Promise<void> {
 
     solverLog.show(true);
     solverLog.appendLine(formatSolveReport(solve));
-    await maybeRunPlanSteps(solve.plan_steps ?? []);
+    await maybeRunPlanSteps(solve.plan_steps ?? [], workspaceRoot, solve.plan_id);
 
 
     vscode.window.showInformationMessage("RDE: Analyze + diagnostics complete.");
@@ -1,5 +1,7 @@
 import * as vscode from "vscode";
+import { postJson } from "../backend/client";
 import type { EnvType, Goal, RunTarget, SetupChoices, Strictness } from "../types";
+import type { SolveMatrixResponse, SolveResponse } from "../types/backendTypes";
 
 type PickItem<T extends string> = vscode.QuickPickItem & { value: T };
 
@@ -177,3 +179,45 @@ export async function runOneClickWizard(): Promise<SetupChoices | undefined> {
 
   return { envType, runTarget, goal, strictness };
 }
+
+/**
+ * Apply a decision-point option (see handleDecisionPoint) to the choices, in place.
+ */
+export function applyDecision(choices: SetupChoices, selected: string): void {
+  if (selected === "cpu") {
+    choices.goal = "cpu";
+  }
+  if (selected === "wsl2") {
+    choices.runTarget = "wsl2";
+  }
+  if (selected === "docker") {
+    choices.envType = "docker";
+    choices.runTarget = "container";
+  }
+}
+
+/**
+ * Solve every choice combination a decision point can lead to in one /solve/matrix
+ * call, so switching options afterwards is a lookup instead of another /solve.
+ * Returns a lookup that yields undefined for combinations outside the matrix.
+ */
+export async function solveChoiceMatrix(
+  baseUrl: string,
+  repoPath: string,
+  analysis: unknown,
+  choices: SetupChoices
+): Promise<(c: SetupChoices) => SolveResponse | undefined> {
+  const axes: Partial<Record<keyof SetupChoices, string[]>> = {
+    goal: [...new Set([choices.goal, "cpu"])],
+    runTarget: [...new Set([choices.runTarget, ...(isWindows() ? ["wsl2"] : []), "container"])],
+    envType: [...new Set([choices.envType, "docker"])],
+  };
+  const matrix = await postJson<SolveMatrixResponse>(baseUrl, "/solve/matrix", {
+    repoPath,
+    analysis,
+    choices,
+    axes,
+  });
+  const keys: (keyof SetupChoices)[] = ["envType", "runTarget", "goal", "strictness"];
+  return (c) => matrix.entries.find((e) => keys.every((k) => e.choices[k] === c[k]))?.result;
+}
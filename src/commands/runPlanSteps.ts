@@ -1,8 +1,102 @@
 import * as vscode from "vscode";
-import type { PlanStep } from "../types/backendTypes";
+import type { DryRunReport, ExecuteEvent, PlanStep } from "../types/backendTypes";
 import { runInRdeTerminal } from "../terminal/terminalManager";
+import { ensureBackendReady } from "../backend/backendManager";
+import { postJson, postNdjson } from "../backend/client";
+import { getServices } from "../servicesSingleton";
 
-export async function maybeRunPlanSteps(steps: PlanStep[]): Promise<void> {
+const MAX_PARALLEL = 4;
+
+/**
+ * Runs the whole plan through the backend executor: independent steps overlap,
+ * apt/dpkg steps are serialized by lock group. Output is streamed to the solver log.
+ */
+async function runPlanInBackend(steps: PlanStep[], repoPath: string, planId: string): Promise<void> {
+  const { solverLog } = getServices();
+  const baseUrl = await ensureBackendReady();
+
+  // the backend only runs plans it issued, looked up by id
+  const dry = await postJson<DryRunReport>(baseUrl, "/execute", {
+    repoPath,
+    plan_id: planId,
+    max_parallel: MAX_PARALLEL,
+    dry_run: true,
+  });
+  solverLog.appendLine(
+    `[exec] estimated ${dry.scheduled_seconds}s with ${dry.max_parallel} workers ` +
+      `(critical path ${dry.critical_path_seconds}s, sequential ${dry.sequential_seconds}s)`
+  );
+
+  const needsConfirm = steps.filter((s) => s.requires_confirmation).map((s) => s.title);
+  if (needsConfirm.length) {
+    const ok = await vscode.window.showWarningMessage(
+      `Run all ${steps.length} steps? These require confirmation: ${needsConfirm.join(", ")}`,
+      { modal: true },
+      "Run"
+    );
+    if (ok !== "Run") {
+      return;
+    }
+  }
+
+  // the backend refuses unconfirmed requires_confirmation steps
+  const confirmed = steps.filter((s) => s.requires_confirmation).map((s) => s.id);
+  // sudo steps can't prompt in the backend; they come back to run in the terminal
+  const terminalSteps: { title: string; commands: string[] }[] = [];
+
+  solverLog.show(true);
+  await postNdjson<ExecuteEvent>(
+    baseUrl,
+    "/execute",
+    { repoPath, plan_id: planId, max_parallel: MAX_PARALLEL, confirmed },
+    (ev) => {
+      switch (ev.event) {
+        case "start":
+          solverLog.appendLine(`[exec] ▶ ${ev.id}: ${ev.title}`);
+          break;
+        case "output":
+          solverLog.appendLine(`[${ev.id}] ${ev.line}`);
+          break;
+        case "end":
+          solverLog.appendLine(`[exec] ${ev.ok ? "✔" : "✖"} ${ev.id} (${ev.seconds}s)`);
+          break;
+        case "skip":
+          solverLog.appendLine(`[exec] skipped ${ev.id}: ${ev.reason}`);
+          break;
+        case "session":
+          solverLog.appendLine(`[exec] ${ev.id}: not run (only affects a terminal session): ${ev.command}`);
+          break;
+        case "terminal":
+          solverLog.appendLine(`[exec] ${ev.id}: ${ev.reason}`);
+          terminalSteps.push({ title: ev.title, commands: ev.commands });
+          break;
+        case "summary":
+          solverLog.appendLine(
+            `[exec] done in ${ev.wall_seconds}s (sum of steps ${ev.sequential_seconds}s)` +
+              (ev.failed.length ? `; failed: ${ev.failed.join(", ")}` : "")
+          );
+          break;
+      }
+    }
+  );
+
+  if (terminalSteps.length) {
+    const ok = await vscode.window.showWarningMessage(
+      `These steps need sudo and must run in a terminal: ${terminalSteps.map((s) => s.title).join(", ")}`,
+      { modal: true },
+      "Run in terminal"
+    );
+    if (ok === "Run in terminal") {
+      for (const s of terminalSteps) {
+        for (const cmd of s.commands) {
+          runInRdeTerminal(cmd, true);
+        }
+      }
+    }
+  }
+}
+
+export async function maybeRunPlanSteps(steps: PlanStep[], repoPath?: string, planId?: string | null): Promise<void> {
   if (!steps.length) {
     return;
   }
@@ -11,6 +105,9 @@ export async function maybeRunPlanSteps(steps: PlanStep[]): Promise<void> {
     [
       { id: "safe", label: "Run safe steps", description: "Runs steps that do not require confirmation" },
       { id: "pick", label: "Pick a step to run", description: "Choose one step and run its commands" },
+      ...(repoPath && planId
+        ? [{ id: "all", label: "Run all steps in parallel", description: "Backend runs independent steps concurrently" }]
+        : []),
       { id: "none", label: "Don’t run anything", description: "" },
     ],
     { title: "Run generated commands?", ignoreFocusOut: true }
@@ -20,6 +117,11 @@ export async function maybeRunPlanSteps(steps: PlanStep[]): Promise<void> {
     return;
   }
 
+  if (pick.id === "all" && repoPath && planId) {
+    await runPlanInBackend(steps, repoPath, planId);
+    return;
+  }
+
   if (pick.id === "safe") {
     for (const s of steps) {
       if (s.requires_confirmation) {
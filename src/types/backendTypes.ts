@@ -16,6 +16,54 @@ export type PlanStep = {
   why: string;
   evidence?: Record<string, any> | null;
   requires_confirmation: boolean;
+  id?: string;
+  depends_on?: string[];
+  lock_group?: string | null;
+  est_seconds?: number | null;
+};
+
+export type ExecuteEvent =
+  | { event: "start"; id: string; title: string; t: number }
+  | { event: "output"; id: string; line: string }
+  | { event: "end"; id: string; ok: boolean; seconds: number; t: number }
+  | { event: "skip"; id: string; reason: string }
+  | { event: "session"; id: string; command: string }
+  | { event: "terminal"; id: string; title: string; commands: string[]; reason: string }
+  | {
+      event: "summary";
+      ok: boolean;
+      wall_seconds: number;
+      sequential_seconds: number;
+      failed: string[];
+      skipped: string[];
+      terminal: string[];
+      timings: Record<string, number>;
+    };
+
+export type DryRunReport = {
+  dry_run: true;
+  sequential_seconds: number;
+  critical_path_seconds: number;
+  critical_path: string[];
+  scheduled_seconds: number;
+  max_parallel: number;
+  schedule: { id: string; start: number; end: number }[];
+};
+
+export type PackageEntry = {
+  kind: "ros" | "python" | "node" | "unknown";
+  name: string;
+  root: string;
+  manifest?: string | null;
+  workspace?: string | null;
+  depth: number;
+};
+
+export type PackagesResponse = {
+  repoPath: string;
+  packages: PackageEntry[];
+  workspaces: string[];
+  elapsed_ms: number;
 };
 
 export type ResolutionAttempt = {
@@ -26,10 +74,17 @@ export type ResolutionAttempt = {
   stderr_tail: string;
 };
 
+export type Evidence = {
+  source: string;
+  location: string;
+  excerpt?: string | null;
+};
+
 export type Conflict = {
   package?: string | null;
   message: string;
   raw?: string | null;
+  evidence?: Evidence[];
 };
 
 export type DecisionPointOption = {
@@ -62,4 +117,11 @@ export type SolveResponse = {
   schema_version: string;
   decision_point?: DecisionPoint | null;
   notes: string[];
+  plan_id?: string | null;
+};
+
+export type SolveMatrixResponse = {
+  repoPath: string;
+  entries: { choices: Record<string, any>; result: SolveResponse }[];
+  elapsed_ms: number;
 };